@@ -0,0 +1,126 @@
+"""Benchmark of the prompt size and turn latency of a long session, with and without history compaction.
+
+Runs `--turns` turns of a file-reading conversation through an ADK Runner, once without compaction
+and once with the `ContextCompactor` callback. The model is a local fake that calls `read_file` once
+per turn (returning `--tool-output-chars` characters) and whose latency grows with the prompt, at
+`--base-ms` plus `--ms-per-1k-tokens` (about 4 characters per token), emulating prefill cost. The
+summaries are produced by the same fake model, so their cost is included in the compacted run.
+
+Usage:
+    python -m benchmarks.context_compaction --turns 60 --report-every 10 --keep-turns 6
+"""
+
+import argparse
+import asyncio
+import time
+from typing import AsyncGenerator, ClassVar
+from google.adk.agents import Agent
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.adk.models.registry import LLMRegistry
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.genai import types
+from src.agents.context_compaction import ContextCompactor, content_chars
+
+APP_NAME = "Great_Sage"
+MODEL = "bench-fake-model"
+CHARS_PER_TOKEN = 4
+
+
+class FakeLlm(BaseLlm):
+    """Calls `read_file` for each user message and answers after the tool result; sleeps in proportion to the prompt."""
+
+    base_ms: ClassVar[float] = 50.0
+    ms_per_1k_tokens: ClassVar[float] = 20.0
+    prompt_chars: ClassVar[list[int]] = []
+
+    @classmethod
+    def supported_models(cls) -> list[str]:
+        return [r"bench-fake-.*"]
+
+    async def generate_content_async(self, llm_request: LlmRequest, stream: bool = False) -> AsyncGenerator[LlmResponse, None]:
+        chars = content_chars(llm_request.contents)
+        await asyncio.sleep((self.base_ms + self.ms_per_1k_tokens * chars / CHARS_PER_TOKEN / 1000) / 1000)
+        last = llm_request.contents[-1]
+        if llm_request.config and llm_request.config.system_instruction and "running summary" in str(llm_request.config.system_instruction):
+            text = "The user has been reading project files one after the other and asked for a short description of each. " * 3
+        elif any(part.function_response for part in last.parts or []):
+            self.prompt_chars.append(chars)
+            text = "The file describes the configuration of the service and its dependencies."
+        else:
+            self.prompt_chars.append(chars)
+            call = types.FunctionCall(name="read_file", args={"path": f"docs/file_{len(self.prompt_chars)}.md"})
+            yield LlmResponse(content=types.Content(role="model", parts=[types.Part(function_call=call)]))
+            return
+        yield LlmResponse(content=types.Content(role="model", parts=[types.Part(text=text)]))
+
+
+def make_read_file(output_chars: int):
+    def read_file(path: str) -> str:
+        """Reads the content of the specified file."""
+        line = f"{path}: lorem ipsum dolor sit amet, consectetur adipiscing elit.\n"
+        return (line * (output_chars // len(line) + 1))[:output_chars]
+    return read_file
+
+
+async def run(turns: int, compactor: ContextCompactor, tool_output_chars: int) -> list[tuple[float, int]]:
+    """Returns (turn latency, prompt characters of the turn's first model call) per turn."""
+    callback = compactor.before_model_callback if compactor.enabled else None
+    agent = Agent(name="bench_agent", model=MODEL, instruction="Answer questions about files.",
+                  tools=[make_read_file(tool_output_chars)], before_model_callback=callback)
+    session_service = InMemorySessionService()
+    runner = Runner(agent=agent, app_name=APP_NAME, session_service=session_service)
+    await session_service.create_session(app_name=APP_NAME, user_id="bench", session_id="bench")
+
+    results = []
+    for turn in range(turns):
+        FakeLlm.prompt_chars = []
+        message = types.Content(role="user", parts=[types.Part(text=f"What is in docs/file_{turn}.md?")])
+        started = time.perf_counter()
+        async for _ in runner.run_async(user_id="bench", session_id="bench", new_message=message):
+            pass
+        results.append((time.perf_counter() - started, FakeLlm.prompt_chars[0]))
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--turns", type=int, default=60)
+    parser.add_argument("--report-every", type=int, default=10)
+    parser.add_argument("--tool-output-chars", type=int, default=8000, help="size of each read_file result")
+    parser.add_argument("--keep-turns", type=int, default=6)
+    parser.add_argument("--summary-batch", type=int, default=4)
+    parser.add_argument("--max-tool-output-chars", type=int, default=2000)
+    parser.add_argument("--base-ms", type=float, default=50.0, help="fake model latency per call")
+    parser.add_argument("--ms-per-1k-tokens", type=float, default=20.0, help="fake model latency per 1000 prompt tokens")
+    args = parser.parse_args()
+
+    FakeLlm.base_ms = args.base_ms
+    FakeLlm.ms_per_1k_tokens = args.ms_per_1k_tokens
+    LLMRegistry.register(FakeLlm)
+
+    results = {}
+    for mode, enabled in (("full", False), ("compacted", True)):
+        compactor = ContextCompactor(
+            keep_turns=args.keep_turns, summary_batch=args.summary_batch, max_tool_output_chars=args.max_tool_output_chars,
+            summarizer="model", summary_model=MODEL, enabled=enabled
+        )
+        results[mode] = asyncio.run(run(args.turns, compactor, args.tool_output_chars))
+
+    print(f"{args.turns} turns, {args.tool_output_chars} character tool outputs, keep {args.keep_turns} turns")
+    print(f"{'turn':>6}{'full tokens':>14}{'full ms':>10}{'compacted tokens':>19}{'compacted ms':>15}")
+    for turn in range(args.report_every - 1, args.turns, args.report_every):
+        (full_latency, full_chars), (compacted_latency, compacted_chars) = results["full"][turn], results["compacted"][turn]
+        print(
+            f"{turn + 1:>6}{full_chars // CHARS_PER_TOKEN:>14}{full_latency * 1000:>10.0f}"
+            f"{compacted_chars // CHARS_PER_TOKEN:>19}{compacted_latency * 1000:>15.0f}"
+        )
+    for mode, samples in results.items():
+        print(f"{mode}: total {sum(latency for latency, _ in samples):.1f} s, "
+              f"{sum(chars for _, chars in samples) // CHARS_PER_TOKEN} prompt tokens on the first call of each turn")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""Deterministic scripted model standing in for Gemini in the benchmarks.
+
+Registered in the ADK model registry for `fake-*` model names. It plays the agents' usual script
+from the request alone: the root agent transfers weather, search, URL and file questions to the
+matching sub-agent and answers the rest; a sub-agent calls one of its tools with arguments taken
+from the user's question, then answers from the tool result. Each call takes FAKE_LLM_LATENCY_MS
+plus FAKE_LLM_MS_PER_1K_TOKENS per thousand prompt tokens (about 4 characters per token), and
+reports token usage like Gemini. In SSE mode the answer is streamed in FAKE_LLM_STREAM_CHUNKS parts.
+
+Models can be given their own latency with FAKE_LLM_MODEL_LATENCY_MS (e.g. 'fake-pro=2000,fake-flash=200')
+and a share of calls failing with a 429 RESOURCE_EXHAUSTED error with FAKE_LLM_MODEL_ERROR_RATE (e.g.
+'fake-pro=0.3'), to exercise the fallback models of src/agents/models.py.
+"""
+
+import asyncio
+import json
+import os
+import random
+import re
+from typing import AsyncGenerator, Optional
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.adk.models.registry import LLMRegistry
+from google.genai import errors, types
+
+FAKE_LLM_LATENCY_MS = float(os.getenv("FAKE_LLM_LATENCY_MS", 300))
+FAKE_LLM_MS_PER_1K_TOKENS = float(os.getenv("FAKE_LLM_MS_PER_1K_TOKENS", 10))
+FAKE_LLM_STREAM_CHUNKS = int(os.getenv("FAKE_LLM_STREAM_CHUNKS", 4))
+
+
+def per_model(value: str) -> dict[str, float]:
+    """Parses 'model=number,...'."""
+    return {name.strip(): float(number) for name, _, number in (item.partition("=") for item in value.split(",") if "=" in item)}
+
+
+FAKE_LLM_MODEL_LATENCY_MS = per_model(os.getenv("FAKE_LLM_MODEL_LATENCY_MS", ""))
+FAKE_LLM_MODEL_ERROR_RATE = per_model(os.getenv("FAKE_LLM_MODEL_ERROR_RATE", ""))
+
+CHARS_PER_TOKEN = 4
+FOREIGN_EVENT_MARKER = "For context:"
+# Seeded, so that runs fail the same calls.
+failures = random.Random(0)
+URL = re.compile(r"https?://\S+")
+CITY = re.compile(r"\b(?:in|at|for)\s+([A-Z][a-zA-Z]+(?:\s+[A-Z][a-zA-Z]+)?)")
+PATH = re.compile(r"(?:^|\s)((?:~/|\.{1,2}/|/)[\w.\-/]*|[\w\-]+\.(?:txt|py|log|md|json|toml))\b")
+TRANSFERS = (
+    (re.compile(r"\b(weather|temperature|forecast|time)\b", re.IGNORECASE), "weather_time_agent"),
+    (URL, "websurf_agent"),
+    (re.compile(r"\b(search|look up|latest news)\b", re.IGNORECASE), "search_agent"),
+    (re.compile(r"\b(file|files|directory|folder)\b", re.IGNORECASE), "os_agent"),
+)
+
+
+def prompt_chars(llm_request: LlmRequest) -> int:
+    size = len(str(llm_request.config.system_instruction or "")) if llm_request.config else 0
+    for content in llm_request.contents:
+        for part in content.parts or []:
+            if part.text:
+                size += len(part.text)
+            elif part.function_call:
+                size += len(json.dumps(part.function_call.args or {}, default=str))
+            elif part.function_response:
+                size += len(json.dumps(part.function_response.response or {}, default=str))
+    return size
+
+
+def last_question(llm_request: LlmRequest) -> str:
+    """The latest message written by the user (not a tool result nor another agent's reply)."""
+    for content in reversed(llm_request.contents):
+        if content.role == "user" and content.parts and content.parts[0].text and content.parts[0].text != FOREIGN_EVENT_MARKER:
+            return content.parts[0].text
+    return ""
+
+
+def tool_call(tools: list[str], question: str) -> Optional[types.FunctionCall]:
+    """Picks the sub-agent tool answering `question`, with its arguments."""
+    city = CITY.search(question)
+    city = city.group(1) if city else "London"
+    url = URL.search(question)
+    path = PATH.search(question)
+    if "get_current_time" in tools and re.search(r"\btime\b", question, re.IGNORECASE):
+        return types.FunctionCall(name="get_current_time", args={"city": city})
+    if "get_weather_stateful" in tools:
+        return types.FunctionCall(name="get_weather_stateful", args={"city": city})
+    fetch = next((tool for tool in tools if "fetch" in tool or "load" in tool), None)
+    # The fake MCP server exposes both tools: questions with a URL fetch the page.
+    if fetch and url:
+        return types.FunctionCall(name=fetch, args={"url": url.group(0)})
+    if "search" in tools:
+        return types.FunctionCall(name="search", args={"query": question, "max_results": 5})
+    if fetch:
+        return types.FunctionCall(name=fetch, args={"url": url.group(0) if url else "https://example.com"})
+    if "read_file" in tools and path:
+        return types.FunctionCall(name="head_file" if "head_file" in tools else "read_file", args={"path": path.group(1)})
+    if "list_directory" in tools:
+        return types.FunctionCall(name="list_directory", args={"path": "."})
+    return None
+
+
+def next_step(llm_request: LlmRequest) -> tuple[Optional[types.FunctionCall], str]:
+    """The function call to make, or the text to answer."""
+    tools = [name for name in (llm_request.tools_dict or {}) if name != "transfer_to_agent"]
+    last = llm_request.contents[-1] if llm_request.contents else None
+    results = [part.function_response for part in (last.parts or [])] if last else []
+    results = [result for result in results if result]
+    if results:
+        result = json.dumps(results[0].response, default=str)
+        return None, f"Here is what {results[0].name} found: {result[:300]}"
+
+    question = last_question(llm_request)
+    if tools:
+        call = tool_call(tools, question)
+        if call is not None:
+            return call, ""
+    elif "transfer_to_agent" in (llm_request.tools_dict or {}):
+        for pattern, agent in TRANSFERS:
+            if pattern.search(question):
+                return types.FunctionCall(name="transfer_to_agent", args={"agent_name": agent}), ""
+    return None, f"This is a scripted answer to: {question[:200]}"
+
+
+class FakeLlm(BaseLlm):
+    """Scripted model with latency proportional to the prompt size."""
+
+    @classmethod
+    def supported_models(cls) -> list[str]:
+        return [r"fake-.*"]
+
+    async def generate_content_async(self, llm_request: LlmRequest, stream: bool = False) -> AsyncGenerator[LlmResponse, None]:
+        chars = prompt_chars(llm_request)
+        latency_ms = FAKE_LLM_MODEL_LATENCY_MS.get(self.model, FAKE_LLM_LATENCY_MS)
+        if failures.random() < FAKE_LLM_MODEL_ERROR_RATE.get(self.model, 0.0):
+            await asyncio.sleep(latency_ms / 10000)
+            raise errors.ClientError(429, {"error": {"code": 429, "status": "RESOURCE_EXHAUSTED", "message": f"Quota exceeded for {self.model}."}})
+        await asyncio.sleep((latency_ms + FAKE_LLM_MS_PER_1K_TOKENS * chars / CHARS_PER_TOKEN / 1000) / 1000)
+        call, text = next_step(llm_request)
+        output = len(text) if text else len(json.dumps(call.args or {}))
+        usage = types.GenerateContentResponseUsageMetadata(
+            prompt_token_count=chars // CHARS_PER_TOKEN,
+            candidates_token_count=max(1, output // CHARS_PER_TOKEN),
+            total_token_count=chars // CHARS_PER_TOKEN + max(1, output // CHARS_PER_TOKEN),
+        )
+        if call is not None:
+            yield LlmResponse(content=types.Content(role="model", parts=[types.Part(function_call=call)]), usage_metadata=usage)
+            return
+        if stream and FAKE_LLM_STREAM_CHUNKS > 1:
+            size = len(text) // FAKE_LLM_STREAM_CHUNKS + 1
+            for start in range(0, len(text), size):
+                yield LlmResponse(content=types.Content(role="model", parts=[types.Part(text=text[start:start + size])]), partial=True)
+        yield LlmResponse(content=types.Content(role="model", parts=[types.Part(text=text)]), usage_metadata=usage)
+
+
+LLMRegistry.register(FakeLlm)
@@ -0,0 +1,51 @@
+"""Local stand-in for the DuckDuckGo and websurf MCP servers, speaking MCP over stdio.
+
+Exposes the `search` and `fetch_content` tools of the DuckDuckGo server with deterministic results of
+about FAKE_MCP_PAYLOAD_BYTES bytes, after FAKE_MCP_LATENCY_MS milliseconds. FAKE_MCP_STARTUP_MS delays
+the start of the server, like pulling and starting a container would. Used by the benchmarks
+through SEARCH_MCP_COMMAND and WEBSURF_MCP_COMMAND / WEBSURF_MCP_SERVER_SCRIPT.
+
+Usage:
+    python benchmarks/fakes/mcp_server.py
+"""
+
+import asyncio
+import hashlib
+import os
+import time
+from mcp.server.fastmcp import FastMCP
+
+FAKE_MCP_LATENCY_MS = float(os.getenv("FAKE_MCP_LATENCY_MS", 100))
+FAKE_MCP_PAYLOAD_BYTES = int(os.getenv("FAKE_MCP_PAYLOAD_BYTES", 4000))
+FAKE_MCP_STARTUP_MS = float(os.getenv("FAKE_MCP_STARTUP_MS", 0))
+
+mcp = FastMCP("fake")
+
+
+def payload(seed: str, size: int) -> str:
+    """Deterministic text of `size` characters derived from `seed`."""
+    line = f"{seed}: {hashlib.sha256(seed.encode()).hexdigest()} lorem ipsum dolor sit amet.\n"
+    return (line * (size // len(line) + 1))[:size]
+
+
+@mcp.tool()
+async def search(query: str, max_results: int = 10) -> str:
+    """Searches the web and returns the results."""
+    await asyncio.sleep(FAKE_MCP_LATENCY_MS / 1000)
+    results = max(1, min(max_results, 10))
+    return "\n".join(
+        f"{index + 1}. Result {index + 1} for {query}\n   URL: https://example.com/{index}\n   {payload(f'{query}-{index}', FAKE_MCP_PAYLOAD_BYTES // results)}"
+        for index in range(results)
+    )
+
+
+@mcp.tool()
+async def fetch_content(url: str) -> str:
+    """Fetches a web page and returns its main text."""
+    await asyncio.sleep(FAKE_MCP_LATENCY_MS / 1000)
+    return payload(url, FAKE_MCP_PAYLOAD_BYTES)
+
+
+if __name__ == "__main__":
+    time.sleep(FAKE_MCP_STARTUP_MS / 1000)
+    mcp.run()
@@ -0,0 +1,89 @@
+"""Microbenchmark of the keyword guardrail: linear `in` scan vs the compiled matchers.
+
+Generates `--terms` random blocked keywords and messages of each `--message-sizes` length (without
+any blocked term, the worst case for all: every term has to be ruled out), then times one scan per
+message with the former `any(keyword in text.upper() ...)` loop, with the trie regex and, when
+`pyahocorasick` is installed, with the Aho-Corasick automaton.
+
+Usage:
+    python -m benchmarks.guardrail_matcher --terms 10000 --message-sizes 1000 10000 100000
+"""
+
+import argparse
+import random
+import string
+import time
+from src.agents.security.keyword_matcher import KeywordMatcher, ahocorasick
+
+
+def random_word(rng: random.Random, low: int, high: int) -> str:
+    return "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(low, high)))
+
+
+def make_terms(rng: random.Random, count: int) -> list[str]:
+    """Blocked terms of 6 to 14 letters; the digit suffix keeps them out of the generated messages."""
+    return [f"{random_word(rng, 5, 12)}{rng.randint(0, 99)}" for _ in range(count)]
+
+
+def make_message(rng: random.Random, size: int) -> str:
+    words = []
+    length = 0
+    while length < size:
+        word = random_word(rng, 2, 10)
+        words.append(word.capitalize() if rng.random() < 0.1 else word)
+        length += len(word) + 1
+    return " ".join(words)[:size]
+
+
+def linear_scan(keywords: list[str], text: str) -> bool:
+    upper_text = text.upper()
+    return any(keyword in upper_text for keyword in keywords)
+
+
+def time_per_call(fn, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - started) / repeat
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--terms", type=int, default=10000)
+    parser.add_argument("--message-sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    terms = make_terms(rng, args.terms)
+    upper_terms = [term.upper() for term in terms]
+
+    matchers = {}
+    for name, use_automaton in (("trie regex", False), ("aho-corasick", True)):
+        if use_automaton and ahocorasick is None:
+            print("pyahocorasick is not installed, skipping the automaton.")
+            continue
+        started = time.perf_counter()
+        matchers[name] = KeywordMatcher(terms, use_automaton=use_automaton)
+        print(f"{name}: {args.terms} terms compiled in {(time.perf_counter() - started) * 1000:.1f} ms")
+
+    print(f"{'message chars':>14}{'linear ms':>12}" + "".join(f"{name + ' ms':>18}" for name in matchers))
+    for size in args.message_sizes:
+        message = make_message(rng, size)
+        # Sanity check: all agree, on a clean message and on one containing a term.
+        dirty = f"{message[:size // 2]} {terms[-1]} {message[size // 2:]}"
+        assert not linear_scan(upper_terms, message) and linear_scan(upper_terms, dirty)
+        for matcher in matchers.values():
+            assert matcher.find(message) is None and matcher.find(dirty) is not None
+
+        linear = time_per_call(lambda: linear_scan(upper_terms, message), args.repeat)
+        row = f"{size:>14}{linear * 1000:>12.2f}"
+        for matcher in matchers.values():
+            elapsed = time_per_call(lambda: matcher.find(message), args.repeat)
+            row += f"{elapsed * 1000:>10.3f} ({linear / elapsed:>4.0f}x)"
+        print(row)
+
+
+if __name__ == "__main__":
+    main()
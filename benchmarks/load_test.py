@@ -0,0 +1,251 @@
+"""Offline load test of the whole application with a scripted model and local MCP servers.
+
+The model is replaced by the deterministic fake of `benchmarks/fakes/fake_llm.py` (with configurable
+latency) and the DuckDuckGo and websurf MCP servers by `benchmarks/fakes/mcp_server.py`, so no Gemini
+key, Docker or websurf script is needed. Requests from `--queries` (weather, time, search, URLs,
+files, chit-chat, compound requests) are sent `--concurrency` at a time, spread over `--sessions`
+sessions, either through '/chat' (in-process ASGI, or a running server with `--url`) or directly to
+`call_agent_async`. Reports throughput, p50/p95/p99 latency, errors, memory growth per session and
+the time spent per stage (from the request traces).
+
+`--save results.json` keeps the results; `--baseline results.json` compares with saved results and
+exits with status 1 when throughput or p95 latency regressed by more than `--tolerance`.
+
+Usage:
+    python -m benchmarks.load_test --mode chat --requests 200 --concurrency 16 --sessions 20
+    python -m benchmarks.load_test --save baseline.json    # then, after a change:
+    python -m benchmarks.load_test --baseline baseline.json
+"""
+
+import argparse
+import asyncio
+import gc
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+from collections import Counter
+from typing import Any, Optional
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC_DIR = os.path.join(ROOT_DIR, "src")
+FAKE_MCP_SERVER = os.path.join(ROOT_DIR, "benchmarks", "fakes", "mcp_server.py")
+
+
+def configure_environment(args: argparse.Namespace) -> None:
+    """Points the application at the fakes. Must run before the application is imported; explicit environment variables win."""
+    defaults = {
+        "GOOGLE_MODEL_NAME": "fake-model",
+        "FAKE_LLM_LATENCY_MS": str(args.model_latency_ms),
+        "FAKE_MCP_LATENCY_MS": str(args.tool_latency_ms),
+        "SEARCH_MCP_COMMAND": f"{sys.executable} {FAKE_MCP_SERVER}",
+        "WEBSURF_MCP_COMMAND": sys.executable,
+        "WEBSURF_MCP_SERVER_SCRIPT": FAKE_MCP_SERVER,
+        "LOG_LEVEL": "ERROR",
+        "LOG_FILE": os.path.join(tempfile.gettempdir(), "great_sage_load_test.log"),
+        "TRACING_ENABLED": "true",
+        "TRACING_MAX_REQUESTS": str(args.requests + args.warmup + 100),
+        "DEFAULT_SESSION_ID": "load-test",
+    }
+    if not args.app_limits:
+        # Measures the application, not the configured downstream quotas.
+        defaults.update({
+            "MODEL_RATE_LIMIT": "0", "SEARCH_RATE_LIMIT": "0", "WEBSURF_RATE_LIMIT": "0",
+            "ADMISSION_MAX_CONCURRENT": str(args.concurrency), "ADMISSION_MAX_PER_USER": str(args.concurrency),
+        })
+    for key, value in defaults.items():
+        os.environ.setdefault(key, value)
+    sys.path[:0] = [SRC_DIR, ROOT_DIR]
+
+
+def rss_bytes() -> int:
+    """Resident memory of this process (Linux), or the peak on other systems."""
+    try:
+        with open("/proc/self/statm") as file:
+            return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * (1 if sys.platform == "darwin" else 1024)
+
+
+class LoadTest:
+    """Runs the requests and collects per-request results."""
+
+    def __init__(self, args: argparse.Namespace, queries: list[str]):
+        import main
+        self.main = main
+        self.args = args
+        self.queries = queries
+        self.latencies: list[float] = []
+        self.statuses: Counter = Counter()
+        self.request_ids: list[str] = []
+        self.client = None
+
+    async def send(self, index: int, prefix: str) -> None:
+        query = self.queries[index % len(self.queries)]
+        session = index % self.args.sessions
+        user_id, session_id, request_id = f"load_user_{session}", f"load_session_{session}", f"{prefix}-{index}"
+        started = time.perf_counter()
+        try:
+            if self.client is not None:
+                response = await self.client.post("/chat", json={"query": query, "user_id": user_id, "session_id": session_id, "request_id": request_id})
+                body = response.json()
+                status = body.get("status") if response.status_code == 200 else response.status_code
+            else:
+                if await self.main.get_session(user_id=user_id, session_id=session_id) is None:
+                    await self.main.create_session(user_id=user_id, session_id=session_id)
+                await self.main.call_agent_async(query, self.main.select_runner(query), user_id, session_id, request_id=request_id)
+                status = 200
+        except Exception as e:
+            print(f"request {request_id} failed: {e}", file=sys.stderr)
+            status = "exception"
+        if prefix == "run":
+            self.latencies.append(time.perf_counter() - started)
+            self.statuses[str(status)] += 1
+            self.request_ids.append(request_id)
+
+    async def run_requests(self, count: int, prefix: str) -> float:
+        items = iter(range(count))
+
+        async def worker() -> None:
+            for index in items:
+                await self.send(index, prefix)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(min(self.args.concurrency, count))))
+        return time.perf_counter() - started
+
+    async def run(self) -> dict[str, Any]:
+        import httpx
+        async with self.main.lifespan(self.main.app):
+            if self.args.mode == "chat":
+                transport = None if self.args.url else httpx.ASGITransport(app=self.main.app)
+                self.client = httpx.AsyncClient(transport=transport, base_url=self.args.url or "http://load-test", timeout=self.args.timeout)
+            try:
+                await self.run_requests(self.args.warmup, "warmup")
+                gc.collect()
+                memory_before = rss_bytes()
+                duration = await self.run_requests(self.args.requests, "run")
+                gc.collect()
+                memory_after = rss_bytes()
+            finally:
+                if self.client is not None:
+                    await self.client.aclose()
+            stages = self.stage_times()
+        return self.report(duration, memory_after - memory_before, stages)
+
+    def stage_times(self) -> dict[str, dict[str, float]]:
+        """Mean time per request spent in each span name, from the in-process traces."""
+        if self.args.url:
+            return {}
+        totals: dict[str, list[float]] = {}
+        traced = 0
+        for request_id in self.request_ids:
+            view = self.main.describe_trace(request_id)
+            if view is None:
+                continue
+            traced += 1
+            for name, stage in view["stages"].items():
+                total = totals.setdefault(name, [0, 0.0])
+                total[0] += stage["count"]
+                total[1] += stage["total_ms"]
+        return {
+            name: {"calls_per_request": round(count / traced, 2), "ms_per_request": round(total_ms / traced, 2)}
+            for name, (count, total_ms) in sorted(totals.items(), key=lambda item: -item[1][1])
+        } if traced else {}
+
+    def report(self, duration: float, memory_growth: int, stages: dict[str, dict[str, float]]) -> dict[str, Any]:
+        from benchmarks.session_backends import percentile
+        latencies_ms = [latency * 1000 for latency in self.latencies] or [0.0]
+        errors = sum(count for status, count in self.statuses.items() if status != "200")
+        return {
+            "mode": self.args.mode,
+            "requests": len(self.latencies),
+            "concurrency": self.args.concurrency,
+            "sessions": self.args.sessions,
+            "model_latency_ms": self.args.model_latency_ms,
+            "tool_latency_ms": self.args.tool_latency_ms,
+            "duration_s": round(duration, 3),
+            "throughput_rps": round(len(self.latencies) / duration, 3) if duration else 0.0,
+            "errors": errors,
+            "statuses": dict(self.statuses),
+            "latency_ms": {
+                "p50": round(percentile(latencies_ms, 50), 1),
+                "p95": round(percentile(latencies_ms, 95), 1),
+                "p99": round(percentile(latencies_ms, 99), 1),
+                "max": round(max(latencies_ms), 1),
+            },
+            "memory_growth_bytes": memory_growth,
+            "memory_growth_per_session_bytes": memory_growth // max(1, self.args.sessions),
+            "stages": stages,
+        }
+
+
+def print_report(results: dict[str, Any]) -> None:
+    latency = results["latency_ms"]
+    print(f"{results['requests']} requests via {results['mode']}, concurrency {results['concurrency']}, {results['sessions']} sessions, "
+          f"model {results['model_latency_ms']} ms, tools {results['tool_latency_ms']} ms")
+    print(f"throughput {results['throughput_rps']:.2f} req/s over {results['duration_s']:.1f} s, {results['errors']} errors {results['statuses']}")
+    print(f"latency ms: p50 {latency['p50']:.0f}  p95 {latency['p95']:.0f}  p99 {latency['p99']:.0f}  max {latency['max']:.0f}")
+    print(f"memory growth: {results['memory_growth_bytes'] / 1024:.0f} KiB total, {results['memory_growth_per_session_bytes'] / 1024:.1f} KiB per session")
+    if results["stages"]:
+        print(f"{'stage':<48}{'calls/req':>10}{'ms/req':>10}")
+        for name, stage in list(results["stages"].items())[:20]:
+            print(f"{name[:47]:<48}{stage['calls_per_request']:>10.2f}{stage['ms_per_request']:>10.1f}")
+
+
+def compare(results: dict[str, Any], baseline: dict[str, Any], tolerance: float) -> list[str]:
+    """Regressions of throughput and p95 latency beyond `tolerance` (a fraction)."""
+    regressions = []
+    if results["throughput_rps"] < baseline["throughput_rps"] * (1 - tolerance):
+        regressions.append(f"throughput {results['throughput_rps']:.2f} req/s < baseline {baseline['throughput_rps']:.2f} req/s")
+    if results["latency_ms"]["p95"] > baseline["latency_ms"]["p95"] * (1 + tolerance):
+        regressions.append(f"p95 latency {results['latency_ms']['p95']:.0f} ms > baseline {baseline['latency_ms']['p95']:.0f} ms")
+    if results["errors"] > baseline["errors"]:
+        regressions.append(f"{results['errors']} errors > baseline {baseline['errors']}")
+    return regressions
+
+
+def load_queries(path: str) -> list[str]:
+    with open(path, encoding="utf-8") as file:
+        return [json.loads(line)["query"] for line in file if line.strip()]
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", choices=("chat", "direct"), default="chat", help="drive '/chat' or call_agent_async")
+    parser.add_argument("--url", help="base URL of a running server (chat mode); its environment must point at the fakes")
+    parser.add_argument("--queries", default=os.path.join(ROOT_DIR, "benchmarks", "data", "load_queries.jsonl"))
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--model-latency-ms", type=float, default=300)
+    parser.add_argument("--tool-latency-ms", type=float, default=100)
+    parser.add_argument("--timeout", type=float, default=120, help="HTTP timeout per request in seconds")
+    parser.add_argument("--app-limits", action="store_true", help="keep the configured rate limits and admission limits")
+    parser.add_argument("--save", metavar="FILE", help="write the results as JSON")
+    parser.add_argument("--baseline", metavar="FILE", help="compare with results saved by --save")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed regression against the baseline")
+    args = parser.parse_args(argv)
+
+    configure_environment(args)
+    import benchmarks.fakes.fake_llm  # noqa: F401 - registers the fake model
+
+    results = asyncio.run(LoadTest(args, load_queries(args.queries)).run())
+    print_report(results)
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as file:
+            regressions = compare(results, json.load(file), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION: {regression}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
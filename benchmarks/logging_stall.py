@@ -0,0 +1,114 @@
+"""Benchmark of the event-loop stalls caused by logging, with synchronous handlers and with the queue-based pipeline.
+
+Concurrent simulated requests log what a '/chat' turn logs (session lookups, guardrails, whole events
+with large payloads) while a probe task measures how late the event loop wakes it up. With synchronous
+handlers the formatting and the console/file writes run on the loop; with LOG_ASYNC they run on the
+listener thread. `--io-delay-ms` adds a delay to every handler write to emulate a slow disk or terminal.
+
+Usage:
+    python -m benchmarks.logging_stall --requests 200 --payload-bytes 20000 --io-delay-ms 1
+"""
+
+import argparse
+import asyncio
+import copy
+import logging
+import os
+import sys
+import tempfile
+import time
+from benchmarks.session_backends import percentile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+from logging_config import LOGGING_CONFIG, configure_logging, stop_logging
+
+logger = logging.getLogger("benchmarks.logging_stall")
+
+PROBE_INTERVAL = 0.001
+
+
+def slow_down(io_delay: float) -> None:
+    """Makes every handler write sleep for `io_delay` seconds."""
+    for cls in (logging.StreamHandler, logging.FileHandler):
+        flush = cls.flush
+
+        def delayed_flush(self, flush=flush):
+            time.sleep(io_delay)
+            flush(self)
+
+        cls.flush = delayed_flush
+
+
+async def probe(lags: list[float], stop: asyncio.Event) -> None:
+    """Sleeps PROBE_INTERVAL in a loop and records how late each wake-up is."""
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        started = loop.time()
+        await asyncio.sleep(PROBE_INTERVAL)
+        lags.append(max(0.0, loop.time() - started - PROBE_INTERVAL))
+
+
+async def request(index: int, payload: str, events: int) -> None:
+    """Logs like one '/chat' turn, yielding to the loop between events as the runner does."""
+    logger.info("Getting session with App='%s', User='%s', Session='%s'", "Great_Sage", f"user_{index % 10}", f"session_{index}")
+    logger.info("Calling agent with query: '%s'", "What is the weather in London?")
+    for event in range(events):
+        logger.info("--- Callback: block_keyword_guardrail running for agent: %s ---", "Great_Sage")
+        logger.info("  [Event] Author: %s, Type: %s, Final: %s, Content: %s", "weather_time_agent", "Event", event == events - 1, payload)
+        await asyncio.sleep(0)
+    logger.info("Agent response: %s", payload)
+
+
+async def run(requests: int, payload_bytes: int, events: int) -> tuple[float, list[float]]:
+    payload = "x" * payload_bytes
+    lags: list[float] = []
+    stop = asyncio.Event()
+    probe_task = asyncio.create_task(probe(lags, stop))
+    await asyncio.sleep(0.01)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(request(index, payload, events) for index in range(requests)))
+    elapsed = time.perf_counter() - started
+
+    stop.set()
+    await probe_task
+    return elapsed, lags
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--payload-bytes", type=int, default=20000)
+    parser.add_argument("--events", type=int, default=5, help="events logged per request")
+    parser.add_argument("--io-delay-ms", type=float, default=0.0, help="delay added to every handler write")
+    args = parser.parse_args()
+
+    if args.io_delay_ms > 0:
+        slow_down(args.io_delay_ms / 1000)
+
+    with tempfile.TemporaryDirectory() as directory, open(os.devnull, "w") as devnull:
+        # Console output goes to /dev/null so that the terminal speed does not skew the comparison.
+        stderr, sys.stderr = sys.stderr, devnull
+        results = {}
+        try:
+            for mode, use_queue in (("sync", False), ("queue", True)):
+                config = copy.deepcopy(LOGGING_CONFIG)
+                config["handlers"]["file"]["filename"] = os.path.join(directory, f"{mode}.log")
+                configure_logging(config, use_queue=use_queue)
+                results[mode] = asyncio.run(run(args.requests, args.payload_bytes, args.events))
+                stop_logging()
+        finally:
+            sys.stderr = stderr
+
+    print(f"{args.requests} requests x {args.events} events, {args.payload_bytes} byte payloads, {args.io_delay_ms} ms write delay")
+    print(f"{'mode':<8}{'total ms':>10}{'lag p50 ms':>12}{'lag p99 ms':>12}{'lag max ms':>12}{'stalled ms':>12}")
+    for mode, (elapsed, lags) in results.items():
+        lags_ms = [lag * 1000 for lag in lags] or [0.0]
+        print(
+            f"{mode:<8}{elapsed * 1000:>10.1f}{percentile(lags_ms, 50):>12.2f}{percentile(lags_ms, 99):>12.2f}"
+            f"{max(lags_ms):>12.2f}{sum(lags_ms):>12.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Benchmark of the fallback models of src/agents/models.py against a slow, rate-limited primary model.
+
+Model calls go to the fake models of `benchmarks/fakes/fake_llm.py`: 'fake-pro' answers in
+`--primary-ms` and fails `--primary-error-rate` of its calls with a 429, 'fake-flash' answers in
+`--fallback-ms`. `--requests` calls are made `--concurrency` at a time with the primary alone, with
+the fallback chain (deadline `--deadline-ms`) and with hedging after `--hedge-ms`. Reports the
+p50/p95 latency, the failed calls and the share of calls answered by the fallback model.
+
+Usage:
+    python -m benchmarks.model_fallback --requests 200 --primary-ms 500 --primary-error-rate 0.2
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import time
+
+
+async def run_configuration(llm, requests: int, concurrency: int) -> dict:
+    from google.adk.models.llm_request import LlmRequest
+    from google.genai import types
+    latencies: list[float] = []
+    failures = 0
+    items = iter(range(requests))
+
+    async def worker() -> None:
+        nonlocal failures
+        for index in items:
+            request = LlmRequest(contents=[types.Content(role="user", parts=[types.Part(text=f"question {index}")])])
+            started = time.perf_counter()
+            try:
+                async for _ in llm.generate_content_async(request):
+                    pass
+            except Exception:
+                failures += 1
+                continue
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    latencies.sort()
+    fallback_answers = llm.stats()["models"]["fake-flash"]["successes"] if hasattr(llm, "stats") else 0
+    return {
+        "p50": statistics.median(latencies) if latencies else 0.0,
+        "p95": latencies[int(len(latencies) * 0.95) - 1] if latencies else 0.0,
+        "failures": failures,
+        "fallback_share": fallback_answers / requests,
+    }
+
+
+async def run(args: argparse.Namespace) -> None:
+    from google.adk.models.registry import LLMRegistry
+    from src.agents.models import FallbackLlm
+    chain = {"agent_name": "benchmark", "models": ["fake-pro", "fake-flash"], "deadline": args.deadline_ms / 1000, "cooldown": args.cooldown}
+    configurations = {
+        "primary only": LLMRegistry.new_llm("fake-pro"),
+        "fallback chain": FallbackLlm(model="fake-pro", **chain),
+        "fallback chain + hedging": FallbackLlm(model="fake-pro", hedge_after=args.hedge_ms / 1000, **chain),
+    }
+    print(f"{args.requests} calls, concurrency {args.concurrency}; primary {args.primary_ms:.0f} ms with {args.primary_error_rate:.0%} 429s, "
+          f"fallback {args.fallback_ms:.0f} ms; deadline {args.deadline_ms:.0f} ms, hedge after {args.hedge_ms:.0f} ms, cooldown {args.cooldown:.0f} s")
+    print(f"{'configuration':<28}{'p50 ms':>10}{'p95 ms':>10}{'failed':>10}{'fallback':>10}")
+    for name, llm in configurations.items():
+        results = await run_configuration(llm, args.requests, args.concurrency)
+        print(f"{name:<28}{results['p50']:>10.0f}{results['p95']:>10.0f}{results['failures']:>10}{results['fallback_share']:>10.0%}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--primary-ms", type=float, default=500)
+    parser.add_argument("--primary-error-rate", type=float, default=0.2)
+    parser.add_argument("--fallback-ms", type=float, default=150)
+    parser.add_argument("--deadline-ms", type=float, default=1000)
+    parser.add_argument("--hedge-ms", type=float, default=300)
+    parser.add_argument("--cooldown", type=float, default=1.0, help="seconds a rate-limited model is skipped")
+    args = parser.parse_args()
+
+    # Read by the fake model when it is imported.
+    os.environ["FAKE_LLM_MS_PER_1K_TOKENS"] = "0"
+    os.environ["FAKE_LLM_MODEL_LATENCY_MS"] = f"fake-pro={args.primary_ms},fake-flash={args.fallback_ms}"
+    os.environ["FAKE_LLM_MODEL_ERROR_RATE"] = f"fake-pro={args.primary_error_rate}"
+    # Every fallback is logged as a warning.
+    logging.getLogger("src.agents.models").setLevel(logging.ERROR)
+    import benchmarks.fakes.fake_llm  # noqa: F401 - registers the fake model
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""Benchmark of speculative prefetching on questions about web pages.
+
+Each configuration runs in a fresh interpreter (`--child`) and sends `--requests` '/chat' questions
+holding a different URL each, one at a time, so the time saved is the page fetch overlapped with the
+model calls. The model is the fake of `benchmarks/fakes` and the websurf MCP server the fake
+server, started through a wrapper setting its latency to `--tool-latency-ms`. With the pre-router
+only the websurf agent's model call overlaps with the fetch; without it the root agent's as well.
+The response and tool result caches are disabled.
+
+Usage:
+    python -m benchmarks.prefetch --requests 20 --model-latency-ms 300 --tool-latency-ms 500
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC_DIR = os.path.join(ROOT_DIR, "src")
+FAKE_MCP_SERVER = os.path.join(ROOT_DIR, "benchmarks", "fakes", "mcp_server.py")
+
+CONFIGURATIONS = {
+    "pre-router, no prefetch": {"PRE_ROUTER_ENABLED": "true", "PREFETCH_ENABLED": "false"},
+    "pre-router, prefetch": {"PRE_ROUTER_ENABLED": "true", "PREFETCH_ENABLED": "true"},
+    "root agent, no prefetch": {"PRE_ROUTER_ENABLED": "false", "PREFETCH_ENABLED": "false"},
+    "root agent, prefetch": {"PRE_ROUTER_ENABLED": "false", "PREFETCH_ENABLED": "true"},
+}
+
+# MCP servers are started with a default environment, so the latency is set by a wrapper script.
+SERVER_WRAPPER = """import os, runpy
+os.environ["FAKE_MCP_LATENCY_MS"] = {latency!r}
+runpy.run_path({server!r}, run_name="__main__")
+"""
+
+
+async def measure_child(requests: int) -> dict:
+    import httpx
+    import main
+    latencies = []
+    async with main.lifespan(main.app):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://prefetch", timeout=60) as client:
+            # Starts the pool and lists the tools, as a long-running server would have done already.
+            await client.post("/chat", json={"query": "Read https://example.com/warmup", "user_id": "prefetch", "session_id": "warmup"})
+            for index in range(requests):
+                started = time.perf_counter()
+                response = await client.post("/chat", json={
+                    "query": f"Summarize https://example.com/page-{index} for me", "user_id": "prefetch", "session_id": f"page-{index}"
+                })
+                latencies.append(time.perf_counter() - started)
+                assert "fetch_content" in response.json()["response"], response.text
+    return {"latencies": latencies, "answered": main.prefetcher.stats()["answered"]}
+
+
+def run_child(requests: int) -> None:
+    """Measures one configuration in this interpreter and prints the results as JSON."""
+    sys.path[:0] = [SRC_DIR, ROOT_DIR]
+    import benchmarks.fakes.fake_llm  # noqa: F401 - registers the fake model
+    print(json.dumps(asyncio.run(measure_child(requests))))
+
+
+def run_configuration(overrides: dict[str, str], wrapper: str, args: argparse.Namespace) -> dict:
+    env = {
+        **os.environ,
+        "GOOGLE_MODEL_NAME": "fake-model",
+        "FAKE_LLM_LATENCY_MS": str(args.model_latency_ms),
+        "SEARCH_MCP_POOL_SIZE": "0",
+        "WEBSURF_MCP_COMMAND": sys.executable,
+        "WEBSURF_MCP_SERVER_SCRIPT": wrapper,
+        "WEBSURF_MCP_POOL_SIZE": "2",
+        "WEBSURF_RATE_LIMIT": "0",
+        "MODEL_RATE_LIMIT": "0",
+        "RESPONSE_CACHE_ENABLED": "false",
+        "TOOL_CACHE_ENABLED": "false",
+        "ENABLED_SUB_AGENTS": "weather_time_agent,websurf_agent",
+        "LOG_LEVEL": "ERROR",
+        "LOG_FILE": os.path.join(tempfile.gettempdir(), "great_sage_prefetch.log"),
+        "PYTHONWARNINGS": "ignore",
+        **overrides,
+    }
+    process = subprocess.run([sys.executable, "-m", "benchmarks.prefetch", "--child", "--requests", str(args.requests)],
+                             cwd=ROOT_DIR, env=env, capture_output=True, text=True, timeout=600)
+    if process.returncode != 0:
+        raise RuntimeError(f"prefetch run failed:\n{process.stderr[-2000:]}")
+    return json.loads(process.stdout.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--model-latency-ms", type=float, default=300)
+    parser.add_argument("--tool-latency-ms", type=float, default=500)
+    args = parser.parse_args()
+    if args.child:
+        run_child(args.requests)
+        return
+
+    with tempfile.NamedTemporaryFile("w", suffix=".py", delete=False) as wrapper:
+        wrapper.write(SERVER_WRAPPER.format(latency=str(args.tool_latency_ms), server=FAKE_MCP_SERVER))
+    try:
+        print(f"{args.requests} requests, model {args.model_latency_ms:.0f} ms per call, page fetch {args.tool_latency_ms:.0f} ms")
+        print(f"{'configuration':<28}{'p50 ms':>10}{'mean ms':>10}{'answered':>10}")
+        for name, overrides in CONFIGURATIONS.items():
+            results = run_configuration(overrides, wrapper.name, args)
+            latencies = [latency * 1000 for latency in results["latencies"]]
+            print(f"{name:<28}{statistics.median(latencies):>10.0f}{statistics.mean(latencies):>10.0f}{results['answered']:>10}")
+    finally:
+        os.unlink(wrapper.name)
+
+
+if __name__ == "__main__":
+    main()
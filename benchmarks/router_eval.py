@@ -0,0 +1,80 @@
+"""Offline evaluation of the pre-router against a labeled query file.
+
+Each line of the file is a JSON object with a `query` and the expected `agent` (a sub-agent name, or
+null when the root agent should handle it). Every correctly routed request saves one root model call;
+a wrongly routed request costs at least one extra call to transfer back. Lines with a `branches` count
+also check the fan-out plan of the query (0 when it must not be fanned out).
+
+Usage:
+    python -m benchmarks.router_eval [--file benchmarks/data/router_queries.jsonl] [--min-confidence 0.8] [--verbose]
+"""
+
+import argparse
+import json
+import time
+from collections import Counter
+from src.agents.fanout import plan_fanout
+from src.agents.router import route_query
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--file", default="benchmarks/data/router_queries.jsonl")
+    parser.add_argument("--min-confidence", type=float, default=0.8)
+    parser.add_argument("--verbose", action="store_true", help="print every misrouted query")
+    args = parser.parse_args()
+
+    with open(args.file, encoding="utf-8") as f:
+        samples = [json.loads(line) for line in f if line.strip()]
+
+    correct = routed = routed_correct = misrouted = missed = 0
+    per_label: Counter = Counter()
+    per_label_correct: Counter = Counter()
+    started = time.perf_counter()
+    for sample in samples:
+        decision = route_query(sample["query"])
+        predicted = decision.agent if decision.confidence >= args.min_confidence else None
+        expected = sample.get("agent")
+        per_label[expected or "root"] += 1
+
+        if predicted == expected:
+            correct += 1
+            per_label_correct[expected or "root"] += 1
+        elif args.verbose:
+            print(f"  expected {expected or 'root':<20} got {predicted or 'root':<20} ({decision.reason}) {sample['query']!r}")
+
+        if predicted is not None:
+            routed += 1
+            if predicted == expected:
+                routed_correct += 1
+            else:
+                misrouted += 1
+        elif expected is not None:
+            missed += 1
+    elapsed = time.perf_counter() - started
+
+    fanout_samples = [sample for sample in samples if "branches" in sample]
+    fanout_correct = 0
+    for sample in fanout_samples:
+        branches = plan_fanout(sample["query"], min_confidence=args.min_confidence) or []
+        if len(branches) == sample["branches"]:
+            fanout_correct += 1
+        elif args.verbose:
+            print(f"  expected {sample['branches']} branches, got {[branch.query for branch in branches]} {sample['query']!r}")
+
+    print(f"queries:               {len(samples)}")
+    print(f"routing accuracy:      {correct / len(samples):.1%}")
+    print(f"routed directly:       {routed} ({routed / len(samples):.1%})")
+    print(f"routing precision:     {routed_correct / routed:.1%}" if routed else "routing precision:     n/a")
+    print(f"fell back to root:     {missed} routable queries")
+    print(f"model calls saved:     {routed_correct} (net {routed_correct - misrouted} after {misrouted} misroutes)")
+    print(f"router time per query: {elapsed / len(samples) * 1e6:.1f} us")
+    if fanout_samples:
+        print(f"fan-out plans:         {fanout_correct}/{len(fanout_samples)}")
+    print("per label accuracy:")
+    for label, total in sorted(per_label.items()):
+        print(f"  {label:<20} {per_label_correct[label]}/{total}")
+
+
+if __name__ == "__main__":
+    main()
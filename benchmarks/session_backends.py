@@ -0,0 +1,118 @@
+"""Benchmark of the per-request session overhead of '/chat' for each session backend.
+
+Every simulated request does what '/chat' does around the agent run: `get_session` (and
+`create_session` the first time), then appends the events of a typical delegated turn, one of
+them carrying a state delta. Only the session service time is measured, no model is called.
+
+Usage:
+    python -m benchmarks.session_backends --requests 2000 --sessions 50
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+from google.adk.events import Event, EventActions
+from google.adk.sessions import BaseSessionService, InMemorySessionService
+from google.genai import types
+from src.agents.data_stores.cached_session_service import CachedSessionService
+from src.agents.data_stores.sql_session_service import SqlSessionService
+
+APP_NAME = "Great_Sage"
+
+
+def percentile(samples: list[float], q: float) -> float:
+    """Nearest-rank percentile of `samples` (q in 0..100)."""
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, round(q / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def turn_events(turn: int) -> list[Event]:
+    """Events of one delegated turn: user message, transfer, tool call, tool result and final answer."""
+    invocation_id = f"inv-{turn}"
+    text = lambda role, value: types.Content(role=role, parts=[types.Part(text=value)])
+    return [
+        Event(invocation_id=invocation_id, author="user", content=text("user", f"What is the weather in London? ({turn})")),
+        Event(invocation_id=invocation_id, author="Great_Sage", content=types.Content(role="model", parts=[
+            types.Part(function_call=types.FunctionCall(name="transfer_to_agent", args={"agent_name": "weather_time_agent"}))
+        ])),
+        Event(invocation_id=invocation_id, author="weather_time_agent", content=types.Content(role="model", parts=[
+            types.Part(function_call=types.FunctionCall(name="get_weather_stateful", args={"city": "London"}))
+        ])),
+        Event(invocation_id=invocation_id, author="weather_time_agent", content=types.Content(role="user", parts=[
+            types.Part(function_response=types.FunctionResponse(name="get_weather_stateful", response={"status": "success", "report": "cloudy, 15°C"}))
+        ]), actions=EventActions(state_delta={"last_city_checked_stateful": "London"})),
+        Event(invocation_id=invocation_id, author="weather_time_agent", content=text("model", "It is cloudy in London, 15°C."),
+              actions=EventActions(state_delta={"last_weather_report": "It is cloudy in London, 15°C."})),
+    ]
+
+
+async def one_request(service: BaseSessionService, user_id: str, session_id: str, turn: int) -> float:
+    started = time.perf_counter()
+    session = await service.get_session(app_name=APP_NAME, user_id=user_id, session_id=session_id)
+    if session is None:
+        session = await service.create_session(
+            app_name=APP_NAME, user_id=user_id, session_id=session_id,
+            state={"user_preference_temperature_unit": "Celsius"}
+        )
+    for event in turn_events(turn):
+        await service.append_event(session, event)
+    return time.perf_counter() - started
+
+
+async def run_backend(name: str, service: BaseSessionService, requests: int, sessions: int, concurrency: int) -> list[float]:
+    rng = random.Random(42)
+    plan = [(f"user_{i % 7}", f"session_{rng.randrange(sessions)}", i) for i in range(requests)]
+    semaphore = asyncio.Semaphore(concurrency)
+    # Requests on the same session are serialized, like a client waiting for its previous answer.
+    session_locks = {session_id: asyncio.Lock() for _, session_id, _ in plan}
+
+    async def guarded(user_id: str, session_id: str, turn: int) -> float:
+        async with semaphore, session_locks[session_id]:
+            return await one_request(service, user_id, session_id, turn)
+
+    latencies = await asyncio.gather(*(guarded(*args) for args in plan))
+    close = getattr(service, "close", None)
+    if close is not None:
+        await close()
+    return list(latencies)
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--sessions", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--pool-size", type=int, default=4)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        backends = {
+            "memory": lambda: InMemorySessionService(),
+            "sqlite": lambda: SqlSessionService(f"sqlite:///{os.path.join(tmp, 'plain.db')}", pool_size=args.pool_size),
+            "cached": lambda: CachedSessionService(SqlSessionService(f"sqlite:///{os.path.join(tmp, 'cached.db')}", pool_size=args.pool_size)),
+        }
+        try:
+            from google.adk.sessions import DatabaseSessionService
+            backends["database"] = lambda: DatabaseSessionService(db_url=f"sqlite:///{os.path.join(tmp, 'adk.db')}")
+        except ImportError:
+            print("DatabaseSessionService unavailable (sqlalchemy missing), skipping 'database'.")
+
+        print(f"{args.requests} requests over {args.sessions} sessions, concurrency {args.concurrency}")
+        print(f"{'backend':<10}{'p50 ms':>10}{'p99 ms':>10}{'mean ms':>10}{'total s':>10}")
+        for name, factory in backends.items():
+            started = time.perf_counter()
+            latencies = await run_backend(name, factory(), args.requests, args.sessions, args.concurrency)
+            total = time.perf_counter() - started
+            print(
+                f"{name:<10}{percentile(latencies, 50) * 1000:>10.2f}{percentile(latencies, 99) * 1000:>10.2f}"
+                f"{statistics.mean(latencies) * 1000:>10.2f}{total:>10.2f}"
+            )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,93 @@
+"""Benchmark of the SQLite session store against session length and state size.
+
+For each state size (`--state-kb`) and session length (`--lengths`, in events), a session is filled
+with delegated turns (`benchmarks.session_backends.turn_events`), then `--samples` more turns are
+appended and the session is reloaded after each one. Configurations:
+
+- full rewrite: `snapshot_every=0` folds every delta into the snapshot, i.e. the whole state is written each turn;
+- deltas: only the changed keys are appended, folded every 50 deltas;
+- deltas + recent 50: also loads the last 50 events of the session only.
+
+Usage:
+    python -m benchmarks.session_growth --lengths 100,1000,5000 --state-kb 1,256
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from benchmarks.session_backends import APP_NAME, percentile, turn_events
+from src.agents.data_stores.sql_session_service import SqlSessionService
+
+CONFIGURATIONS = {
+    "full rewrite": {"snapshot_every": 0, "recent_events": 0},
+    "deltas": {"snapshot_every": 50, "recent_events": 0},
+    "deltas + recent 50": {"snapshot_every": 50, "recent_events": 50},
+}
+
+
+def timed_turn(turn: int, start: float) -> list:
+    """The events of a turn with increasing timestamps, so that histories built in a burst keep their order."""
+    events = turn_events(turn)
+    for index, event in enumerate(events):
+        event.timestamp = start + turn + index / 10
+    return events
+
+
+async def measure(options: dict, events: int, state_kb: int, samples: int, directory: str) -> dict:
+    path = os.path.join(directory, f"growth-{options['snapshot_every']}-{options['recent_events']}-{events}-{state_kb}.db")
+    store = SqlSessionService(db_url=f"sqlite:///{path}", pool_size=2, **options)
+    try:
+        session = await store.create_session(
+            app_name=APP_NAME, user_id="growth", session_id="growth", state={"profile": "x" * (state_kb * 1024)}
+        )
+        start = time.time() - 10 * (events + samples)
+        turns = events // len(turn_events(0))
+        for first in range(0, turns, 50):
+            await store.write_batches([(session, [event for turn in range(first, min(turns, first + 50)) for event in timed_turn(turn, start)])])
+
+        appends, loads = [], []
+        for turn in range(turns, turns + samples):
+            batch = timed_turn(turn, start)
+            for event in batch:
+                session.state.update(event.actions.state_delta)
+            started = time.perf_counter()
+            await store.write_events(session, batch)
+            appends.append((time.perf_counter() - started) * 1000)
+            started = time.perf_counter()
+            loaded = await store.get_session(app_name=APP_NAME, user_id="growth", session_id="growth")
+            loads.append((time.perf_counter() - started) * 1000)
+        return {
+            "append_p50": percentile(appends, 50),
+            "load_p50": percentile(loads, 50),
+            "loaded": len(loaded.events),
+        }
+    finally:
+        await store.close()
+
+
+async def run(args: argparse.Namespace) -> None:
+    lengths = [int(value) for value in args.lengths.split(",")]
+    sizes = [int(value) for value in args.state_kb.split(",")]
+    print(f"{args.samples} turns appended and reloaded per row")
+    print(f"{'configuration':<22}{'events':>8}{'state KB':>10}{'append ms':>11}{'load ms':>10}{'loaded':>8}")
+    with tempfile.TemporaryDirectory() as directory:
+        for state_kb in sizes:
+            for events in lengths:
+                for name, options in CONFIGURATIONS.items():
+                    results = await measure(options, events, state_kb, args.samples, directory)
+                    print(f"{name:<22}{events:>8}{state_kb:>10}{results['append_p50']:>11.2f}{results['load_p50']:>10.2f}{results['loaded']:>8}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lengths", default="100,1000,5000", help="comma separated session lengths, in events")
+    parser.add_argument("--state-kb", default="1,256", help="comma separated sizes of the session state")
+    parser.add_argument("--samples", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""Benchmark of the memory held by the in-memory session store under a steady stream of new sessions.
+
+`--sessions` clients each run `--turns` delegated turns (`benchmarks.session_backends.turn_events`)
+in their own session, while every `--default-every`th request goes to one shared default session,
+as anonymous '/chat' requests do. Each configuration runs in a fresh interpreter (`--child`) and
+reports the resident memory growth, the sessions and events still held, the p50 latency of a
+request (get_session plus the turn's events) and the share of returning clients whose session
+could be resumed. `--idle-ms` of simulated time passes between clients, so idle sessions expire.
+
+Usage:
+    python -m benchmarks.session_memory --sessions 1000 --turns 4 --max-sessions 500 --max-events 200
+"""
+
+import argparse
+import asyncio
+import gc
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CONFIGURATIONS = ["unbounded", "bounded", "bounded + spill"]
+
+
+def rss_bytes() -> int:
+    """Resident memory of this process (Linux)."""
+    with open("/proc/self/statm") as file:
+        return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+async def measure_child(name: str, args: argparse.Namespace, spill_dir: str) -> dict:
+    from google.adk.sessions import InMemorySessionService
+    from benchmarks.session_backends import APP_NAME, percentile, turn_events
+    from src.agents.data_stores import bounded_session_service
+    from src.agents.data_stores.bounded_session_service import BoundedSessionService
+
+    # Idle time is simulated, so that expiry can be observed without waiting.
+    clock = [time.monotonic()]
+    bounded_session_service.time.monotonic = lambda: clock[0]
+    if name == "unbounded":
+        service = InMemorySessionService()
+    else:
+        service = BoundedSessionService(
+            ttl=args.ttl, max_sessions=args.max_sessions, max_events=args.max_events, sweep_interval=3600,
+            spill_dir=spill_dir if name == "bounded + spill" else ""
+        )
+
+    async def request(user_id: str, session_id: str, turn: int) -> float:
+        started = time.perf_counter()
+        session = await service.get_session(app_name=APP_NAME, user_id=user_id, session_id=session_id)
+        if session is None:
+            session = await service.create_session(app_name=APP_NAME, user_id=user_id, session_id=session_id)
+        for event in turn_events(turn):
+            await service.append_event(session, event)
+        return (time.perf_counter() - started) * 1000
+
+    gc.collect()
+    memory_before = rss_bytes()
+    latencies = []
+    requests = 0
+    for client in range(args.sessions):
+        for turn in range(args.turns):
+            latencies.append(await request(f"user-{client}", f"session-{client}", turn))
+            requests += 1
+            if requests % args.default_every == 0:
+                latencies.append(await request("user_1", "default", requests))
+        clock[0] += args.idle_ms / 1000
+        if isinstance(service, BoundedSessionService) and client % 100 == 0:
+            await service.sweep()
+
+    # A sample of the clients come back.
+    returning = range(0, args.sessions, max(1, args.sessions // 100))
+    resumed = 0
+    for client in returning:
+        session = await service.get_session(app_name=APP_NAME, user_id=f"user-{client}", session_id=f"session-{client}")
+        resumed += session is not None and len(session.events) > 0
+    gc.collect()
+    memory_after = rss_bytes()
+
+    if isinstance(service, BoundedSessionService):
+        stats = service.stats()
+        sessions, events = stats["sessions"], stats["events"]
+    else:
+        sessions = sum(len(sessions) for users in service.sessions.values() for sessions in users.values())
+        events = sum(len(session.events) for users in service.sessions.values() for sessions in users.values() for session in sessions.values())
+    default = await service.get_session(app_name=APP_NAME, user_id="user_1", session_id="default")
+    return {
+        "memory_mb": (memory_after - memory_before) / 2**20,
+        "sessions": sessions,
+        "events": events,
+        "default_events": len(default.events),
+        "p50_ms": percentile(latencies, 50),
+        "resumed": resumed / len(returning),
+    }
+
+
+def run_configuration(name: str, args: argparse.Namespace) -> dict:
+    command = [sys.executable, "-m", "benchmarks.session_memory", "--child", name]
+    for option in ("sessions", "turns", "default_every", "idle_ms", "ttl", "max_sessions", "max_events"):
+        command += [f"--{option.replace('_', '-')}", str(getattr(args, option))]
+    process = subprocess.run(command, cwd=ROOT_DIR, capture_output=True, text=True, timeout=1800,
+                             env={**os.environ, "PYTHONWARNINGS": "ignore", "LOG_LEVEL": "ERROR"})
+    if process.returncode != 0:
+        raise RuntimeError(f"{name} run failed:\n{process.stderr[-2000:]}")
+    return json.loads(process.stdout.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--child", choices=CONFIGURATIONS, help=argparse.SUPPRESS)
+    parser.add_argument("--sessions", type=int, default=1000)
+    parser.add_argument("--turns", type=int, default=4)
+    parser.add_argument("--default-every", type=int, default=20, help="every n-th request also goes to the shared default session")
+    parser.add_argument("--idle-ms", type=float, default=1000, help="simulated time between two clients")
+    parser.add_argument("--ttl", type=float, default=600)
+    parser.add_argument("--max-sessions", type=int, default=500)
+    parser.add_argument("--max-events", type=int, default=200)
+    args = parser.parse_args()
+    if args.child:
+        with tempfile.TemporaryDirectory() as spill_dir:
+            print(json.dumps(asyncio.run(measure_child(args.child, args, spill_dir))))
+        return
+
+    print(f"{args.sessions} sessions of {args.turns} turns, 1 request in {args.default_every} also to the default session; "
+          f"ttl {args.ttl:.0f} s, {args.idle_ms:.0f} ms between clients, max {args.max_sessions} sessions of {args.max_events} events")
+    print(f"{'configuration':<18}{'memory MB':>11}{'sessions':>10}{'events':>10}{'default':>9}{'p50 ms':>9}{'resumed':>9}")
+    for name in CONFIGURATIONS:
+        results = run_configuration(name, args)
+        print(f"{name:<18}{results['memory_mb']:>11.1f}{results['sessions']:>10}{results['events']:>10}{results['default_events']:>9}"
+              f"{results['p50_ms']:>9.2f}{results['resumed']:>9.0%}")
+
+
+if __name__ == "__main__":
+    main()
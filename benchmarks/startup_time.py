@@ -0,0 +1,120 @@
+"""Benchmark of the import-to-ready time of the application.
+
+Each configuration runs in a fresh interpreter (`--child`), which measures the import of the
+frameworks (ADK, FastAPI), the import of `main` (agents, toolsets, session service), the FastAPI
+startup (MCP pools per MCP_POOL_START), the first '/chat' answer without tools, the first web search
+(through an MCP pool) and the time until every MCP server is ready (not measured with lazy pools). The model and the MCP servers
+are the fakes of `benchmarks/fakes`; `--mcp-startup-ms` emulates the start of the DuckDuckGo
+container. Each number is the median of `--repeat` runs.
+
+Usage:
+    python -m benchmarks.startup_time --repeat 3 --mcp-startup-ms 1500
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC_DIR = os.path.join(ROOT_DIR, "src")
+FAKE_MCP_SERVER = os.path.join(ROOT_DIR, "benchmarks", "fakes", "mcp_server.py")
+
+CONFIGURATIONS = {
+    "all agents, eager pools": {"MCP_POOL_START": "eager"},
+    "all agents, background pools": {"MCP_POOL_START": "background"},
+    "all agents, lazy pools": {"MCP_POOL_START": "lazy"},
+    "os + weather agents only": {"ENABLED_SUB_AGENTS": "os_agent,weather_time_agent"},
+}
+STAGES = ("framework_import", "app_import", "startup", "import_to_ready", "first_chat", "first_search", "pools_ready")
+
+
+async def measure_child(started: float, timings: dict[str, float]) -> None:
+    import httpx
+    import main
+    timings["app_import"] = time.perf_counter() - started - timings["framework_import"]
+
+    mark = time.perf_counter()
+    async with main.lifespan(main.app):
+        timings["startup"] = time.perf_counter() - mark
+        timings["import_to_ready"] = time.perf_counter() - started
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://startup") as client:
+            mark = time.perf_counter()
+            await client.post("/chat", json={"query": "Hello, who are you?", "user_id": "startup", "session_id": "chat"})
+            timings["first_chat"] = time.perf_counter() - mark
+            if "search_agent" in main.sub_agent_runners:
+                mark = time.perf_counter()
+                await client.post("/chat", json={"query": "Search the web for asyncio", "user_id": "startup", "session_id": "search"})
+                timings["first_search"] = time.perf_counter() - mark
+        # With lazy pools, those not used by the requests above stay stopped.
+        pools = main.mcp_pool_stats()
+        if pools and all(pool["started"] for pool in pools):
+            while any(pool["ready"] < pool["size"] for pool in main.mcp_pool_stats()):
+                await asyncio.sleep(0.01)
+            timings["pools_ready"] = time.perf_counter() - started
+
+
+def run_child() -> None:
+    """Measures one startup in this interpreter and prints the timings as JSON."""
+    started = time.perf_counter()
+    import fastapi  # noqa: F401
+    import google.adk.runners  # noqa: F401
+    timings = {"framework_import": time.perf_counter() - started}
+    sys.path[:0] = [SRC_DIR, ROOT_DIR]
+    import benchmarks.fakes.fake_llm  # noqa: F401 - registers the fake model
+    asyncio.run(measure_child(started, timings))
+    print(json.dumps(timings))
+
+
+def run_configuration(overrides: dict[str, str], args: argparse.Namespace) -> dict[str, float]:
+    env = {
+        **os.environ,
+        "GOOGLE_MODEL_NAME": "fake-model",
+        "FAKE_LLM_LATENCY_MS": "0",
+        "FAKE_MCP_LATENCY_MS": "0",
+        "FAKE_MCP_STARTUP_MS": str(args.mcp_startup_ms),
+        "SEARCH_MCP_COMMAND": f"{sys.executable} {FAKE_MCP_SERVER}",
+        "SEARCH_MCP_POOL_SIZE": str(args.pool_size),
+        "WEBSURF_MCP_COMMAND": sys.executable,
+        "WEBSURF_MCP_SERVER_SCRIPT": FAKE_MCP_SERVER,
+        "WEBSURF_MCP_POOL_SIZE": str(args.pool_size),
+        "LOG_LEVEL": "ERROR",
+        "LOG_FILE": os.path.join(tempfile.gettempdir(), "great_sage_startup_time.log"),
+        "PYTHONWARNINGS": "ignore",
+        **overrides,
+    }
+    runs = []
+    for _ in range(args.repeat):
+        process = subprocess.run([sys.executable, "-m", "benchmarks.startup_time", "--child"], cwd=ROOT_DIR, env=env,
+                                 capture_output=True, text=True, timeout=120)
+        if process.returncode != 0:
+            raise RuntimeError(f"startup run failed:\n{process.stderr[-2000:]}")
+        runs.append(json.loads(process.stdout.strip().splitlines()[-1]))
+    return {stage: statistics.median(run[stage] for run in runs) for stage in STAGES if stage in runs[0]}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--mcp-startup-ms", type=float, default=1500, help="start delay of each fake MCP server")
+    parser.add_argument("--pool-size", type=int, default=2, help="servers per MCP pool")
+    args = parser.parse_args()
+    if args.child:
+        run_child()
+        return
+
+    print(f"median of {args.repeat} runs, {args.pool_size} servers per pool, {args.mcp_startup_ms:.0f} ms MCP server start (seconds)")
+    print(f"{'configuration':<32}" + "".join(f"{stage:>17}" for stage in STAGES))
+    for name, overrides in CONFIGURATIONS.items():
+        timings = run_configuration(overrides, args)
+        print(f"{name:<32}" + "".join(f"{timings[stage]:>17.2f}" if stage in timings else f"{'-':>17}" for stage in STAGES))
+
+
+if __name__ == "__main__":
+    main()
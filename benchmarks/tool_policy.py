@@ -0,0 +1,84 @@
+"""Microbenchmark of the tool policy: per-call evaluation cost with large rule sets.
+
+Generates `--rules` rules spread over `--tools` tool names (with a share of glob rules and of the
+argument operators), then times the evaluation of calls that match no rule (the worst case: every
+applicable rule has to be ruled out) with the indexed `ToolPolicy` and with a linear scan that
+checks every rule's tool pattern on every call, like a list of hand-written guardrails.
+
+Usage:
+    python -m benchmarks.tool_policy --rules 100 1000 10000 --tools 50
+"""
+
+import argparse
+import random
+import string
+import time
+from src.agents.security.tool_policy import ToolPolicy, compile_rules, name_matcher
+
+
+def random_word(rng: random.Random, length: int = 8) -> str:
+    return "".join(rng.choice(string.ascii_lowercase) for _ in range(length))
+
+
+def make_rules(rng: random.Random, count: int, tools: list[str], glob_share: float) -> list[dict]:
+    rules = []
+    for _ in range(count):
+        tool = f"{rng.choice(tools)[:4]}*" if rng.random() < glob_share else rng.choice(tools)
+        condition = rng.choice([
+            random_word(rng),
+            {"prefix": [f"/{random_word(rng)}/", f"~/{random_word(rng)}"]},
+            {"contains": [random_word(rng) for _ in range(5)]},
+            {"regex": rf"{random_word(rng, 4)}\d+"},
+            {"max": rng.randint(10, 1000)},
+        ])
+        argument = "limit" if isinstance(condition, dict) and "max" in condition else "value"
+        rules.append({"tool": tool, "action": "deny", "args": {argument: condition}})
+    return rules
+
+
+def linear_evaluate(rules: list, tool_name: str, agent_name: str, args: dict) -> bool:
+    for matcher, rule in rules:
+        if (matcher is None or matcher(tool_name)) and rule.matches(agent_name, args):
+            return rule.action == "allow"
+    return True
+
+
+def time_per_call(fn, calls: list[tuple[str, dict]]) -> float:
+    started = time.perf_counter()
+    for tool_name, args in calls:
+        fn(tool_name, "agent", args)
+    return (time.perf_counter() - started) / len(calls)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rules", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--tools", type=int, default=50)
+    parser.add_argument("--glob-share", type=float, default=0.05, help="share of rules whose tool is a glob")
+    parser.add_argument("--calls", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    tools = [random_word(rng) for _ in range(args.tools)]
+    # The generated rules never match these calls: the values end in upper case words and the limit is over every max.
+    calls = [(rng.choice(tools), {"value": f"Allowed value {index} {random_word(rng).upper()}", "limit": 5000}) for index in range(args.calls)]
+
+    print(f"{args.tools} tools, {args.glob_share:.0%} glob rules, {args.calls} calls matching no rule")
+    print(f"{'rules':>8}{'compile ms':>12}{'linear us/call':>16}{'indexed us/call':>17}{'speedup':>9}")
+    for count in args.rules:
+        started = time.perf_counter()
+        compiled = compile_rules(make_rules(rng, count, tools, args.glob_share))
+        policy = ToolPolicy(compiled)
+        compile_ms = (time.perf_counter() - started) * 1000
+        linear_rules = [(name_matcher(rule.tool), rule) for rule in compiled]
+
+        assert all(linear_evaluate(linear_rules, tool, "agent", call_args) and policy.evaluate(tool, "agent", call_args).allowed for tool, call_args in calls)
+        linear = time_per_call(lambda tool, agent, call_args: linear_evaluate(linear_rules, tool, agent, call_args), calls)
+        policy.evaluate(calls[0][0], "agent", calls[0][1])
+        indexed = time_per_call(policy.evaluate, calls)
+        print(f"{count:>8}{compile_ms:>12.1f}{linear * 1e6:>16.2f}{indexed * 1e6:>17.2f}{linear / indexed:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
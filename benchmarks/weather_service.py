@@ -0,0 +1,77 @@
+"""Benchmark of the weather backend under concurrent requests, with and without the cache and request coalescing.
+
+`--requests` lookups over `--cities` cities (a few hot ones, like real traffic) are issued
+`--concurrency` at a time against a provider that takes `--latency-ms` per fetch. The direct run
+calls the provider for every lookup, the service run goes through `WeatherService`. Reports the
+upstream fetches and the lookup latency of both.
+
+Usage:
+    python -m benchmarks.weather_service --requests 2000 --concurrency 64 --cities 20 --latency-ms 150
+"""
+
+import argparse
+import asyncio
+import random
+import time
+from typing import Optional
+from benchmarks.session_backends import percentile
+from src.agents.data_stores.weather_service import Observation, WeatherService
+
+
+class SlowProvider:
+    """Provider answering every city after a fixed delay, counting its fetches."""
+
+    name = "slow"
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.fetches = 0
+
+    async def fetch(self, city: str) -> Optional[Observation]:
+        self.fetches += 1
+        await asyncio.sleep(self.latency)
+        return Observation(city=city, temp_c=20.0, condition="clear")
+
+
+async def run(lookup, cities: list[str], concurrency: int) -> list[float]:
+    latencies = []
+    items = iter(cities)
+
+    async def worker() -> None:
+        for city in items:
+            started = time.perf_counter()
+            await lookup(city)
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--cities", type=int, default=20)
+    parser.add_argument("--latency-ms", type=float, default=150)
+    parser.add_argument("--ttl", type=float, default=600)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    names = [f"City {index}" for index in range(args.cities)]
+    # Zipf-like popularity: the first cities get most of the lookups; spelling varies like user input.
+    weights = [1 / (rank + 1) for rank in range(args.cities)]
+    cities = [rng.choice([name, name.lower(), f" {name.upper()} "]) for name in rng.choices(names, weights, k=args.requests)]
+
+    print(f"{args.requests} lookups of {args.cities} cities, concurrency {args.concurrency}, {args.latency_ms:.0f} ms per fetch")
+    print(f"{'mode':<10}{'fetches':>10}{'p50 ms':>10}{'p99 ms':>10}{'total s':>10}")
+    for mode in ("direct", "service"):
+        provider = SlowProvider(args.latency_ms / 1000)
+        lookup = provider.fetch if mode == "direct" else WeatherService(provider, ttl=args.ttl).observe
+        started = time.perf_counter()
+        latencies = asyncio.run(run(lookup, cities, args.concurrency))
+        total = time.perf_counter() - started
+        print(f"{mode:<10}{provider.fetches:>10}{percentile(latencies, 50):>10.1f}{percentile(latencies, 99):>10.1f}{total:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,43 +1,83 @@
 """This module provides a helpful assistant agent called 'Great_Sage'."""
 
+import importlib
 import os
 import logging
-from google.adk.agents import Agent
+from google.adk.agents import Agent, BaseAgent
 from src.agents.security.model_guardrail import block_keyword_guardrail
-from src.agents.security.tool_guardrail import block_city_weather_tool_guardrail
+from src.agents.security.tool_guardrail import tool_policy_guardrail
+from src.agents.callbacks import chain_callbacks
+from src.agents.context_compaction import context_compactor
+from src.agents.rate_limits import model_rate_limit
+from src.agents.tracing import record_llm_usage
+from src.agents.models import agent_model
 from src.agents.tools.session_tools import update_state, update_user_preference
-from src.agents.os_agent import OS_Agent
-from src.agents.weather_agent import Weather_Agent
-from src.agents.search_agent import Search_Agent
-from src.agents.websurf_agent import Websurf_Agent
 
 logger = logging.getLogger(__name__)
 
-GOOGLE_MODEL_NAME = os.getenv("GOOGLE_MODEL_NAME", "gemini-2.0-flash")
+# Every agent reads its model and fallback models from <PREFIX>_MODEL / <PREFIX>_FALLBACK_MODELS, see src/agents/models.py
+ROOT_AGENT_MODEL = agent_model("ROOT_AGENT", "Great_Sage")
+
+# Sub-agents by name: the module defining each one and its attribute. Only the enabled ones are imported,
+# so the toolsets (and MCP server pools) of disabled sub-agents are never built.
+SUB_AGENT_MODULES = {
+    "os_agent": ("src.agents.os_agent", "OS_Agent"),
+    "weather_time_agent": ("src.agents.weather_agent", "Weather_Agent"),
+    "search_agent": ("src.agents.search_agent", "Search_Agent"),
+    "websurf_agent": ("src.agents.websurf_agent", "Websurf_Agent"),
+}
+ENABLED_SUB_AGENTS = [name.strip() for name in os.getenv("ENABLED_SUB_AGENTS", ",".join(SUB_AGENT_MODULES)).split(",") if name.strip()]
+
+# Extra delegation hints of the root instruction, for the enabled sub-agents only.
+DELEGATION_HINTS = {
+    "search_agent": "If a user's request involves searching the web, general knowledge, or up-to-date information, use the search_agent to provide the most relevant and current results.",
+    "websurf_agent": "If a user's request involves fetching or extracting content from a specific web page or URL, use the websurf_agent to retrieve and present the information.",
+}
+
+
+def load_sub_agents(names: list[str]) -> list[BaseAgent]:
+    """Imports the sub-agents listed in `names`, skipping unknown names."""
+    sub_agents = []
+    for name in names:
+        if name not in SUB_AGENT_MODULES:
+            logger.error(f"Unknown sub-agent '{name}' in ENABLED_SUB_AGENTS, expected one of {', '.join(SUB_AGENT_MODULES)}.")
+            continue
+        module, attribute = SUB_AGENT_MODULES[name]
+        sub_agents.append(getattr(importlib.import_module(module), attribute))
+    return sub_agents
+
+
+def sub_agent_instruction(sub_agents: list[BaseAgent]) -> str:
+    """The part of the root instruction describing the available sub-agents."""
+    if not sub_agents:
+        return "You have no sub-agents; answer with your own knowledge."
+    lines = [f"You have access to {len(sub_agents)} sub-agents:"]
+    lines += [f"{index}. {sub_agent.name}: {sub_agent.description}" for index, sub_agent in enumerate(sub_agents, start=1)]
+    lines.append("When a user asks for something that can be answered or executed better by a sub-agent that you possess, delegate the task to the appropriate sub-agent.")
+    return "\n            ".join(lines)
+
+
+sub_agents = load_sub_agents(ENABLED_SUB_AGENTS)
+logger.info(f"Sub-agents enabled: {', '.join(sub_agent.name for sub_agent in sub_agents) or 'none'}.")
 
 root_agent = Agent(
     name="Great_Sage",
-    model=GOOGLE_MODEL_NAME,
+    model=ROOT_AGENT_MODEL,
     description=(
         "Agent to act as your personal assistant and help you with your tasks along with answering all your questions."
     ),
     instruction=(
-            """You are Great_Sage, a highly capable AI assistant.
+            f"""You are Great_Sage, a highly capable AI assistant.
             Your primary goal is to help users with any task or question they have.
             You have access to various tools and specialized agents that you can utilize to provide comprehensive assistance.
-            You have access to four sub-agents:
-            1. os_agent: Agent to answer questions about and interact with the operating system and file system.
-            2. weather_agent: Agent to answer questions about the time and weather in a city.
-            3. search_agent: Agent to answer questions by searching the web for information, providing general knowledge, and delivering up-to-date results using the DuckDuckGo Search Engine.
-            4. websurf_agent: Agent to fetch and extract content from web pages given a URL, providing users with the main text or relevant information from any website they provide.
-            When a user asks for something that can be answered or executed better by a sub-agent that you possess, delegate the task to the appropriate sub-agent.
+            {sub_agent_instruction(sub_agents)}
             Always maintain a helpful, professional, and friendly demeanor while addressing users' needs efficiently and accurately.
             If you're unsure about something or don't have the necessary tools, be honest about your limitations.
-            If a user's request involves searching the web, general knowledge, or up-to-date information, use the search_agent to provide the most relevant and current results.
-            If a user's request involves fetching or extracting content from a specific web page or URL, use the websurf_agent to retrieve and present the information."""
+            """ + "\n            ".join(DELEGATION_HINTS[sub_agent.name] for sub_agent in sub_agents if sub_agent.name in DELEGATION_HINTS)
     ),
     #tools=[update_state, update_user_preference],
-    sub_agents=[OS_Agent, Weather_Agent, Search_Agent, Websurf_Agent],
-    before_model_callback=block_keyword_guardrail,
-    before_tool_callback=block_city_weather_tool_guardrail
+    sub_agents=sub_agents,
+    before_model_callback=chain_callbacks(block_keyword_guardrail, model_rate_limit.before_model_callback, context_compactor.before_model_callback),
+    after_model_callback=record_llm_usage,
+    before_tool_callback=chain_callbacks(tool_policy_guardrail)
 )
@@ -0,0 +1,35 @@
+"""This module provides helpers to attach several callbacks to the same agent hook."""
+
+import inspect
+from typing import Any, Callable, Optional
+from src.agents.tracing import tracer
+
+
+def callback_name(callback: Callable[..., Any]) -> str:
+    """Span name of a callback, e.g. 'block_keyword_guardrail' or 'TokenBucket.before_model_callback[model]'."""
+    name = getattr(callback, "__qualname__", type(callback).__name__)
+    owner = getattr(getattr(callback, "__self__", None), "name", None)
+    return f"{name}[{owner}]" if owner else name
+
+
+def chain_callbacks(*callbacks: Callable[..., Any]) -> Callable[..., Any]:
+    """Combines ADK callbacks into one: they run in order and the first non-None result is returned.
+
+    A callback returning a result (e.g. a blocking `LlmResponse` or a cached tool result) skips the
+    remaining ones, so cheap checks such as guardrails and caches should come first. Sync and async
+    callbacks can be mixed. Each callback runs in its own 'callback <name>' tracing span.
+    """
+    names = [f"callback {callback_name(callback)}" for callback in callbacks]
+
+    async def chained(**kwargs: Any) -> Optional[Any]:
+        for name, callback in zip(names, callbacks):
+            with tracer.start_as_current_span(name) as span:
+                result = callback(**kwargs)
+                if inspect.isawaitable(result):
+                    result = await result
+                if result is not None:
+                    span.set_attribute("callback.short_circuit", True)
+                    return result
+        return None
+
+    return chained
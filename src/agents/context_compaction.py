@@ -0,0 +1,282 @@
+"""This module provides history compaction for the model requests of long sessions.
+
+ADK rebuilds every model request from the whole session history, so prompts grow with the age of the
+session. Before each model call the request is compacted: the last COMPACTION_KEEP_TURNS turns are
+sent verbatim, older turns are replaced by a rolling summary kept in the session state, and bulky
+tool outputs (file contents, web pages, search results) of past turns are cut once they have been
+used. The summary is extended every COMPACTION_SUMMARY_BATCH turns, with the model or, with
+COMPACTION_SUMMARIZER=extractive, with a cheap local digest. The summary model is resolved like an agent's
+(`agent_model('COMPACTION_SUMMARY', ...)`, so COMPACTION_SUMMARY_FALLBACK_MODELS and the deadline settings
+apply); a call taking longer than COMPACTION_SUMMARY_TIMEOUT seconds or failing falls back to the local
+digest, so that it never holds up the request. The session itself is never modified.
+
+A session store loading only the recent events of a session sets `state[UNLOADED_TURNS_STATE_KEY]` to
+the number of turns left out, so that the summary keeps counting turns from the start of the session.
+"""
+
+import asyncio
+import json
+import logging
+import os
+from typing import Any, Optional, Union
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.registry import LLMRegistry
+from google.genai import types
+from opentelemetry import trace
+from src.agents.models import agent_model
+from src.agents.rate_limits import model_rate_limit
+from src.agents.tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+COMPACTION_ENABLED = os.getenv("COMPACTION_ENABLED", "true").lower() in ("1", "true", "yes")
+COMPACTION_KEEP_TURNS = int(os.getenv("COMPACTION_KEEP_TURNS", 6))
+COMPACTION_SUMMARY_BATCH = int(os.getenv("COMPACTION_SUMMARY_BATCH", 4))
+COMPACTION_MAX_TOOL_OUTPUT_CHARS = int(os.getenv("COMPACTION_MAX_TOOL_OUTPUT_CHARS", 2000))
+COMPACTION_SUMMARIZER = os.getenv("COMPACTION_SUMMARIZER", "model").lower()
+COMPACTION_SUMMARY_TIMEOUT = float(os.getenv("COMPACTION_SUMMARY_TIMEOUT", 10))
+COMPACTION_SUMMARY_MAX_CHARS = int(os.getenv("COMPACTION_SUMMARY_MAX_CHARS", 4000))
+
+SUMMARY_STATE_PREFIX = "conversation_summary:"
+UNLOADED_TURNS_STATE_KEY = "temp:unloaded_turns"
+FOREIGN_EVENT_MARKER = "For context:"
+PREVIEW_CHARS = 200
+
+SUMMARY_INSTRUCTION = (
+    "You maintain a running summary of a conversation between a user and an assistant. "
+    "Update the summary with the new turns: keep the user's goals, preferences, names, places, file paths, URLs, "
+    "decisions and facts that later questions may refer to; drop greetings and raw tool output. "
+    "Answer with the updated summary only, in at most {max_chars} characters."
+)
+
+
+def is_turn_start(content: types.Content) -> bool:
+    """A turn starts with a user message: neither a tool result nor another agent's reply passed as context."""
+    if content.role != "user" or not content.parts:
+        return False
+    if any(part.function_response for part in content.parts):
+        return False
+    return content.parts[0].text != FOREIGN_EVENT_MARKER
+
+
+def split_turns(contents: list[types.Content]) -> list[list[types.Content]]:
+    """Groups request contents into turns. Contents before the first user message form their own turn."""
+    turns: list[list[types.Content]] = []
+    for content in contents:
+        if not turns or is_turn_start(content):
+            turns.append([])
+        turns[-1].append(content)
+    return turns
+
+
+def content_chars(contents: list[types.Content]) -> int:
+    """Approximate size of contents in characters, as sent to the model."""
+    size = 0
+    for content in contents:
+        for part in content.parts or []:
+            if part.text:
+                size += len(part.text)
+            elif part.function_call:
+                size += len(part.function_call.name or "") + len(json.dumps(part.function_call.args or {}, default=str))
+            elif part.function_response:
+                size += len(part.function_response.name or "") + len(json.dumps(part.function_response.response or {}, default=str))
+    return size
+
+
+def _cut(text: str, max_chars: int) -> str:
+    return text if len(text) <= max_chars else f"{text[:max_chars]}... [{len(text) - max_chars} characters dropped after use]"
+
+
+def trim_tool_outputs(content: types.Content, max_chars: int) -> types.Content:
+    """Returns `content` with tool results (and other agents' tool results passed as context) over `max_chars` cut to a preview."""
+    parts = []
+    changed = False
+    for part in content.parts or []:
+        response = part.function_response
+        if response is not None:
+            serialized = json.dumps(response.response or {}, default=str)
+            if len(serialized) > max_chars:
+                part = types.Part(function_response=types.FunctionResponse(
+                    id=response.id,
+                    name=response.name,
+                    response={"compacted": f"{len(serialized)} characters of output dropped after use.", "preview": serialized[:PREVIEW_CHARS]}
+                ))
+                changed = True
+        elif part.text and len(part.text) > max_chars and content.parts[0].text == FOREIGN_EVENT_MARKER:
+            part = types.Part(text=_cut(part.text, PREVIEW_CHARS))
+            changed = True
+        parts.append(part)
+    return types.Content(role=content.role, parts=parts) if changed else content
+
+
+def render_turns(turns: list[list[types.Content]]) -> str:
+    """Plain text transcript of turns for the summarizer, with tool payloads shortened."""
+    lines = []
+    for turn in turns:
+        for content in turn:
+            for part in content.parts or []:
+                if part.text:
+                    if part.text == FOREIGN_EVENT_MARKER:
+                        continue
+                    speaker = "User" if content.role == "user" and content.parts[0].text != FOREIGN_EVENT_MARKER else "Assistant"
+                    lines.append(f"{speaker}: {_cut(part.text, 500)}")
+                elif part.function_call:
+                    lines.append(f"Assistant called {part.function_call.name}({json.dumps(part.function_call.args or {}, default=str)})")
+                elif part.function_response:
+                    result = json.dumps(part.function_response.response or {}, default=str)
+                    lines.append(f"{part.function_response.name} returned: {_cut(result, 300)}")
+    return "\n".join(lines)
+
+
+def extractive_summary(previous: str, turns: list[list[types.Content]], max_chars: int) -> str:
+    """Cheap local summary: the user's requests and the final answers of the turns, most recent kept when over `max_chars`."""
+    lines = [previous] if previous else []
+    for turn in turns:
+        request = next((part.text for part in turn[0].parts or [] if part.text), None) if is_turn_start(turn[0]) else None
+        answer = None
+        for content in reversed(turn):
+            if content.role == "model":
+                answer = next((part.text for part in content.parts or [] if part.text), None)
+                if answer:
+                    break
+        if request:
+            lines.append(f"- User asked: {_cut(request, 200)}")
+        if answer:
+            lines.append(f"  Answer: {_cut(answer, 300)}")
+    summary = "\n".join(lines)
+    return summary if len(summary) <= max_chars else summary[-max_chars:]
+
+
+class ContextCompactor:
+    """Before-model callback keeping the model request within a window of recent turns plus a rolling summary."""
+
+    def __init__(self, keep_turns: int = 6, summary_batch: int = 4, max_tool_output_chars: int = 2000,
+                 summarizer: str = "model", summary_model: Union[str, BaseLlm] = "gemini-2.0-flash", summary_max_chars: int = 4000,
+                 enabled: bool = True, summary_timeout: float = 10.0):
+        self.keep_turns = max(1, keep_turns)
+        self.summary_batch = max(1, summary_batch)
+        self.max_tool_output_chars = max_tool_output_chars
+        self.summarizer = summarizer
+        self.summary_model = summary_model
+        self.summary_max_chars = summary_max_chars
+        self.summary_timeout = summary_timeout
+        self.enabled = enabled
+
+        self.compacted_requests = 0
+        self.summaries = 0
+        self.summary_failures = 0
+        self.chars_saved = 0
+
+    @classmethod
+    def from_env(cls) -> "ContextCompactor":
+        """Builds a compactor from the COMPACTION_* environment variables."""
+        return cls(
+            keep_turns=COMPACTION_KEEP_TURNS,
+            summary_batch=COMPACTION_SUMMARY_BATCH,
+            max_tool_output_chars=COMPACTION_MAX_TOOL_OUTPUT_CHARS,
+            summarizer=COMPACTION_SUMMARIZER,
+            summary_model=agent_model("COMPACTION_SUMMARY", "compaction_summary"),
+            summary_max_chars=COMPACTION_SUMMARY_MAX_CHARS,
+            enabled=COMPACTION_ENABLED,
+            summary_timeout=COMPACTION_SUMMARY_TIMEOUT,
+        )
+
+    async def summarize(self, previous: str, turns: list[list[types.Content]]) -> str:
+        """Extends the `previous` summary with `turns`, falling back to the extractive summary if the model call fails or times out."""
+        if self.summarizer != "model":
+            return extractive_summary(previous, turns, self.summary_max_chars)
+        llm = self.summary_model if isinstance(self.summary_model, BaseLlm) else LLMRegistry.new_llm(self.summary_model)
+        transcript = render_turns(turns)
+        prompt = f"Current summary:\n{previous or '(empty)'}\n\nNew turns:\n{transcript}"
+        request = LlmRequest(
+            model=llm.model,
+            contents=[types.Content(role="user", parts=[types.Part(text=prompt)])],
+            config=types.GenerateContentConfig(system_instruction=SUMMARY_INSTRUCTION.format(max_chars=self.summary_max_chars)),
+        )
+        with tracer.start_as_current_span("compaction_summary", attributes={"turns": len(turns), "model": llm.model}):
+            try:
+                text = ""
+                async with asyncio.timeout(self.summary_timeout if self.summary_timeout > 0 else None):
+                    if not await model_rate_limit.acquire():
+                        raise RuntimeError(f"rate limit of '{model_rate_limit.name}' exceeded")
+                    async for response in llm.generate_content_async(request, stream=False):
+                        if response.content and response.content.parts:
+                            text += "".join(part.text for part in response.content.parts if part.text)
+                if not text.strip():
+                    raise RuntimeError("empty summary")
+                return text.strip()[:self.summary_max_chars]
+            except Exception as e:
+                self.summary_failures += 1
+                logger.error("Could not summarize %d turns with '%s', using an extractive summary: %r", len(turns), llm.model, e)
+                return extractive_summary(previous, turns, self.summary_max_chars)
+
+    async def compact(self, llm_request: LlmRequest, state: Any, key: str) -> Optional[dict[str, int]]:
+        """Compacts `llm_request.contents` in place, reading and updating the summary at `state[key]`. Returns sizes, or None if unchanged."""
+        turns = split_turns(llm_request.contents)
+        before = content_chars(llm_request.contents)
+
+        # Tool outputs of past turns have been used already; the current turn keeps them whole.
+        if self.max_tool_output_chars > 0:
+            turns = [
+                [trim_tool_outputs(content, self.max_tool_output_chars) for content in turn] if index < len(turns) - 1 else turn
+                for index, turn in enumerate(turns)
+            ]
+
+        stored = state.get(key) or {}
+        # Turns of the session that are not in the request at all; the stored count includes them.
+        unloaded = state.get(UNLOADED_TURNS_STATE_KEY) or 0
+        summary, summarized = stored.get("text", ""), max(0, stored.get("turns", 0) - unloaded)
+        if summarized > len(turns):
+            # The summary was written for another view of the session (e.g. before a session copy); start over.
+            summary, summarized = "", 0
+        pending = len(turns) - self.keep_turns - summarized
+        if pending >= self.summary_batch:
+            summary = await self.summarize(summary, turns[summarized:summarized + pending])
+            summarized += pending
+            state[key] = {"text": summary, "turns": unloaded + summarized}
+            self.summaries += 1
+
+        contents = []
+        if summary and summarized:
+            contents.append(types.Content(role="user", parts=[types.Part(text=f"Summary of the earlier conversation:\n{summary}")]))
+        for turn in turns[summarized:]:
+            contents.extend(turn)
+        after = content_chars(contents)
+        if after >= before:
+            return None
+        llm_request.contents = contents
+        self.compacted_requests += 1
+        self.chars_saved += before - after
+        return {"turns": len(turns), "summarized_turns": summarized, "chars_before": before, "chars_after": after}
+
+    # --- ADK callback ---
+    async def before_model_callback(self, callback_context: CallbackContext, llm_request: LlmRequest) -> None:
+        """Compacts the history of the model request; the rolling summary is stored per agent in the session state."""
+        if not self.enabled or not llm_request.contents:
+            return None
+        result = await self.compact(llm_request, callback_context.state, f"{SUMMARY_STATE_PREFIX}{callback_context.agent_name}")
+        if result is not None:
+            span = trace.get_current_span()
+            for name, value in result.items():
+                span.set_attribute(f"compaction.{name}", value)
+            logger.info(
+                "Compacted the history of %s: %d turns (%d summarized), %d -> %d characters.",
+                callback_context.agent_name, result["turns"], result["summarized_turns"], result["chars_before"], result["chars_after"]
+            )
+        return None
+
+    def stats(self) -> dict[str, Any]:
+        """Compaction counters."""
+        return {
+            "enabled": self.enabled,
+            "keep_turns": self.keep_turns,
+            "compacted_requests": self.compacted_requests,
+            "summaries": self.summaries,
+            "summary_failures": self.summary_failures,
+            "chars_saved": self.chars_saved,
+        }
+
+
+context_compactor = ContextCompactor.from_env()
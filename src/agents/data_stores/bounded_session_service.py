@@ -0,0 +1,271 @@
+"""This module provides an in-memory session service with bounded memory use.
+
+`InMemorySessionService` keeps every session it ever created, with its whole history, until the
+process restarts. `BoundedSessionService` keeps the same behaviour for live sessions but:
+
+- expires sessions idle for more than `ttl` seconds, checked by a background sweeper every `sweep_interval`;
+- evicts the least recently used sessions beyond `max_sessions`;
+- keeps at most `max_events` events per session, dropping the oldest turns (the number of turns dropped
+  is kept in `state[UNLOADED_TURNS_STATE_KEY]`, so the context compaction summary keeps counting them);
+- with `spill_dir`, writes expired and evicted sessions to disk as JSON and loads them back when they are
+  requested again, so that they stay resumable.
+
+Sizes are estimated from the serialized events and reported with the counters by `stats()`.
+"""
+
+import asyncio
+import copy
+import hashlib
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+from google.adk.events import Event
+from google.adk.sessions import InMemorySessionService, Session
+from google.adk.sessions.base_session_service import GetSessionConfig
+from src.agents.context_compaction import UNLOADED_TURNS_STATE_KEY
+
+logger = logging.getLogger(__name__)
+
+SessionKey = tuple[str, str, str]
+
+
+def event_size(event: Event) -> int:
+    return len(event.model_dump_json(exclude_none=True))
+
+
+class BoundedSessionService(InMemorySessionService):
+    """In-memory sessions with idle expiry, LRU eviction, a per-session event cap and an optional disk tier."""
+
+    def __init__(self, ttl: float = 3600.0, max_sessions: int = 10000, max_events: int = 1000, sweep_interval: float = 60.0,
+                 spill_dir: str = ""):
+        super().__init__()
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.max_events = max_events
+        self.sweep_interval = sweep_interval
+        self.spill_dir = spill_dir
+        if spill_dir:
+            os.makedirs(spill_dir, exist_ok=True)
+
+        # Last access (monotonic) of every session held in memory, least recently used first.
+        self._accessed: OrderedDict[SessionKey, float] = OrderedDict()
+        self._sizes: dict[SessionKey, int] = {}
+        # Sessions being written to disk, still restorable from memory until the write completes.
+        self._spilling: dict[SessionKey, Session] = {}
+        self._sweeper: Optional[asyncio.Task] = None
+
+        self.expired = 0
+        self.evicted = 0
+        self.spilled = 0
+        self.restored = 0
+        self.trimmed_events = 0
+
+    # --- Bookkeeping ---
+    def _stored(self, key: SessionKey) -> Optional[Session]:
+        app_name, user_id, session_id = key
+        return self.sessions.get(app_name, {}).get(user_id, {}).get(session_id)
+
+    def _touch(self, key: SessionKey) -> None:
+        self._accessed[key] = time.monotonic()
+        self._accessed.move_to_end(key)
+
+    def _insert(self, session: Session) -> SessionKey:
+        key = (session.app_name, session.user_id, session.id)
+        self.sessions.setdefault(session.app_name, {}).setdefault(session.user_id, {})[session.id] = session
+        self._sizes[key] = sum(event_size(event) for event in session.events)
+        self._touch(key)
+        return key
+
+    def _forget(self, key: SessionKey) -> Optional[Session]:
+        """Removes a session from memory, pruning the emptied user and app maps, and returns it."""
+        app_name, user_id, session_id = key
+        self._accessed.pop(key, None)
+        self._sizes.pop(key, None)
+        users = self.sessions.get(app_name, {})
+        session = users.get(user_id, {}).pop(session_id, None)
+        if user_id in users and not users[user_id]:
+            del users[user_id]
+        if app_name in self.sessions and not self.sessions[app_name]:
+            del self.sessions[app_name]
+        return session
+
+    def _spill_path(self, key: SessionKey) -> str:
+        return os.path.join(self.spill_dir, hashlib.sha1("\0".join(key).encode()).hexdigest() + ".json")
+
+    async def _drop(self, key: SessionKey) -> None:
+        """Takes a session out of memory, to disk when spilling is enabled."""
+        session = self._forget(key)
+        if session is None or not self.spill_dir:
+            return
+        data = session.model_dump_json(exclude_none=True)
+        path = self._spill_path(key)
+        self._spilling[key] = session
+        await asyncio.to_thread(self._write_file, path, data)
+        if self._spilling.pop(key, None) is not session:
+            # Requested (or deleted) again during the write.
+            await asyncio.to_thread(self._remove_file, path)
+            return
+        self.spilled += 1
+
+    @staticmethod
+    def _write_file(path: str, data: str) -> None:
+        temporary = f"{path}.tmp"
+        with open(temporary, "w", encoding="utf-8") as file:
+            file.write(data)
+        os.replace(temporary, path)
+
+    async def _restore(self, key: SessionKey) -> Optional[Session]:
+        """Loads a spilled session back into memory, or None if it was never spilled."""
+        if not self.spill_dir:
+            return None
+        session = self._spilling.pop(key, None)
+        if session is not None:
+            self._insert(session)
+            return session
+        path = self._spill_path(key)
+
+        def read() -> Optional[str]:
+            try:
+                with open(path, encoding="utf-8") as file:
+                    return file.read()
+            except FileNotFoundError:
+                return None
+
+        data = await asyncio.to_thread(read)
+        if data is None:
+            return None
+        session = Session.model_validate_json(data)
+        await asyncio.to_thread(self._remove_file, path)
+        self._insert(session)
+        self.restored += 1
+        await self._enforce_max_sessions()
+        return session
+
+    @staticmethod
+    def _remove_file(path: str) -> None:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    async def _enforce_max_sessions(self) -> None:
+        while self.max_sessions > 0 and len(self._accessed) > self.max_sessions:
+            key = next(iter(self._accessed))
+            await self._drop(key)
+            self.evicted += 1
+
+    def _trim(self, key: SessionKey, session: Session) -> None:
+        """Drops the oldest events beyond `max_events`, keeping the remaining ones starting at a user message."""
+        if self.max_events <= 0 or len(session.events) <= self.max_events:
+            return
+        kept = session.events[-self.max_events:]
+        start = next((index for index, event in enumerate(kept) if event.author == "user"), 0)
+        cut = len(session.events) - len(kept) + start
+        dropped = session.events[:cut]
+        session.events = session.events[cut:]
+        session.state[UNLOADED_TURNS_STATE_KEY] = (
+            (session.state.get(UNLOADED_TURNS_STATE_KEY) or 0) + sum(event.author == "user" for event in dropped)
+        )
+        self._sizes[key] -= sum(event_size(event) for event in dropped)
+        self.trimmed_events += len(dropped)
+
+    # --- Expiry ---
+    def _ensure_sweeper(self) -> None:
+        if self.ttl > 0 and (self._sweeper is None or self._sweeper.done()):
+            self._sweeper = asyncio.create_task(self._sweep_loop(), name="session-sweeper")
+
+    async def _sweep_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            try:
+                await self.sweep()
+            except Exception as e:
+                logger.error(f"Session sweep failed, will retry: {e}")
+
+    async def sweep(self) -> int:
+        """Expires the sessions idle for more than `ttl` seconds and returns their number."""
+        if self.ttl <= 0:
+            return 0
+        deadline = time.monotonic() - self.ttl
+        idle = []
+        # Least recently used first, so the scan stops at the first session still in use.
+        for key, accessed in self._accessed.items():
+            if accessed > deadline:
+                break
+            idle.append(key)
+        for key in idle:
+            await self._drop(key)
+        self.expired += len(idle)
+        if idle:
+            logger.info(f"Expired {len(idle)} idle sessions.")
+        return len(idle)
+
+    # --- BaseSessionService ---
+    async def create_session(self, *, app_name: str, user_id: str, state: Optional[dict[str, Any]] = None, session_id: Optional[str] = None) -> Session:
+        session = await super().create_session(app_name=app_name, user_id=user_id, state=state, session_id=session_id)
+        key = (app_name, user_id, session.id)
+        self._sizes[key] = 0
+        self._touch(key)
+        self._ensure_sweeper()
+        await self._enforce_max_sessions()
+        return session
+
+    async def get_session(self, *, app_name: str, user_id: str, session_id: str, config: Optional[GetSessionConfig] = None) -> Optional[Session]:
+        key = (app_name, user_id, session_id)
+        if key in self._accessed:
+            self._touch(key)
+        elif await self._restore(key) is None:
+            return None
+        return await super().get_session(app_name=app_name, user_id=user_id, session_id=session_id, config=config)
+
+    async def delete_session(self, *, app_name: str, user_id: str, session_id: str) -> None:
+        key = (app_name, user_id, session_id)
+        self._forget(key)
+        self._spilling.pop(key, None)
+        if self.spill_dir:
+            await asyncio.to_thread(self._remove_file, self._spill_path(key))
+
+    async def append_event(self, session: Session, event: Event) -> Event:
+        key = (session.app_name, session.user_id, session.id)
+        if event.partial:
+            return event
+        if key not in self._accessed and await self._restore(key) is None:
+            # Expired or evicted while a request was running on it: the caller's copy is the latest one.
+            self._insert(copy.deepcopy(session))
+        await super().append_event(session=session, event=event)
+        stored = self._stored(key)
+        self._sizes[key] += event_size(event)
+        self._touch(key)
+        self._trim(key, stored)
+        return event
+
+    async def close(self) -> None:
+        """Stops the sweeper; with spilling enabled, writes the sessions still in memory to disk."""
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            try:
+                await self._sweeper
+            except asyncio.CancelledError:
+                pass
+            self._sweeper = None
+        if self.spill_dir:
+            for key in list(self._accessed):
+                await self._drop(key)
+
+    def stats(self) -> dict[str, Any]:
+        """Memory gauges and expiry, eviction and spill counters. `approx_bytes` is the serialized size of the events held."""
+        return {
+            "sessions": len(self._accessed),
+            "max_sessions": self.max_sessions,
+            "events": sum(len(session.events) for users in self.sessions.values() for sessions in users.values() for session in sessions.values()),
+            "approx_bytes": sum(self._sizes.values()),
+            "ttl_s": self.ttl,
+            "max_events": self.max_events,
+            "expired": self.expired,
+            "evicted": self.evicted,
+            "trimmed_events": self.trimmed_events,
+            "spilled": self.spilled,
+            "restored": self.restored,
+        }
@@ -0,0 +1,251 @@
+"""This module provides a caching, write-behind session service in front of the SQL session store.
+
+Hot sessions are kept in a small in-process LRU so the `get_session` call made on every '/chat' request
+is usually served from memory. Appended events are applied to the cached session immediately and
+persisted in batches by a background flusher task, which sleeps while nothing is pending. When the store
+fails, flushes are retried with exponential backoff; appends then wait once `max_pending` events are queued
+and fail after `max_pending_wait` seconds, so memory stays bounded during an outage.
+
+With `cache_reads=False` (stateless multi-worker deployments, where the next request of a session may
+land on another worker) sessions are always loaded from the store and the caller flushes at the end of
+each request, so only the batching of writes within a request is kept.
+"""
+
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Any, Optional
+from google.adk.events import Event
+from google.adk.sessions import Session
+from google.adk.sessions.base_session_service import BaseSessionService, GetSessionConfig, ListSessionsResponse
+from google.adk.sessions.state import State
+from src.agents.data_stores.sql_session_service import SqlSessionService
+
+logger = logging.getLogger(__name__)
+
+SessionKey = tuple[str, str, str]
+
+
+class CachedSessionService(BaseSessionService):
+    """LRU cache of hot sessions with write-behind batching of appended events and state deltas."""
+
+    def __init__(self, store: SqlSessionService, max_sessions: int = 1024, flush_interval: float = 0.05, max_batch: int = 64,
+                 cache_reads: bool = True, max_pending: int = 10000, max_pending_wait: float = 5.0, max_backoff: float = 30.0):
+        self.store = store
+        self.cache_reads = cache_reads
+        self.max_sessions = max_sessions
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.max_pending = max_pending
+        self.max_pending_wait = max_pending_wait
+        self.max_backoff = max_backoff
+
+        self._sessions: OrderedDict[SessionKey, Session] = OrderedDict()
+        self._pending: dict[SessionKey, tuple[Session, list[Event]]] = {}
+        self._pending_count = 0
+        # Sessions whose events are being written by `flush`, no longer in `_pending` but not in the store yet.
+        self._inflight: set[SessionKey] = set()
+        self._flush_lock = asyncio.Lock()
+        # Set on every append (ends the flusher's idle wait) and when a batch is full (ends the batching window).
+        self._appended: Optional[asyncio.Event] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        # Set whenever pending events were written or dropped, for appends waiting on `max_pending`.
+        self._drained = asyncio.Event()
+        self._flusher: Optional[asyncio.Task] = None
+
+        self.hits = 0
+        self.misses = 0
+        self.flushes = 0
+        self.flushed_events = 0
+        self.failed_flushes = 0
+        self.throttled = 0
+
+    # --- Cache helpers ---
+    def _remember(self, session: Session) -> Session:
+        key = (session.app_name, session.user_id, session.id)
+        self._sessions[key] = session
+        self._sessions.move_to_end(key)
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+        return session
+
+    def _apply_scoped_delta(self, source: Session, event: Event) -> None:
+        """Propagates app and user scoped state changes to the other cached sessions that share them."""
+        if not event.actions or not event.actions.state_delta:
+            return
+        scoped = {
+            key: value for key, value in event.actions.state_delta.items()
+            if key.startswith(State.APP_PREFIX) or key.startswith(State.USER_PREFIX)
+        }
+        if not scoped:
+            return
+        for session in self._sessions.values():
+            if session is source or session.app_name != source.app_name:
+                continue
+            for key, value in scoped.items():
+                if key.startswith(State.APP_PREFIX) or session.user_id == source.user_id:
+                    session.state[key] = value
+
+    # --- BaseSessionService ---
+    async def create_session(self, *, app_name: str, user_id: str, state: Optional[dict[str, Any]] = None, session_id: Optional[str] = None) -> Session:
+        # Creation is written through so that other workers sharing the store can see the session.
+        session = await self.store.create_session(app_name=app_name, user_id=user_id, state=state, session_id=session_id)
+        return self._remember(session)
+
+    async def get_session(self, *, app_name: str, user_id: str, session_id: str, config: Optional[GetSessionConfig] = None) -> Optional[Session]:
+        key = (app_name, user_id, session_id)
+        if self.cache_reads and config is None and key in self._sessions:
+            self.hits += 1
+            self._sessions.move_to_end(key)
+            return self._sessions[key]
+
+        self.misses += 1
+        if key in self._pending or key in self._inflight:
+            # Waits for the write in progress (flush holds its lock while writing) and writes what is left.
+            await self.flush()
+        session = await self.store.get_session(app_name=app_name, user_id=user_id, session_id=session_id, config=config)
+        if session is not None and config is None:
+            self._remember(session)
+        return session
+
+    async def load_older_events(self, session: Session, limit: Optional[int] = None) -> int:
+        """See `SqlSessionService.load_older_events`; the cached session is extended in place."""
+        return await self.store.load_older_events(session, limit)
+
+    async def list_sessions(self, *, app_name: str, user_id: str) -> ListSessionsResponse:
+        await self.flush()
+        return await self.store.list_sessions(app_name=app_name, user_id=user_id)
+
+    async def delete_session(self, *, app_name: str, user_id: str, session_id: str) -> None:
+        key = (app_name, user_id, session_id)
+        self._sessions.pop(key, None)
+        pending = self._pending.pop(key, None)
+        if pending:
+            self._pending_count -= len(pending[1])
+            self._drained.set()
+        await self.store.delete_session(app_name=app_name, user_id=user_id, session_id=session_id)
+
+    async def append_event(self, session: Session, event: Event) -> Event:
+        if event.partial:
+            return event
+        self._ensure_flusher()
+        await self._wait_for_room()
+        await super().append_event(session=session, event=event)
+        self._remember(session)
+        self._apply_scoped_delta(session, event)
+
+        key = (session.app_name, session.user_id, session.id)
+        _, events = self._pending.setdefault(key, (session, []))
+        self._pending[key] = (session, events)
+        events.append(event)
+        self._pending_count += 1
+
+        self._appended.set()
+        if self._pending_count >= self.max_batch:
+            self._wakeup.set()
+        return event
+
+    # --- Write-behind ---
+    def _ensure_flusher(self) -> None:
+        if self._flusher is None or self._flusher.done():
+            self._appended = asyncio.Event()
+            self._wakeup = asyncio.Event()
+            self._flusher = asyncio.create_task(self._flush_loop(), name="session-write-behind")
+
+    async def _wait_for_room(self) -> None:
+        """Backpressure: waits while `max_pending` events are queued, raises if they are not written in time."""
+        if self.max_pending <= 0 or self._pending_count < self.max_pending:
+            return
+        self.throttled += 1
+        self._wakeup.set()
+        try:
+            async with asyncio.timeout(self.max_pending_wait):
+                while self._pending_count >= self.max_pending:
+                    self._drained.clear()
+                    await self._drained.wait()
+        except TimeoutError:
+            raise RuntimeError(
+                f"Session store is not keeping up: {self._pending_count} events still pending after {self.max_pending_wait} s."
+            ) from None
+
+    async def _flush_loop(self) -> None:
+        failures = 0
+        while True:
+            if not self._pending:
+                # Nothing to write: sleep until the next append instead of waking every flush_interval.
+                self._appended.clear()
+                await self._appended.wait()
+            if failures:
+                await asyncio.sleep(min(self.max_backoff, self.flush_interval * 2 ** failures))
+            else:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                failures += 1
+                self.failed_flushes += 1
+                # Logged on the 1st, 2nd, 4th, 8th... consecutive failure, not on every retry.
+                if failures & (failures - 1) == 0:
+                    logger.error(f"Write-behind flush failed {failures} times in a row, {self._pending_count} events pending: {e}")
+                continue
+            if failures:
+                logger.warning(f"Write-behind flush recovered after {failures} failed attempts.")
+                failures = 0
+
+    async def flush(self) -> None:
+        """Writes every pending event batch to the store."""
+        async with self._flush_lock:
+            if not self._pending:
+                return
+            pending, self._pending = self._pending, {}
+            self._pending_count = 0
+            self._inflight = set(pending)
+
+            try:
+                await self.store.write_batches(list(pending.values()))
+            except Exception:
+                # Put the batches back in front of anything appended meanwhile.
+                for key, (session, events) in pending.items():
+                    _, newer = self._pending.get(key, (session, []))
+                    self._pending[key] = (session, events + newer)
+                    self._pending_count += len(events)
+                raise
+            finally:
+                self._inflight = set()
+            self._drained.set()
+            self.flushes += 1
+            self.flushed_events += sum(len(events) for _, events in pending.values())
+
+    async def close(self) -> None:
+        """Stops the flusher, writes the remaining events and closes the store."""
+        if self._flusher is not None:
+            self._flusher.cancel()
+            try:
+                await self._flusher
+            except asyncio.CancelledError:
+                pass
+            self._flusher = None
+        await self.flush()
+        await self.store.close()
+
+    def stats(self) -> dict[str, Any]:
+        """Cache and write-behind counters."""
+        lookups = self.hits + self.misses
+        return {
+            "cache_reads": self.cache_reads,
+            "cached_sessions": len(self._sessions),
+            "max_sessions": self.max_sessions,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "pending_events": self._pending_count,
+            "flushes": self.flushes,
+            "flushed_events": self.flushed_events,
+            "failed_flushes": self.failed_flushes,
+            "throttled_appends": self.throttled,
+            "store": self.store.stats(),
+        }
@@ -0,0 +1,136 @@
+"""This module provides a cached index of directory entries for the OS tools.
+
+Each directory is scanned once with `os.scandir` (name, type, size and modification time of every
+entry) and served from memory while the directory's own modification time is unchanged, i.e. no
+entry was added, removed or renamed. Repeated listings and searches of the same tree then cost one
+`stat` per directory instead of one per entry. A file rewritten or appended in place does not change
+its directory, so the tools re-stat the files whose size or time they sort on or report (`refresh`).
+The index is off unless OS_INDEX_ENABLED is set, and keeps at most OS_INDEX_MAX_DIRECTORIES
+directories (LRU).
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+from typing import Any, Optional
+
+OS_INDEX_ENABLED = os.getenv("OS_INDEX_ENABLED", "false").lower() in ("1", "true", "yes")
+OS_INDEX_MAX_DIRECTORIES = int(os.getenv("OS_INDEX_MAX_DIRECTORIES", 10000))
+
+
+@dataclass(frozen=True, slots=True)
+class FileEntry:
+    """One directory entry."""
+    name: str
+    path: str
+    kind: str
+    size: int
+    mtime: float
+
+    @property
+    def is_dir(self) -> bool:
+        return self.kind == "dir"
+
+
+def entry_kind(entry: os.DirEntry) -> str:
+    if entry.is_symlink():
+        return "link"
+    if entry.is_dir(follow_symlinks=False):
+        return "dir"
+    return "file" if entry.is_file(follow_symlinks=False) else "other"
+
+
+def scan_directory(path: str) -> list[FileEntry]:
+    """Lists a directory with `os.scandir`. Entries that vanish during the scan are skipped."""
+    entries = []
+    with os.scandir(path) as iterator:
+        for entry in iterator:
+            try:
+                stat = entry.stat(follow_symlinks=False)
+            except OSError:
+                continue
+            kind = entry_kind(entry)
+            entries.append(FileEntry(entry.name, entry.path, kind, 0 if kind == "dir" else stat.st_size, stat.st_mtime))
+    return entries
+
+
+class FileIndex:
+    """LRU of directory listings invalidated by the directory's modification time."""
+
+    def __init__(self, max_directories: int = 10000, enabled: bool = True):
+        self.max_directories = max_directories
+        self.enabled = enabled
+        self._directories: OrderedDict[str, tuple[int, list[FileEntry]]] = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.refreshed = 0
+
+    def entries(self, path: str) -> list[FileEntry]:
+        """Returns the entries of the directory at `path`, rescanning it only if it changed. Raises OSError like `os.scandir`."""
+        if not self.enabled:
+            return scan_directory(path)
+        key = os.path.abspath(path)
+        mtime = os.stat(key).st_mtime_ns
+        with self._lock:
+            cached = self._directories.get(key)
+            if cached is not None and cached[0] == mtime:
+                self._directories.move_to_end(key)
+                self.hits += 1
+                return cached[1]
+            if cached is not None:
+                self.invalidations += 1
+            self.misses += 1
+
+        entries = scan_directory(path)
+        with self._lock:
+            self._directories[key] = (mtime, entries)
+            self._directories.move_to_end(key)
+            while len(self._directories) > self.max_directories:
+                self._directories.popitem(last=False)
+        return entries
+
+    def refresh(self, entries: list[FileEntry]) -> list[FileEntry]:
+        """The entries with the current size and modification time of their files (a cached listing may be older)."""
+        if not self.enabled:
+            return entries
+        fresh = []
+        for entry in entries:
+            if entry.kind == "file":
+                try:
+                    stat = os.stat(entry.path, follow_symlinks=False)
+                    entry = replace(entry, size=stat.st_size, mtime=stat.st_mtime)
+                except OSError:
+                    pass
+            fresh.append(entry)
+        with self._lock:
+            self.refreshed += len(entries)
+        return fresh
+
+    def invalidate(self, path: Optional[str] = None) -> None:
+        """Drops one directory, or the whole index."""
+        with self._lock:
+            if path is None:
+                self._directories.clear()
+            else:
+                self._directories.pop(os.path.abspath(path), None)
+
+    def stats(self) -> dict[str, Any]:
+        """Index counters."""
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "directories": len(self._directories),
+                "entries": sum(len(entries) for _, entries in self._directories.values()),
+                "max_directories": self.max_directories,
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "refreshed_entries": self.refreshed,
+            }
+
+
+file_index = FileIndex(max_directories=OS_INDEX_MAX_DIRECTORIES, enabled=OS_INDEX_ENABLED)
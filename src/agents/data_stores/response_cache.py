@@ -0,0 +1,241 @@
+"""This module provides a semantic cache of final agent responses, consulted before running the root agent.
+
+Queries are normalized and embedded, and a cached answer is returned when a previous query is similar
+enough. Queries whose answer depends on session state or on the moment they are asked (weather in the
+preferred unit, "my" files, the current time...) are never cached. Entries are kept per user.
+
+Blocked queries are never cached nor answered from the cache: a query matching the keyword guardrail is
+skipped on every lookup (so a reloaded keyword list applies to cached answers too), and a run that set a
+guardrail flag in the state (a `guardrail_` key, e.g. from a tool policy rule) is not stored. A cache hit
+does not run the agents; the caller records the query and the cached answer in the session.
+"""
+
+import hashlib
+import logging
+import math
+import os
+import re
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Optional
+from google.adk.events import Event
+from src.agents.security.keyword_matcher import keyword_guardrail
+
+logger = logging.getLogger(__name__)
+
+Embedder = Callable[[str], Awaitable[list[float]]]
+
+PUNCTUATION = re.compile(r"[^\w\s]")
+WHITESPACE = re.compile(r"\s+")
+TOKEN = re.compile(r"\w+")
+GUARDRAIL_STATE_PREFIX = "guardrail_"
+
+# Answers to these depend on session state, on the user's own data or on the current moment.
+STATE_DEPENDENT = re.compile(
+    r"\b(weather|temperature|forecast|celsius|fahrenheit|time|date|today|tonight|tomorrow|now|current|latest|"
+    r"i|me|my|mine|we|our|last|previous|again|prefer|preference|remember|"
+    r"file|files|folder|directory|path|cwd)\b"
+)
+
+
+def normalize_query(query: str) -> str:
+    """Casefolds the query and strips punctuation and redundant whitespace."""
+    return WHITESPACE.sub(" ", PUNCTUATION.sub(" ", query.casefold())).strip()
+
+
+def is_state_dependent(normalized_query: str) -> bool:
+    """Returns True if the answer to the (normalized) query may depend on state and must not be cached."""
+    return STATE_DEPENDENT.search(normalized_query) is not None
+
+
+def sets_guardrail_state(event: Event) -> bool:
+    """Whether the event records a guardrail flag in the state, i.e. a request or tool call of the run was blocked."""
+    delta = event.actions.state_delta if event.actions else None
+    return bool(delta) and any(key.startswith(GUARDRAIL_STATE_PREFIX) for key in delta)
+
+
+def l2_normalize(vector: list[float]) -> list[float]:
+    norm = math.sqrt(sum(value * value for value in vector))
+    return [value / norm for value in vector] if norm else vector
+
+
+class HashingEmbedder:
+    """Deterministic local embedding: hashed word and character trigram features.
+
+    It only captures lexical similarity but needs no network, which makes it the embedder for tests.
+    """
+
+    def __init__(self, dimensions: int = 512):
+        self.dimensions = dimensions
+
+    def _features(self, text: str) -> list[str]:
+        words = TOKEN.findall(text)
+        trigrams = [word[i:i + 3] for word in words for i in range(max(1, len(word) - 2))]
+        return [f"w:{word}" for word in words] + [f"c:{gram}" for gram in trigrams]
+
+    async def __call__(self, text: str) -> list[float]:
+        vector = [0.0] * self.dimensions
+        for feature in self._features(text):
+            digest = hashlib.blake2b(feature.encode(), digest_size=8).digest()
+            index = int.from_bytes(digest[:4], "little") % self.dimensions
+            vector[index] += 1.0 if digest[4] & 1 else -1.0
+        return l2_normalize(vector)
+
+
+class GeminiEmbedder:
+    """Embedding through the Gemini embeddings API. The client is created on first use."""
+
+    def __init__(self, model: str = "text-embedding-004"):
+        self.model = model
+        self._client = None
+
+    async def __call__(self, text: str) -> list[float]:
+        if self._client is None:
+            from google import genai
+            self._client = genai.Client()
+        response = await self._client.aio.models.embed_content(model=self.model, contents=text)
+        return l2_normalize(list(response.embeddings[0].values))
+
+
+@dataclass
+class CachedResponse:
+    """One cached answer."""
+    user_id: str
+    query: str
+    vector: list[float]
+    response: str
+    events: list[Any]
+    expires_at: float
+
+
+class ResponseCache:
+    """Bounded, TTL based semantic cache of final responses, partitioned by user."""
+
+    def __init__(self, embedder: Embedder, threshold: float = 0.92, ttl: float = 3600, max_entries: int = 1000, enabled: bool = True):
+        self.embedder = embedder
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self._entries: OrderedDict[tuple[str, str], CachedResponse] = OrderedDict()
+
+        self.lookups = 0
+        self.hits = 0
+        self.exact_hits = 0
+        self.skipped = 0
+        self.blocked = 0
+        self.stores = 0
+        self.errors = 0
+
+    @classmethod
+    def from_env(cls) -> "ResponseCache":
+        """Builds the cache from the RESPONSE_CACHE_* environment variables."""
+        embedder_name = os.getenv("RESPONSE_CACHE_EMBEDDER", "gemini").lower()
+        embedder = HashingEmbedder() if embedder_name == "hashing" else GeminiEmbedder(os.getenv("RESPONSE_CACHE_EMBEDDING_MODEL", "text-embedding-004"))
+        return cls(
+            embedder=embedder,
+            threshold=float(os.getenv("RESPONSE_CACHE_THRESHOLD", 0.92)),
+            ttl=float(os.getenv("RESPONSE_CACHE_TTL", 3600)),
+            max_entries=int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", 1000)),
+            enabled=os.getenv("RESPONSE_CACHE_ENABLED", "false").lower() in ("1", "true", "yes"),
+        )
+
+    def _expire(self, now: float) -> None:
+        for key in [key for key, entry in self._entries.items() if entry.expires_at < now]:
+            del self._entries[key]
+
+    async def _embed(self, normalized_query: str) -> Optional[list[float]]:
+        try:
+            return await self.embedder(normalized_query)
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"Response cache embedding failed: {e}")
+            return None
+
+    def _cacheable(self, query: str) -> Optional[str]:
+        """The normalized query if its answer may be cached, None for state dependent and blocked queries."""
+        normalized = normalize_query(query)
+        if not normalized or is_state_dependent(normalized):
+            self.skipped += 1
+            return None
+        if keyword_guardrail.find(query) is not None:
+            self.blocked += 1
+            return None
+        return normalized
+
+    async def lookup(self, query: str, user_id: str) -> Optional[CachedResponse]:
+        """Returns the cached answer of the user's most similar previous query above the threshold, or None."""
+        if not self.enabled:
+            return None
+        normalized = self._cacheable(query)
+        if normalized is None:
+            return None
+
+        self.lookups += 1
+        now = time.time()
+        self._expire(now)
+
+        entry = self._entries.get((user_id, normalized))
+        if entry is not None:
+            self._entries.move_to_end((user_id, normalized))
+            self.hits += 1
+            self.exact_hits += 1
+            return entry
+
+        candidates = [entry for (owner, _), entry in self._entries.items() if owner == user_id]
+        if not candidates:
+            return None
+        vector = await self._embed(normalized)
+        if vector is None:
+            return None
+        best, best_score = None, self.threshold
+        for candidate in candidates:
+            score = sum(a * b for a, b in zip(vector, candidate.vector))
+            if score >= best_score:
+                best, best_score = candidate, score
+        if best is None:
+            return None
+
+        logger.info(f"Response cache hit for '{query}' (similar to '{best.query}', score {best_score:.3f}).")
+        self._entries.move_to_end((user_id, normalize_query(best.query)))
+        self.hits += 1
+        return best
+
+    async def store(self, query: str, user_id: str, response: str, events: list[Any]) -> None:
+        """Caches the user's final response and events of a query that is neither state dependent nor blocked."""
+        if not self.enabled:
+            return
+        normalized = self._cacheable(query)
+        if normalized is None:
+            return
+        vector = await self._embed(normalized)
+        if vector is None:
+            return
+        key = (user_id, normalized)
+        self._entries[key] = CachedResponse(
+            user_id=user_id, query=query, vector=vector, response=response, events=list(events), expires_at=time.time() + self.ttl
+        )
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        self.stores += 1
+
+    def stats(self) -> dict[str, Any]:
+        """Hit rate and size counters."""
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "lookups": self.lookups,
+            "hits": self.hits,
+            "exact_hits": self.exact_hits,
+            "hit_rate": self.hits / self.lookups if self.lookups else 0.0,
+            "skipped_state_dependent": self.skipped,
+            "skipped_blocked": self.blocked,
+            "stores": self.stores,
+            "embedding_errors": self.errors,
+        }
+
+
+response_cache = ResponseCache.from_env()
@@ -0,0 +1,464 @@
+"""This module provides a SQLite backed session service with a small connection pool.
+
+The blocking sqlite3 calls run on worker threads through `asyncio.to_thread`, so the event loop is never
+stalled by disk I/O. Several uvicorn workers can share the same database file (WAL mode).
+
+Writes are incremental: events are appended, and the state keys changed by a batch of events are
+appended as one delta row per scope (session, user, app) instead of rewriting the whole state. A state is
+its snapshot (the `state` column of `sessions`, `user_states` or `app_states`) plus its deltas in order;
+once a scope has more than `snapshot_every` deltas they are folded into its snapshot, so the cost of a
+turn does not grow with the session. With `recent_events`, sessions are loaded with their last events
+only (starting at a user message); `load_older_events` fetches the older ones on demand.
+"""
+
+import asyncio
+import json
+import logging
+import queue
+import sqlite3
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, Optional, TypeVar
+from google.adk.events import Event
+from google.adk.sessions import Session
+from google.adk.sessions.base_session_service import BaseSessionService, GetSessionConfig, ListSessionsResponse
+from google.adk.sessions.state import State
+from src.agents.context_compaction import UNLOADED_TURNS_STATE_KEY
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    app_name TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    id TEXT NOT NULL,
+    state TEXT NOT NULL,
+    create_time REAL NOT NULL,
+    update_time REAL NOT NULL,
+    PRIMARY KEY (app_name, user_id, id)
+);
+CREATE TABLE IF NOT EXISTS events (
+    app_name TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    session_id TEXT NOT NULL,
+    id TEXT NOT NULL,
+    timestamp REAL NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (app_name, user_id, session_id, id)
+);
+CREATE INDEX IF NOT EXISTS events_by_session ON events (app_name, user_id, session_id, timestamp);
+CREATE TABLE IF NOT EXISTS state_deltas (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    scope TEXT NOT NULL,
+    app_name TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    session_id TEXT NOT NULL,
+    delta TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS state_deltas_by_owner ON state_deltas (scope, app_name, user_id, session_id, seq);
+CREATE TABLE IF NOT EXISTS app_states (
+    app_name TEXT NOT NULL PRIMARY KEY,
+    state TEXT NOT NULL,
+    update_time REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS user_states (
+    app_name TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    state TEXT NOT NULL,
+    update_time REAL NOT NULL,
+    PRIMARY KEY (app_name, user_id)
+);
+"""
+
+
+# A state owner: (scope, app_name, user_id, session_id), with '' for the ids the scope does not use.
+Owner = tuple[str, str, str, str]
+
+SNAPSHOT_QUERIES = {
+    "app": ("SELECT state FROM app_states WHERE app_name = ?", lambda owner: (owner[1],)),
+    "user": ("SELECT state FROM user_states WHERE app_name = ? AND user_id = ?", lambda owner: owner[1:3]),
+    "session": ("SELECT state FROM sessions WHERE app_name = ? AND user_id = ? AND id = ?", lambda owner: owner[1:]),
+}
+
+
+def app_owner(app_name: str) -> Owner:
+    return ("app", app_name, "", "")
+
+
+def user_owner(app_name: str, user_id: str) -> Owner:
+    return ("user", app_name, user_id, "")
+
+
+def session_owner(app_name: str, user_id: str, session_id: str) -> Owner:
+    return ("session", app_name, user_id, session_id)
+
+
+def sqlite_path_from_url(db_url: str) -> str:
+    """Turns a 'sqlite:///./file.db' style URL (as used by DatabaseSessionService) into a file path."""
+    if db_url.startswith("sqlite:///"):
+        return db_url[len("sqlite:///"):] or ":memory:"
+    if db_url == "sqlite://":
+        return ":memory:"
+    # Anything else (e.g. a postgresql:// URL meant for SESSION_BACKEND=database) would silently become a local file.
+    raise ValueError(f"Not a SQLite URL: '{db_url}'. Use 'sqlite:///path/to/file.db', or SESSION_BACKEND=database for other databases.")
+
+
+def split_state(state: dict[str, Any]) -> tuple[dict[str, Any], dict[str, Any], dict[str, Any]]:
+    """Splits a state dict into its app, user and session scoped parts. Temporary keys are dropped."""
+    app_state, user_state, session_state = {}, {}, {}
+    for key, value in state.items():
+        if key.startswith(State.APP_PREFIX):
+            app_state[key[len(State.APP_PREFIX):]] = value
+        elif key.startswith(State.USER_PREFIX):
+            user_state[key[len(State.USER_PREFIX):]] = value
+        elif not key.startswith(State.TEMP_PREFIX):
+            session_state[key] = value
+    return app_state, user_state, session_state
+
+
+def merge_state(app_state: dict[str, Any], user_state: dict[str, Any], session_state: dict[str, Any]) -> dict[str, Any]:
+    """Inverse of `split_state`: builds the state dict seen by the agents."""
+    merged = dict(session_state)
+    for key, value in app_state.items():
+        merged[State.APP_PREFIX + key] = value
+    for key, value in user_state.items():
+        merged[State.USER_PREFIX + key] = value
+    return merged
+
+
+class ConnectionPool:
+    """A fixed size pool of sqlite3 connections shared by worker threads."""
+
+    def __init__(self, path: str, size: int = 4):
+        self.path = path
+        # Every connection to ':memory:' opens its own private database, so it cannot be pooled.
+        self.size = 1 if path == ":memory:" else size
+        self._connections: queue.Queue[sqlite3.Connection] = queue.Queue(maxsize=self.size)
+        for _ in range(self.size):
+            self._connections.put(self._connect())
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, timeout=30, check_same_thread=False, isolation_level=None)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.execute("PRAGMA busy_timeout=30000")
+        return connection
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """Borrows a connection and runs the block inside a single transaction."""
+        connection = self._connections.get()
+        try:
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                yield connection
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+            connection.execute("COMMIT")
+        finally:
+            self._connections.put(connection)
+
+    def execute_script(self, script: str) -> None:
+        """Runs a multi-statement script (e.g. the schema) outside of an explicit transaction."""
+        connection = self._connections.get()
+        try:
+            connection.executescript(script)
+        finally:
+            self._connections.put(connection)
+
+    def close(self) -> None:
+        """Closes every pooled connection."""
+        while not self._connections.empty():
+            self._connections.get_nowait().close()
+
+
+class SqlSessionService(BaseSessionService):
+    """Session service persisting sessions, events and app/user state to SQLite."""
+
+    def __init__(self, db_url: str, pool_size: int = 4, snapshot_every: int = 50, recent_events: int = 0):
+        self.db_url = db_url
+        self.snapshot_every = snapshot_every
+        self.recent_events = recent_events
+        self.pool = ConnectionPool(sqlite_path_from_url(db_url), size=pool_size)
+        self.pool.execute_script(SCHEMA)
+
+        self.delta_writes = 0
+        self.snapshots = 0
+        self.events_loaded = 0
+        self.events_not_loaded = 0
+        logger.info(f"SqlSessionService ready on '{db_url}' with {pool_size} pooled connections.")
+
+    async def _run(self, fn: Callable[[sqlite3.Connection], T]) -> T:
+        """Runs `fn` with a pooled connection inside a transaction, on a worker thread."""
+        def run() -> T:
+            with self.pool.connection() as connection:
+                return fn(connection)
+        return await asyncio.to_thread(run)
+
+    # --- Helpers running on the worker thread ---
+    @staticmethod
+    def _load_state(connection: sqlite3.Connection, owner: Owner, snapshot: Optional[str] = None) -> dict:
+        """The snapshot of `owner` (read unless given) with its deltas applied in order."""
+        if snapshot is None:
+            query, params = SNAPSHOT_QUERIES[owner[0]]
+            row = connection.execute(query, params(owner)).fetchone()
+            snapshot = row[0] if row else None
+        state = json.loads(snapshot) if snapshot else {}
+        for (delta,) in connection.execute(
+            "SELECT delta FROM state_deltas WHERE scope = ? AND app_name = ? AND user_id = ? AND session_id = ? ORDER BY seq", owner
+        ):
+            state.update(json.loads(delta))
+        return state
+
+    def _append_delta(self, connection: sqlite3.Connection, owner: Owner, delta: dict, now: float) -> int:
+        """Appends a delta row, folding the deltas into the snapshot once there are more than `snapshot_every`. Returns 1 if it did."""
+        connection.execute(
+            "INSERT INTO state_deltas (scope, app_name, user_id, session_id, delta) VALUES (?, ?, ?, ?, ?)", (*owner, json.dumps(delta))
+        )
+        (count,) = connection.execute(
+            "SELECT COUNT(*) FROM state_deltas WHERE scope = ? AND app_name = ? AND user_id = ? AND session_id = ?", owner
+        ).fetchone()
+        if count <= self.snapshot_every:
+            return 0
+        self._write_snapshot(connection, owner, self._load_state(connection, owner), now)
+        connection.execute("DELETE FROM state_deltas WHERE scope = ? AND app_name = ? AND user_id = ? AND session_id = ?", owner)
+        return 1
+
+    @staticmethod
+    def _write_snapshot(connection: sqlite3.Connection, owner: Owner, state: dict, now: float) -> None:
+        scope, app_name, user_id, session_id = owner
+        if scope == "session":
+            connection.execute(
+                "UPDATE sessions SET state = ? WHERE app_name = ? AND user_id = ? AND id = ?", (json.dumps(state), app_name, user_id, session_id)
+            )
+        elif scope == "user":
+            connection.execute(
+                "INSERT INTO user_states (app_name, user_id, state, update_time) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (app_name, user_id) DO UPDATE SET state = excluded.state, update_time = excluded.update_time",
+                (app_name, user_id, json.dumps(state), now)
+            )
+        else:
+            connection.execute(
+                "INSERT INTO app_states (app_name, state, update_time) VALUES (?, ?, ?) "
+                "ON CONFLICT (app_name) DO UPDATE SET state = excluded.state, update_time = excluded.update_time",
+                (app_name, json.dumps(state), now)
+            )
+
+    def _update_scoped_state(self, connection: sqlite3.Connection, app_name: str, user_id: str, app_delta: dict, user_delta: dict, now: float) -> int:
+        """Appends the app and user scoped deltas. Returns the number of snapshots written."""
+        snapshots = 0
+        if app_delta:
+            snapshots += self._append_delta(connection, app_owner(app_name), app_delta, now)
+        if user_delta:
+            snapshots += self._append_delta(connection, user_owner(app_name, user_id), user_delta, now)
+        return snapshots
+
+    # --- BaseSessionService ---
+    async def create_session(self, *, app_name: str, user_id: str, state: Optional[dict[str, Any]] = None, session_id: Optional[str] = None) -> Session:
+        session_id = session_id.strip() if session_id and session_id.strip() else str(uuid.uuid4())
+        app_delta, user_delta, session_state = split_state(state or {})
+
+        def create(connection: sqlite3.Connection) -> Session:
+            now = time.time()
+            # Creating a session that already exists (e.g. a race between workers) returns the stored one.
+            connection.execute(
+                "INSERT INTO sessions (app_name, user_id, id, state, create_time, update_time) VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (app_name, user_id, id) DO NOTHING",
+                (app_name, user_id, session_id, json.dumps(session_state), now, now)
+            )
+            self._update_scoped_state(connection, app_name, user_id, app_delta, user_delta, now)
+            return self._load_session(connection, app_name, user_id, session_id, None)[0]
+
+        return await self._run(create)
+
+    @staticmethod
+    def _count_before(connection: sqlite3.Connection, app_name: str, user_id: str, session_id: str, timestamp: float) -> tuple[int, int]:
+        """The events and user messages (turns) of a session older than `timestamp`."""
+        events, turns = connection.execute(
+            "SELECT COUNT(*), COALESCE(SUM(json_extract(data, '$.author') = 'user'), 0) "
+            "FROM events WHERE app_name = ? AND user_id = ? AND session_id = ? AND timestamp < ?",
+            (app_name, user_id, session_id, timestamp)
+        ).fetchone()
+        return events, turns
+
+    def _load_session(self, connection: sqlite3.Connection, app_name: str, user_id: str, session_id: str,
+                      config: Optional[GetSessionConfig]) -> tuple[Optional[Session], int]:
+        """The session and the number of its events left out by `recent_events` (or None, 0)."""
+        row = connection.execute(
+            "SELECT state, update_time FROM sessions WHERE app_name = ? AND user_id = ? AND id = ?",
+            (app_name, user_id, session_id)
+        ).fetchone()
+        if row is None:
+            return None, 0
+
+        query = "SELECT data FROM events WHERE app_name = ? AND user_id = ? AND session_id = ?"
+        params: list[Any] = [app_name, user_id, session_id]
+        if config and config.after_timestamp:
+            query += " AND timestamp >= ?"
+            params.append(config.after_timestamp)
+        query += " ORDER BY timestamp DESC"
+        limit = config.num_recent_events if config else self.recent_events
+        if limit:
+            # One more than needed, to know whether older events were left out.
+            query += " LIMIT ?"
+            params.append(limit + 1)
+        events = [Event.model_validate_json(data) for (data,) in connection.execute(query, params).fetchall()]
+        events.reverse()
+
+        state = merge_state(
+            self._load_state(connection, app_owner(app_name)),
+            self._load_state(connection, user_owner(app_name, user_id)),
+            self._load_state(connection, session_owner(app_name, user_id, session_id), snapshot=row[0]),
+        )
+        not_loaded = 0
+        if limit and len(events) > limit:
+            events = events[1:]
+            if config is None:
+                # The window of the default load starts at a user message, so that it holds whole turns.
+                start = next((index for index, event in enumerate(events) if event.author == "user"), 0)
+                events = events[start:]
+                not_loaded, state[UNLOADED_TURNS_STATE_KEY] = self._count_before(connection, app_name, user_id, session_id, events[0].timestamp)
+        session = Session(app_name=app_name, user_id=user_id, id=session_id, state=state, events=events, last_update_time=row[1])
+        return session, not_loaded
+
+    async def get_session(self, *, app_name: str, user_id: str, session_id: str, config: Optional[GetSessionConfig] = None) -> Optional[Session]:
+        session, not_loaded = await self._run(lambda connection: self._load_session(connection, app_name, user_id, session_id, config))
+        if session is not None:
+            self.events_loaded += len(session.events)
+            self.events_not_loaded += not_loaded
+        return session
+
+    async def load_older_events(self, session: Session, limit: Optional[int] = None) -> int:
+        """Prepends to `session.events` up to `limit` (default all) of the stored events older than the loaded ones. Returns their number.
+
+        Like the window of `get_session`, the events prepended start at a user message when there is one.
+        """
+        if not session.events:
+            return 0
+        first = session.events[0].timestamp
+
+        def load(connection: sqlite3.Connection) -> tuple[list[Event], int]:
+            query = "SELECT data FROM events WHERE app_name = ? AND user_id = ? AND session_id = ? AND timestamp < ? ORDER BY timestamp DESC"
+            params: list[Any] = [session.app_name, session.user_id, session.id, first]
+            if limit:
+                query += " LIMIT ?"
+                params.append(limit)
+            older = [Event.model_validate_json(data) for (data,) in connection.execute(query, params).fetchall()]
+            older.reverse()
+            if limit and len(older) == limit:
+                older = older[next((index for index, event in enumerate(older) if event.author == "user"), 0):]
+            turns = self._count_before(connection, session.app_name, session.user_id, session.id, older[0].timestamp)[1] if older else 0
+            return older, turns
+
+        older, turns = await self._run(load)
+        session.events[:0] = older
+        if turns:
+            session.state[UNLOADED_TURNS_STATE_KEY] = turns
+        else:
+            session.state.pop(UNLOADED_TURNS_STATE_KEY, None)
+        self.events_loaded += len(older)
+        return len(older)
+
+    async def list_sessions(self, *, app_name: str, user_id: str) -> ListSessionsResponse:
+        def list_(connection: sqlite3.Connection) -> ListSessionsResponse:
+            rows = connection.execute(
+                "SELECT id, state, update_time FROM sessions WHERE app_name = ? AND user_id = ?",
+                (app_name, user_id)
+            ).fetchall()
+            return ListSessionsResponse(sessions=[
+                Session(
+                    app_name=app_name, user_id=user_id, id=session_id, last_update_time=update_time,
+                    state=self._load_state(connection, session_owner(app_name, user_id, session_id), snapshot=state),
+                )
+                for session_id, state, update_time in rows
+            ])
+        return await self._run(list_)
+
+    async def delete_session(self, *, app_name: str, user_id: str, session_id: str) -> None:
+        def delete(connection: sqlite3.Connection) -> None:
+            connection.execute("DELETE FROM events WHERE app_name = ? AND user_id = ? AND session_id = ?", (app_name, user_id, session_id))
+            connection.execute(
+                "DELETE FROM state_deltas WHERE scope = ? AND app_name = ? AND user_id = ? AND session_id = ?", session_owner(app_name, user_id, session_id)
+            )
+            connection.execute("DELETE FROM sessions WHERE app_name = ? AND user_id = ? AND id = ?", (app_name, user_id, session_id))
+        await self._run(delete)
+
+    async def append_event(self, session: Session, event: Event) -> Event:
+        if event.partial:
+            return event
+        await super().append_event(session=session, event=event)
+        await self.write_events(session, [event])
+        return event
+
+    async def write_events(self, session: Session, events: list[Event]) -> None:
+        """Persists already applied events of one session in a single transaction."""
+        await self.write_batches([(session, events)])
+
+    async def write_batches(self, batches: list[tuple[Session, list[Event]]]) -> None:
+        """Persists already applied events of several sessions in a single transaction.
+
+        The events are appended and the state keys they change are appended as deltas of their scope.
+        """
+        writes = [self._prepare_write(session, events) for session, events in batches if events]
+        if not writes:
+            return
+
+        def write(connection: sqlite3.Connection) -> tuple[int, int]:
+            deltas = snapshots = 0
+            for session, rows, session_delta, app_delta, user_delta, update_time in writes:
+                connection.executemany(
+                    "INSERT OR REPLACE INTO events (app_name, user_id, session_id, id, timestamp, data) VALUES (?, ?, ?, ?, ?, ?)",
+                    rows
+                )
+                connection.execute(
+                    "UPDATE sessions SET update_time = ? WHERE app_name = ? AND user_id = ? AND id = ?",
+                    (update_time, session.app_name, session.user_id, session.id)
+                )
+                if session_delta:
+                    snapshots += self._append_delta(connection, session_owner(session.app_name, session.user_id, session.id), session_delta, update_time)
+                snapshots += self._update_scoped_state(connection, session.app_name, session.user_id, app_delta, user_delta, update_time)
+                deltas += bool(session_delta) + bool(app_delta) + bool(user_delta)
+            return deltas, snapshots
+
+        deltas, snapshots = await self._run(write)
+        self.delta_writes += deltas
+        self.snapshots += snapshots
+        for session, *_, update_time in writes:
+            session.last_update_time = update_time
+
+    @staticmethod
+    def _prepare_write(session: Session, events: list[Event]) -> tuple:
+        """Serializes a batch of events and merges their state deltas per scope, on the event loop, before handing it to the worker thread."""
+        app_delta: dict[str, Any] = {}
+        user_delta: dict[str, Any] = {}
+        session_delta: dict[str, Any] = {}
+        for event in events:
+            if event.actions and event.actions.state_delta:
+                event_app_delta, event_user_delta, event_session_delta = split_state(event.actions.state_delta)
+                app_delta.update(event_app_delta)
+                user_delta.update(event_user_delta)
+                session_delta.update(event_session_delta)
+        rows = [
+            (session.app_name, session.user_id, session.id, event.id, event.timestamp, event.model_dump_json(exclude_none=True))
+            for event in events
+        ]
+        return session, rows, session_delta, app_delta, user_delta, events[-1].timestamp
+
+    async def close(self) -> None:
+        """Closes the pooled connections."""
+        await asyncio.to_thread(self.pool.close)
+
+    def stats(self) -> dict[str, Any]:
+        """Delta, snapshot and lazy loading counters."""
+        return {
+            "snapshot_every": self.snapshot_every,
+            "recent_events": self.recent_events,
+            "delta_writes": self.delta_writes,
+            "snapshots": self.snapshots,
+            "events_loaded": self.events_loaded,
+            "events_not_loaded": self.events_not_loaded,
+        }
@@ -0,0 +1,244 @@
+"""This module provides a result cache for tool calls, attached to agents through tool callbacks.
+
+`before_tool_callback` answers a call from the cache when a fresh result exists for the same tool and
+normalized arguments, `after_tool_callback` stores successful results. Entries expire after a per-tool
+TTL and the in-memory tier is bounded in bytes with LRU eviction. An optional SQLite file keeps
+entries across restarts.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+from google.adk.tools.base_tool import BaseTool
+from google.adk.tools.tool_context import ToolContext
+
+logger = logging.getLogger(__name__)
+
+WHITESPACE = re.compile(r"\s+")
+URL = re.compile(r"^[a-zA-Z][a-zA-Z0-9+.-]*://")
+
+
+def normalize_args(value: Any) -> Any:
+    """Normalizes tool arguments so that trivially different calls share a cache entry.
+
+    Strings are stripped and their whitespace collapsed, and casefolded unless they are URLs
+    (URL paths are case sensitive). Dict keys are sorted when the key is serialized.
+    """
+    if isinstance(value, str):
+        value = WHITESPACE.sub(" ", value.strip())
+        return value if URL.match(value) else value.casefold()
+    if isinstance(value, dict):
+        return {str(key): normalize_args(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [normalize_args(item) for item in value]
+    return value
+
+
+def make_key(tool_name: str, args: dict[str, Any]) -> str:
+    """Cache key of a call: tool name plus a digest of its normalized arguments."""
+    payload = json.dumps(normalize_args(args), sort_keys=True, separators=(",", ":"), default=str)
+    return f"{tool_name}:{hashlib.sha256(payload.encode()).hexdigest()}"
+
+
+def is_error_response(response: Any) -> bool:
+    """Returns True for responses that must not be cached (tool errors)."""
+    if isinstance(response, dict):
+        return response.get("status") == "error" or bool(response.get("isError") or response.get("is_error"))
+    return bool(getattr(response, "isError", False))
+
+
+def to_json(value: Any) -> Any:
+    """`json.dumps` fallback for pydantic results such as MCP `CallToolResult`."""
+    if hasattr(value, "model_dump"):
+        return value.model_dump(mode="json", exclude_none=True)
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+class DiskTier:
+    """SQLite file holding cache entries across restarts."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS tool_results (key TEXT PRIMARY KEY, tool TEXT NOT NULL, expires_at REAL NOT NULL, value BLOB NOT NULL)"
+        )
+        self._connection.execute("DELETE FROM tool_results WHERE expires_at < ?", (time.time(),))
+
+    def get(self, key: str) -> Optional[tuple[float, bytes]]:
+        with self._lock:
+            row = self._connection.execute("SELECT expires_at, value FROM tool_results WHERE key = ?", (key,)).fetchone()
+        if row is None or row[0] < time.time():
+            return None
+        return row[0], row[1]
+
+    def put(self, key: str, tool_name: str, expires_at: float, value: bytes) -> None:
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO tool_results (key, tool, expires_at, value) VALUES (?, ?, ?, ?)",
+                (key, tool_name, expires_at, value)
+            )
+
+    def close(self) -> None:
+        self._connection.close()
+
+
+class ToolResultCache:
+    """TTL + byte-bounded LRU cache of tool results, with an optional on-disk tier."""
+
+    def __init__(self, default_ttl: float = 600, ttls: Optional[dict[str, float]] = None, max_bytes: int = 64 * 1024 * 1024,
+                 disk_path: Optional[str] = None, enabled: bool = True):
+        self.default_ttl = default_ttl
+        self.ttls = ttls or {}
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self.disk = DiskTier(disk_path) if disk_path and enabled else None
+
+        self._entries: OrderedDict[str, tuple[float, bytes]] = OrderedDict()
+        self._bytes = 0
+        self._served_from_cache: set[str] = set()
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self.tool_counters: dict[str, dict[str, int]] = {}
+
+    @classmethod
+    def from_env(cls) -> "ToolResultCache":
+        """Builds the cache from the TOOL_CACHE_* environment variables.
+
+        TOOL_CACHE_TTLS is a comma separated list of 'tool_name=seconds', a TTL of 0 disables caching for a tool.
+        """
+        ttls = {}
+        for item in os.getenv("TOOL_CACHE_TTLS", "").split(","):
+            if "=" in item:
+                name, seconds = item.split("=", 1)
+                ttls[name.strip()] = float(seconds)
+        return cls(
+            default_ttl=float(os.getenv("TOOL_CACHE_DEFAULT_TTL", 600)),
+            ttls=ttls,
+            max_bytes=int(os.getenv("TOOL_CACHE_MAX_BYTES", 64 * 1024 * 1024)),
+            disk_path=os.getenv("TOOL_CACHE_DISK_PATH") or None,
+            enabled=os.getenv("TOOL_CACHE_ENABLED", "true").lower() in ("1", "true", "yes"),
+        )
+
+    def ttl_for(self, tool_name: str) -> float:
+        return self.ttls.get(tool_name, self.default_ttl)
+
+    def _count(self, tool_name: str, counter: str) -> None:
+        counters = self.tool_counters.setdefault(tool_name, {"hits": 0, "misses": 0})
+        counters[counter] += 1
+
+    # --- Memory tier ---
+    def _remember(self, key: str, expires_at: float, value: bytes) -> None:
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._bytes -= len(previous[1])
+        if len(value) > self.max_bytes:
+            return
+        self._entries[key] = (expires_at, value)
+        self._bytes += len(value)
+        while self._bytes > self.max_bytes:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self._bytes -= len(evicted)
+            self.evictions += 1
+
+    async def get(self, tool_name: str, args: dict[str, Any]) -> Optional[Any]:
+        """Returns the cached result of a call, or None."""
+        key = make_key(tool_name, args)
+        now = time.time()
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry[0] >= now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                self._count(tool_name, "hits")
+                return json.loads(entry[1])
+            self._entries.pop(key)
+            self._bytes -= len(entry[1])
+
+        if self.disk is not None:
+            entry = await asyncio.to_thread(self.disk.get, key)
+            if entry is not None:
+                self._remember(key, *entry)
+                self.disk_hits += 1
+                self._count(tool_name, "hits")
+                return json.loads(entry[1])
+
+        self.misses += 1
+        self._count(tool_name, "misses")
+        return None
+
+    async def put(self, tool_name: str, args: dict[str, Any], response: Any) -> None:
+        """Stores a successful, JSON serializable tool result."""
+        ttl = self.ttl_for(tool_name)
+        if ttl <= 0 or response is None or is_error_response(response):
+            return
+        # Non-dict results are wrapped the same way ADK wraps them into the function response.
+        payload = response if isinstance(response, dict) else {"result": response}
+        try:
+            value = json.dumps(payload, separators=(",", ":"), default=to_json).encode()
+        except (TypeError, ValueError):
+            return
+
+        key = make_key(tool_name, args)
+        expires_at = time.time() + ttl
+        self._remember(key, expires_at, value)
+        self.stores += 1
+        if self.disk is not None:
+            await asyncio.to_thread(self.disk.put, key, tool_name, expires_at, value)
+
+    # --- ADK callbacks ---
+    async def before_tool_callback(self, tool: BaseTool, args: dict[str, Any], tool_context: ToolContext) -> Optional[dict]:
+        """Answers the call from the cache on a hit, skipping the tool."""
+        if not self.enabled or self.ttl_for(tool.name) <= 0:
+            return None
+        cached = await self.get(tool.name, args)
+        if cached is None:
+            return None
+        logger.info(f"--- Callback: Serving '{tool.name}' from the tool result cache. ---")
+        self._served_from_cache.add(tool_context.function_call_id)
+        return cached
+
+    async def after_tool_callback(self, tool: BaseTool, args: dict[str, Any], tool_context: ToolContext, tool_response: Any) -> Optional[dict]:
+        """Stores the result of a call that was not answered from the cache. Never alters the response."""
+        if not self.enabled:
+            return None
+        if tool_context.function_call_id in self._served_from_cache:
+            self._served_from_cache.discard(tool_context.function_call_id)
+            return None
+        await self.put(tool.name, args, tool_response)
+        return None
+
+    def stats(self) -> dict[str, Any]:
+        """Hit/miss counters and memory usage."""
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+            "stores": self.stores,
+            "evictions": self.evictions,
+            "tools": self.tool_counters,
+        }
+
+
+# Shared cache of the search and websurf agents.
+tool_result_cache = ToolResultCache.from_env()
@@ -0,0 +1,267 @@
+"""This module provides the weather and timezone backend of the weather tools.
+
+Observations come from a pluggable provider: `FileWeatherProvider` reads a local JSON file (the
+default, for tests and offline use) and `OpenMeteoProvider` queries the Open-Meteo geocoding and
+forecast APIs (WEATHER_PROVIDER=open-meteo, no API key needed). `WeatherService` keeps observations
+in a TTL cache keyed by normalized city name (unknown cities are cached for a shorter time) and
+coalesces concurrent requests for the same city into a single upstream fetch.
+
+Timezones are looked up in an index of city names built once from the tz database (the last part of
+each zone name, e.g. 'Kolkata' for 'Asia/Kolkata') plus common aliases, and fall back to the
+timezone reported by the provider.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import re
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import cache
+from typing import Any, Optional, Protocol
+from zoneinfo import ZoneInfo, available_timezones
+import httpx
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WEATHER_DATA_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "weather_data.json")
+
+NON_WORD = re.compile(r"[^\w]+")
+
+# Cities whose timezone is not named after them in the tz database.
+CITY_TIMEZONE_ALIASES = {
+    "san francisco": "America/Los_Angeles", "seattle": "America/Los_Angeles", "las vegas": "America/Los_Angeles",
+    "san diego": "America/Los_Angeles", "portland": "America/Los_Angeles", "washington": "America/New_York",
+    "boston": "America/New_York", "miami": "America/New_York", "atlanta": "America/New_York",
+    "philadelphia": "America/New_York", "dallas": "America/Chicago", "houston": "America/Chicago",
+    "austin": "America/Chicago", "san antonio": "America/Chicago", "washington dc": "America/New_York",
+    "montreal": "America/Toronto", "ottawa": "America/Toronto", "rio de janeiro": "America/Sao_Paulo",
+    "beijing": "Asia/Shanghai", "hangzhou": "Asia/Shanghai", "shenzhen": "Asia/Shanghai", "hong kong": "Asia/Hong_Kong",
+    "mumbai": "Asia/Kolkata", "delhi": "Asia/Kolkata", "new delhi": "Asia/Kolkata", "bangalore": "Asia/Kolkata",
+    "bengaluru": "Asia/Kolkata", "chennai": "Asia/Kolkata", "hyderabad": "Asia/Kolkata", "osaka": "Asia/Tokyo",
+    "kyoto": "Asia/Tokyo", "abu dhabi": "Asia/Dubai", "saint petersburg": "Europe/Moscow", "st petersburg": "Europe/Moscow",
+    "barcelona": "Europe/Madrid", "munich": "Europe/Berlin", "frankfurt": "Europe/Berlin", "hamburg": "Europe/Berlin",
+    "milan": "Europe/Rome", "florence": "Europe/Rome", "venice": "Europe/Rome", "geneva": "Europe/Zurich",
+    "manchester": "Europe/London", "edinburgh": "Europe/London", "cape town": "Africa/Johannesburg",
+    "melbourne": "Australia/Melbourne", "canberra": "Australia/Sydney", "auckland": "Pacific/Auckland",
+    "wellington": "Pacific/Auckland", "tel aviv": "Asia/Jerusalem",
+}
+
+# WMO weather interpretation codes reported by Open-Meteo.
+WMO_CONDITIONS = {
+    0: "clear", 1: "mainly clear", 2: "partly cloudy", 3: "overcast", 45: "foggy", 48: "foggy",
+    51: "light drizzle", 53: "drizzle", 55: "heavy drizzle", 56: "freezing drizzle", 57: "freezing drizzle",
+    61: "light rain", 63: "rain", 65: "heavy rain", 66: "freezing rain", 67: "freezing rain",
+    71: "light snow", 73: "snow", 75: "heavy snow", 77: "snow grains",
+    80: "light rain showers", 81: "rain showers", 82: "heavy rain showers", 85: "snow showers", 86: "heavy snow showers",
+    95: "thunderstorms", 96: "thunderstorms with hail", 99: "thunderstorms with hail",
+}
+
+
+def normalize_city(city: str) -> str:
+    """Cache and index key of a city name: casefolded words separated by single spaces ('New  York,' -> 'new york')."""
+    return " ".join(NON_WORD.sub(" ", city.replace("_", " ")).casefold().split())
+
+
+@cache
+def timezone_index() -> dict[str, str]:
+    """Normalized city name -> tz database key, built once from the installed tz database and the aliases."""
+    index = {}
+    for key in sorted(available_timezones()):
+        region, _, city = key.rpartition("/")
+        if region and not key.startswith(("Etc/", "SystemV/", "US/", "Canada/", "Brazil/", "Mexico/", "Chile/")):
+            index.setdefault(normalize_city(city), key)
+    index.update(CITY_TIMEZONE_ALIASES)
+    return index
+
+
+def find_timezone(city: str) -> Optional[str]:
+    """Timezone key of a city from the index, or None."""
+    return timezone_index().get(normalize_city(city))
+
+
+@cache
+def zone(key: str) -> ZoneInfo:
+    return ZoneInfo(key)
+
+
+@dataclass(frozen=True, slots=True)
+class Observation:
+    """Current weather in a city."""
+    city: str
+    temp_c: float
+    condition: str
+    timezone: Optional[str] = None
+
+
+class WeatherProvider(Protocol):
+    """Source of observations. Returns None for unknown cities and raises on upstream failures."""
+    name: str
+
+    async def fetch(self, city: str) -> Optional[Observation]: ...
+
+
+class FileWeatherProvider:
+    """Observations from a JSON file mapping city names to {"temp_c", "condition", "timezone"}. The file is reread when it changes."""
+
+    name = "file"
+
+    def __init__(self, path: str = DEFAULT_WEATHER_DATA_FILE):
+        self.path = path
+        self._mtime: Optional[float] = None
+        self._cities: dict[str, Observation] = {}
+
+    def _load(self) -> dict[str, Observation]:
+        mtime = os.stat(self.path).st_mtime
+        if mtime != self._mtime:
+            with open(self.path, encoding="utf-8") as file:
+                data = json.load(file)
+            self._cities = {
+                normalize_city(city): Observation(city=city, temp_c=float(entry["temp_c"]), condition=entry["condition"], timezone=entry.get("timezone"))
+                for city, entry in data.items()
+            }
+            self._mtime = mtime
+        return self._cities
+
+    async def fetch(self, city: str) -> Optional[Observation]:
+        return self._load().get(normalize_city(city))
+
+
+class OpenMeteoProvider:
+    """Observations from the Open-Meteo APIs: the city is geocoded, then its current conditions are fetched."""
+
+    name = "open-meteo"
+
+    def __init__(self, geocoding_url: str = "https://geocoding-api.open-meteo.com/v1/search",
+                 forecast_url: str = "https://api.open-meteo.com/v1/forecast", timeout: float = 10.0):
+        self.geocoding_url = geocoding_url
+        self.forecast_url = forecast_url
+        self.timeout = timeout
+        self._client: Optional[httpx.AsyncClient] = None
+
+    async def fetch(self, city: str) -> Optional[Observation]:
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=self.timeout)
+        response = await self._client.get(self.geocoding_url, params={"name": city, "count": 1, "format": "json"})
+        response.raise_for_status()
+        places = response.json().get("results") or []
+        if not places:
+            return None
+        place = places[0]
+        response = await self._client.get(self.forecast_url, params={
+            "latitude": place["latitude"], "longitude": place["longitude"], "current": "temperature_2m,weather_code", "timezone": "auto"
+        })
+        response.raise_for_status()
+        current = response.json()["current"]
+        return Observation(
+            city=place.get("name", city),
+            temp_c=float(current["temperature_2m"]),
+            condition=WMO_CONDITIONS.get(int(current.get("weather_code", -1)), "unknown conditions"),
+            timezone=place.get("timezone"),
+        )
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+class WeatherService:
+    """TTL cache of observations in front of a provider, with single-flight fetches per city."""
+
+    def __init__(self, provider: WeatherProvider, ttl: float = 600, not_found_ttl: float = 60, max_entries: int = 1000):
+        self.provider = provider
+        self.ttl = ttl
+        self.not_found_ttl = not_found_ttl
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[float, Optional[Observation]]] = OrderedDict()
+        self._inflight: dict[str, asyncio.Task] = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.fetches = 0
+        self.errors = 0
+
+    @classmethod
+    def from_env(cls) -> "WeatherService":
+        """Builds the service from the WEATHER_* environment variables."""
+        provider_name = os.getenv("WEATHER_PROVIDER", "file").lower()
+        if provider_name == "open-meteo":
+            provider = OpenMeteoProvider(timeout=float(os.getenv("WEATHER_HTTP_TIMEOUT", 10)))
+        else:
+            provider = FileWeatherProvider(os.getenv("WEATHER_DATA_FILE", DEFAULT_WEATHER_DATA_FILE))
+        return cls(
+            provider=provider,
+            ttl=float(os.getenv("WEATHER_CACHE_TTL", 600)),
+            not_found_ttl=float(os.getenv("WEATHER_NOT_FOUND_TTL", 60)),
+            max_entries=int(os.getenv("WEATHER_CACHE_MAX_ENTRIES", 1000)),
+        )
+
+    async def observe(self, city: str) -> Optional[Observation]:
+        """Current observation for `city`, None if the provider does not know it. Raises when the provider fails."""
+        key = normalize_city(city)
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+        task = self._inflight.get(key)
+        if task is None:
+            self.misses += 1
+            task = asyncio.create_task(self._fetch(key, city), name=f"weather-{key}")
+            self._inflight[key] = task
+        else:
+            self.coalesced += 1
+        # Shielded, so that a caller going away does not cancel the fetch shared with the others.
+        return await asyncio.shield(task)
+
+    async def _fetch(self, key: str, city: str) -> Optional[Observation]:
+        self.fetches += 1
+        try:
+            observation = await self.provider.fetch(city)
+        except Exception as e:
+            self.errors += 1
+            logger.error("Weather provider '%s' failed for '%s': %s", self.provider.name, city, e)
+            raise
+        finally:
+            del self._inflight[key]
+        ttl = self.ttl if observation is not None else self.not_found_ttl
+        self._entries[key] = (time.monotonic() + ttl, observation)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return observation
+
+    async def timezone(self, city: str) -> Optional[str]:
+        """Timezone key of `city`, from the index or else from the provider's observation."""
+        key = find_timezone(city)
+        if key is not None:
+            return key
+        observation = await self.observe(city)
+        return observation.timezone if observation is not None else None
+
+    async def close(self) -> None:
+        close = getattr(self.provider, "close", None)
+        if close is not None:
+            await close()
+
+    def stats(self) -> dict[str, Any]:
+        """Cache and fetch counters."""
+        return {
+            "provider": self.provider.name,
+            "entries": len(self._entries),
+            "inflight": len(self._inflight),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "fetches": self.fetches,
+            "errors": self.errors,
+            "timezone_index_cities": len(timezone_index()),
+        }
+
+
+weather_service = WeatherService.from_env()
@@ -0,0 +1,208 @@
+"""This module provides a parallel fan-out of compound requests to several sub-agents.
+
+"What's the weather in London and Tokyo, and search for the latest news on Mars" is split into
+independent sub-queries, each routed by the pre-router. When every part routes confidently to a
+sub-agent, the parts run at the same time, each in its own branch session seeded with the parent
+session's state, instead of being delegated one after the other by the root agent. Each branch has
+a timeout, the branches are cancelled if the request is, and their answers are merged into one
+final response recorded in the parent session.
+"""
+
+import asyncio
+import logging
+import re
+import time
+import uuid
+from contextlib import aclosing
+from dataclasses import dataclass, field
+from typing import AsyncGenerator, Optional
+from google.adk.events import Event, EventActions
+from google.adk.agents.run_config import RunConfig
+from google.adk.runners import Runner
+from google.adk.sessions import BaseSessionService
+from google.adk.sessions.state import State
+from google.genai import types
+from src.agents.data_stores.weather_service import find_timezone
+from src.agents.router import CITY, KNOWN_CITIES, WEATHER_AGENT, route_query
+from src.agents.tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+# Separators between independent requests: ';', '?', ', and', ' and also', ' and then', ' also', ... (kept by `split`)
+SPLIT = re.compile(r"(\s*(?:;|\?\s+|,\s*(?:and\s+)?(?:then\s+|also\s+)?|\s+and\s+(?:then\s+|also\s+)?|\s+also\s+)\s*)", re.IGNORECASE)
+CONJUNCTION = re.compile(r"\b(?:and|also|then)\b", re.IGNORECASE)
+# The region after a city ('Berlin, Germany'), not carried over to the next city.
+REGION = re.compile(r"^,\s*[A-Z][a-zA-Z]+(?:\s+[A-Z][a-zA-Z]+)?")
+BARE_CITY = re.compile(r"^(?:(?:in|for|at)\s+)?(?:the\s+)?([A-Z][a-zA-Z]+(?:\s+[A-Z][a-zA-Z]+)?|new york|london|tokyo|paris)[?.!]*$")
+
+
+@dataclass
+class Branch:
+    """One independent part of a compound request."""
+    query: str
+    agent: str
+    answer: Optional[str] = None
+    status: str = "pending"
+    duration: float = 0.0
+    state_delta: dict = field(default_factory=dict)
+
+
+def _city_of(query: str) -> Optional[str]:
+    match = KNOWN_CITIES.search(query) or CITY.search(query)
+    if match is None:
+        return None
+    return match.group(1) if match.re is CITY else match.group(0)
+
+
+def split_query(query: str) -> list[str]:
+    """Splits a compound request into sub-queries.
+
+    Parts without a routing signal are merged back into the previous part ("search for salt and pepper"
+    stays whole), except bare city names following a weather question, which inherit it
+    ("weather in London and Tokyo" -> "weather in London", "weather in Tokyo"). After a comma alone the
+    name must be a known city, so that "weather in Paris, France" or "Portland, Oregon" stays whole.
+    """
+    parts: list[str] = []
+    pieces = SPLIT.split(query)
+    for index in range(0, len(pieces), 2):
+        part = pieces[index].strip()
+        separator = pieces[index - 1] if index else ""
+        if not part:
+            continue
+        if parts and route_query(part).agent is None:
+            previous = parts[-1]
+            bare_city = BARE_CITY.match(part)
+            previous_city = _city_of(previous)
+            if (bare_city and previous_city and route_query(previous).agent == WEATHER_AGENT
+                    and (CONJUNCTION.search(separator) or find_timezone(bare_city.group(1)) is not None)):
+                head, _, tail = previous.rpartition(previous_city)
+                parts.append(f"{head}{bare_city.group(1)}{REGION.sub('', tail)}")
+            else:
+                parts[-1] = f"{previous}{separator}{part}"
+            continue
+        parts.append(part)
+    return parts
+
+
+def plan_fanout(query: str, min_confidence: float = 0.8, max_branches: int = 4) -> Optional[list[Branch]]:
+    """Returns the branches of a compound request, or None when it should run through the root agent."""
+    if route_query(query).reason == "blocked keyword":
+        return None
+    parts = split_query(query)
+    if not 2 <= len(parts) <= max_branches:
+        return None
+    branches = []
+    for part in parts:
+        decision = route_query(part)
+        if decision.agent is None or decision.confidence < min_confidence:
+            return None
+        branches.append(Branch(query=part, agent=decision.agent))
+    logger.info("Fan-out of '%s' into %s", query, [(branch.agent, branch.query) for branch in branches])
+    return branches
+
+
+def session_scoped(state: dict) -> dict:
+    """The part of a session state that belongs to the session itself (app/user state is shared, temp state is dropped)."""
+    return {
+        key: value for key, value in state.items()
+        if not key.startswith((State.APP_PREFIX, State.USER_PREFIX, State.TEMP_PREFIX))
+    }
+
+
+def final_text(event: Event) -> Optional[str]:
+    if event.content and event.content.parts:
+        return "".join(part.text for part in event.content.parts if part.text) or None
+    if event.actions and event.actions.escalate:
+        return f"Agent escalated: {event.error_message or 'No specific message.'}"
+    return None
+
+
+def merge_answers(branches: list[Branch]) -> str:
+    """Joins the branch answers in the order of the request."""
+    return "\n\n".join(f"**{branch.query}**\n{branch.answer or 'No answer.'}" for branch in branches)
+
+
+async def run_fanout(branches: list[Branch], runners: dict[str, Runner], session_service: BaseSessionService, app_name: str, author: str,
+                     user_id: str, session_id: str, query: str, run_config: Optional[RunConfig] = None,
+                     timeout: float = 60.0) -> AsyncGenerator[Event, None]:
+    """Runs the branches concurrently and yields their events as they come, then the merged final event.
+
+    Branch events are yielded as copies tagged with their branch ('<author>.<agent>-<index>'), so that a branch's final
+    response is not taken for the final response of the request: the merged event is the only one.
+    The request and the merged answer (with the branches' session state changes) are appended to the parent session.
+    """
+    parent = await session_service.get_session(app_name=app_name, user_id=user_id, session_id=session_id)
+    seed_state = session_scoped(parent.state) if parent else {}
+    queue: asyncio.Queue[Optional[Event]] = asyncio.Queue()
+
+    async def run_branch(index: int, branch: Branch) -> None:
+        started = time.perf_counter()
+        branch_session_id = f"{session_id}--branch-{index}-{uuid.uuid4().hex[:8]}"
+        content = types.Content(role="user", parts=[types.Part(text=branch.query)])
+        with tracer.start_as_current_span("fanout_branch", attributes={"agent": branch.agent, "query": branch.query}) as span:
+            try:
+                await session_service.create_session(app_name=app_name, user_id=user_id, state=dict(seed_state), session_id=branch_session_id)
+                events = runners[branch.agent].run_async(
+                    user_id=user_id, session_id=branch_session_id, new_message=content, run_config=run_config or RunConfig()
+                )
+                # The runner is closed in this task on timeout or cancellation, so that its spans end in their own context.
+                async with asyncio.timeout(timeout), aclosing(events):
+                    async for event in events:
+                        if event.is_final_response() and not event.partial:
+                            branch.answer = final_text(event) or branch.answer
+                        queue.put_nowait(event.model_copy(update={"branch": f"{author}.{branch.agent}-{index}"}))
+                branch.status = "ok"
+                branch_session = await session_service.get_session(app_name=app_name, user_id=user_id, session_id=branch_session_id)
+                if branch_session:
+                    branch.state_delta = {
+                        key: value for key, value in session_scoped(branch_session.state).items() if seed_state.get(key) != value
+                    }
+            except TimeoutError:
+                branch.status = "timeout"
+                branch.answer = f"The {branch.agent} did not answer within {timeout:g} seconds."
+                logger.error("Fan-out branch '%s' timed out after %gs.", branch.query, timeout)
+            except Exception as e:
+                branch.status = "error"
+                branch.answer = f"The {branch.agent} failed: {e}"
+                logger.error("Fan-out branch '%s' failed: %s", branch.query, e)
+            finally:
+                branch.duration = time.perf_counter() - started
+                span.set_attribute("status", branch.status)
+                try:
+                    await session_service.delete_session(app_name=app_name, user_id=user_id, session_id=branch_session_id)
+                except Exception as e:
+                    logger.error("Could not delete branch session '%s': %s", branch_session_id, e)
+                queue.put_nowait(None)
+
+    tasks = [asyncio.create_task(run_branch(index, branch), name=f"fanout-{branch.agent}") for index, branch in enumerate(branches)]
+    try:
+        remaining = len(tasks)
+        while remaining:
+            event = await queue.get()
+            if event is None:
+                remaining -= 1
+            else:
+                yield event
+    finally:
+        # Cancels the branches still running when the request itself is cancelled.
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    logger.info("Fan-out finished: %s", [(branch.agent, branch.status, round(branch.duration, 2)) for branch in branches])
+    state_delta = {}
+    for branch in branches:
+        state_delta.update(branch.state_delta)
+
+    invocation_id = f"e-{uuid.uuid4()}"
+    merged = Event(
+        invocation_id=invocation_id,
+        author=author,
+        content=types.Content(role="model", parts=[types.Part(text=merge_answers(branches))]),
+        actions=EventActions(state_delta=state_delta),
+    )
+    if parent is not None:
+        request_event = Event(invocation_id=invocation_id, author="user", content=types.Content(role="user", parts=[types.Part(text=query)]))
+        await session_service.append_event(parent, request_event)
+        await session_service.append_event(parent, merged)
+    yield merged
@@ -0,0 +1,238 @@
+"""This module provides the model of each agent, with a fallback chain of faster models.
+
+Each agent reads its model from `<PREFIX>_MODEL` (ROOT_AGENT, OS_AGENT, WEATHER_AGENT, SEARCH_AGENT,
+WEBSURF_AGENT), by default GOOGLE_MODEL_NAME, so that e.g. the routing-only root agent can use a
+lighter model than the agents using tools. Models are resolved through the ADK model registry, so any
+registered `BaseLlm` (e.g. the fake model of the benchmarks) works.
+
+When `<PREFIX>_FALLBACK_MODELS` (by default MODEL_FALLBACKS) lists other models, the agent gets a
+`FallbackLlm`: a call whose first response does not come within `<PREFIX>_MODEL_DEADLINE` seconds, or
+which fails with a rate limit (429) or server error, is retried on the next model. With
+`<PREFIX>_MODEL_HEDGE_AFTER` set, a non-streaming call still running after that many seconds is sent to
+the next model as well and the first answer wins. A model that missed its deadline or was rate limited
+is skipped for MODEL_COOLDOWN seconds, so the following calls of the agent go straight to a fallback.
+Latency and error counters per agent and model are reported by `model_stats()`.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, AsyncGenerator, Optional, Union
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.adk.models.registry import LLMRegistry
+from pydantic import PrivateAttr
+
+logger = logging.getLogger(__name__)
+
+GOOGLE_MODEL_NAME = os.getenv("GOOGLE_MODEL_NAME", "gemini-2.0-flash")
+MODEL_FALLBACKS = os.getenv("MODEL_FALLBACKS", "")
+MODEL_DEADLINE = float(os.getenv("MODEL_DEADLINE", 20))
+MODEL_HEDGE_AFTER = float(os.getenv("MODEL_HEDGE_AFTER", 0))
+MODEL_COOLDOWN = float(os.getenv("MODEL_COOLDOWN", 30))
+
+# Weight of the latest call in the moving average of the latency.
+LATENCY_SMOOTHING = 0.2
+
+
+def fallback_reason(error: BaseException) -> Optional[str]:
+    """Why a failed call may be retried on another model, or None for errors that another model would repeat (e.g. 400)."""
+    if isinstance(error, asyncio.TimeoutError):
+        return "deadline"
+    code = getattr(error, "code", None)
+    if code == 429 or "RESOURCE_EXHAUSTED" in str(error):
+        return "rate_limited"
+    if isinstance(code, int) and code >= 500:
+        return "server_error"
+    return None
+
+
+@dataclass(slots=True)
+class ModelStats:
+    """Counters of one model of an agent. `latency_ms` is the moving average of the time to the first response."""
+    calls: int = 0
+    successes: int = 0
+    deadline_misses: int = 0
+    rate_limited: int = 0
+    server_errors: int = 0
+    errors: int = 0
+    cancelled: int = 0
+    latency_ms: float = 0.0
+    cooldown_until: float = 0.0
+
+    def to_dict(self, now: float) -> dict[str, Any]:
+        counters = asdict(self)
+        del counters["cooldown_until"]
+        return counters | {"latency_ms": round(self.latency_ms, 1), "cooldown_s": round(max(0.0, self.cooldown_until - now), 1)}
+
+
+class FallbackLlm(BaseLlm):
+    """Model calling `models` in order, falling back on deadline misses, rate limits and server errors."""
+
+    agent_name: str
+    models: list[str]
+    deadline: float = 20.0
+    hedge_after: float = 0.0
+    cooldown: float = 30.0
+
+    _llms: list[BaseLlm] = PrivateAttr(default_factory=list)
+    _stats: dict[str, ModelStats] = PrivateAttr(default_factory=dict)
+    _fallbacks: int = PrivateAttr(default=0)
+    _hedges: int = PrivateAttr(default=0)
+    _hedge_wins: int = PrivateAttr(default=0)
+
+    def model_post_init(self, context: Any) -> None:
+        self._llms = [LLMRegistry.new_llm(name) for name in self.models]
+        self._stats = {name: ModelStats() for name in self.models}
+
+    def ordered(self) -> list[BaseLlm]:
+        """The models to try, in configured order but with those cooling down last."""
+        now = time.monotonic()
+        ready = [llm for llm in self._llms if self._stats[llm.model].cooldown_until <= now]
+        return ready + [llm for llm in self._llms if llm not in ready]
+
+    def _request_for(self, llm: BaseLlm, llm_request: LlmRequest) -> LlmRequest:
+        # Models may append to the contents, which stay shared with the other attempts otherwise.
+        return llm_request.model_copy(update={"model": llm.model, "contents": list(llm_request.contents)})
+
+    def _succeeded(self, llm: BaseLlm, started: float) -> None:
+        stats = self._stats[llm.model]
+        latency_ms = (time.monotonic() - started) * 1000
+        stats.successes += 1
+        stats.latency_ms = latency_ms if stats.successes == 1 else stats.latency_ms + LATENCY_SMOOTHING * (latency_ms - stats.latency_ms)
+
+    def _failed(self, llm: BaseLlm, error: BaseException) -> Optional[str]:
+        """Records a failed call and returns its `fallback_reason`."""
+        stats = self._stats[llm.model]
+        reason = fallback_reason(error)
+        if reason == "deadline":
+            stats.deadline_misses += 1
+        elif reason == "rate_limited":
+            stats.rate_limited += 1
+        elif reason == "server_error":
+            stats.server_errors += 1
+        else:
+            stats.errors += 1
+        if reason in ("deadline", "rate_limited"):
+            stats.cooldown_until = time.monotonic() + self.cooldown
+        return reason
+
+    async def generate_content_async(self, llm_request: LlmRequest, stream: bool = False) -> AsyncGenerator[LlmResponse, None]:
+        llms = self.ordered()
+        if self.hedge_after > 0 and not stream and len(llms) > 1:
+            for response in await self._hedged(llms, llm_request):
+                yield response
+            return
+
+        for index, llm in enumerate(llms):
+            last = index == len(llms) - 1
+            self._stats[llm.model].calls += 1
+            started = time.monotonic()
+            responses = llm.generate_content_async(self._request_for(llm, llm_request), stream=stream)
+            try:
+                # Only the first response has a deadline: once it is yielded the call can no longer move to another model.
+                first = await asyncio.wait_for(anext(responses, None), None if last or self.deadline <= 0 else self.deadline)
+            except Exception as e:
+                await responses.aclose()
+                reason = self._failed(llm, e)
+                if reason is None or last:
+                    raise
+                self._fallbacks += 1
+                logger.warning("Model '%s' of agent '%s' failed (%s), falling back to '%s'.", llm.model, self.agent_name, reason, llms[index + 1].model)
+                continue
+            self._succeeded(llm, started)
+            if first is None:
+                return
+            yield first
+            async for response in responses:
+                yield response
+            return
+
+    async def _collect(self, llm: BaseLlm, llm_request: LlmRequest) -> list[LlmResponse]:
+        stats = self._stats[llm.model]
+        stats.calls += 1
+        started = time.monotonic()
+        try:
+            responses = [response async for response in llm.generate_content_async(self._request_for(llm, llm_request), stream=False)]
+        except asyncio.CancelledError:
+            stats.cancelled += 1
+            raise
+        except Exception as e:
+            self._failed(llm, e)
+            raise
+        self._succeeded(llm, started)
+        return responses
+
+    async def _hedged(self, llms: list[BaseLlm], llm_request: LlmRequest) -> list[LlmResponse]:
+        """Starts the next model whenever the running ones take longer than `hedge_after` or fail, and returns the first answer."""
+        tasks: dict[asyncio.Task, BaseLlm] = {}
+        error: Optional[BaseException] = None
+        try:
+            for index, llm in enumerate(llms):
+                if index:
+                    self._hedges += 1
+                    logger.info("Hedging the call of agent '%s' on model '%s'.", self.agent_name, llm.model)
+                tasks[asyncio.create_task(self._collect(llm, llm_request), name=f"model-{llm.model}")] = llm
+                last = index == len(llms) - 1
+                while pending := [task for task in tasks if not task.done()]:
+                    done, _ = await asyncio.wait(pending, timeout=None if last else self.hedge_after, return_when=asyncio.FIRST_COMPLETED)
+                    if not done:
+                        break
+                    for task in done:
+                        if task.exception() is None:
+                            if tasks[task] is not llms[0]:
+                                self._hedge_wins += 1
+                            return task.result()
+                        error = task.exception()
+                        if fallback_reason(error) is None:
+                            raise error
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+        raise error
+
+    def stats(self) -> dict[str, Any]:
+        """Counters of the agent's models, with the seconds left of their cooldowns."""
+        now = time.monotonic()
+        return {
+            "agent": self.agent_name,
+            "models": {name: stats.to_dict(now) for name, stats in self._stats.items()},
+            "deadline_s": self.deadline,
+            "hedge_after_s": self.hedge_after,
+            "fallbacks": self._fallbacks,
+            "hedges": self._hedges,
+            "hedge_wins": self._hedge_wins,
+        }
+
+
+# Every FallbackLlm built by agent_model(), for model_stats().
+MODEL_CHAINS: list[FallbackLlm] = []
+
+
+def agent_model(prefix: str, agent_name: str) -> Union[str, BaseLlm]:
+    """The model of an agent from the `<prefix>_*` variables: a model name, or a `FallbackLlm` when fallbacks are configured."""
+    primary = os.getenv(f"{prefix}_MODEL") or GOOGLE_MODEL_NAME
+    fallbacks = [name.strip() for name in os.getenv(f"{prefix}_FALLBACK_MODELS", MODEL_FALLBACKS).split(",") if name.strip()]
+    models = [primary] + [name for name in dict.fromkeys(fallbacks) if name != primary]
+    if len(models) == 1:
+        return primary
+    chain = FallbackLlm(
+        model=primary,
+        agent_name=agent_name,
+        models=models,
+        deadline=float(os.getenv(f"{prefix}_MODEL_DEADLINE", MODEL_DEADLINE)),
+        hedge_after=float(os.getenv(f"{prefix}_MODEL_HEDGE_AFTER", MODEL_HEDGE_AFTER)),
+        cooldown=MODEL_COOLDOWN,
+    )
+    MODEL_CHAINS.append(chain)
+    logger.info("Agent '%s' uses models %s.", agent_name, " -> ".join(models))
+    return chain
+
+
+def model_stats() -> list[dict[str, Any]]:
+    """Counters of every agent with fallback models."""
+    return [chain.stats() for chain in MODEL_CHAINS]
@@ -1,21 +1,35 @@
 """This module provides an os agent that can answer questions about your personal system and the interact with it."""
 
-import os
 from google.adk.agents import Agent
-from src.agents.tools.os_tools import list_directory, read_file, path_exists, get_current_working_directory
+from src.agents.tools.os_tools import (
+    list_directory, find_files, read_file, read_file_bytes, read_file_lines, head_file, tail_file, grep_file, path_exists, get_current_working_directory
+)
+from src.agents.callbacks import chain_callbacks
+from src.agents.security.tool_guardrail import tool_policy_guardrail
+from src.agents.context_compaction import context_compactor
+from src.agents.rate_limits import model_rate_limit
+from src.agents.tracing import record_llm_usage
+from src.agents.models import agent_model
 
-GOOGLE_MODEL_NAME = os.getenv("GOOGLE_MODEL_NAME", "gemini-2.0-flash")
+OS_AGENT_MODEL = agent_model("OS_AGENT", "os_agent")
 
 OS_Agent = Agent(
     name="os_agent",
-    model=GOOGLE_MODEL_NAME,
+    model=OS_AGENT_MODEL,
     description=(
         "Agent to answer questions about and interact with the operating system and file system."
     ),
     instruction=(
         """You are an agent that can interact with the operating system and file system. 
         You have access to tools that allow you to list the contents of directories, read the content of files, check if a path exists, and get the current working directory. 
-        Use these tools to answer user questions about the file system or perform requested actions like listing files or reading file content."""
+        Use these tools to answer user questions about the file system or perform requested actions like listing files or reading file content.
+        Directory listings are paginated: use offset to get the following pages and sort_by to see the largest or newest entries first.
+        Use find_files to search a directory tree by name instead of listing every directory.
+        File outputs are limited in size. For large files such as logs, use head_file, tail_file, read_file_lines or read_file_bytes to read only the part you need,
+        and grep_file to find lines, instead of reading the whole file."""
     ),
-    tools=[list_directory, read_file, path_exists, get_current_working_directory],
+    tools=[list_directory, find_files, read_file, read_file_bytes, read_file_lines, head_file, tail_file, grep_file, path_exists, get_current_working_directory],
+    before_model_callback=chain_callbacks(model_rate_limit.before_model_callback, context_compactor.before_model_callback),
+    after_model_callback=record_llm_usage,
+    before_tool_callback=chain_callbacks(tool_policy_guardrail),
 )
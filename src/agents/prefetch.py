@@ -0,0 +1,230 @@
+"""This module provides speculative prefetching of the tool calls that a query gives away.
+
+When the query already holds the input of a tool (a URL to read, a city to check the weather of), the
+call the model makes after the root agent's delegation and the sub-agent's own model call is known
+when the request starts. With PREFETCH_ENABLED, `Prefetcher.speculate` starts those calls right away,
+so that the fetch overlaps with the model calls. Agents register a predictor turning a query into
+`Speculation`s for their tools:
+
+- answering speculations (web pages) are returned by the agent's `before_tool_callback` when the
+  model calls the tool with the same arguments, after waiting for the fetch if it still runs;
+- warming speculations (weather) only fill the cache the tool reads, as the tool result also depends
+  on the session state.
+
+Calls denied by the tool policy are never speculated, at most PREFETCH_MAX_CALLS are started per
+request, each is bounded by PREFETCH_TIMEOUT seconds, and those still running when the request ends
+are cancelled. Requests predicting the same call share it.
+"""
+
+import asyncio
+import logging
+import os
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Awaitable, Callable, Optional
+from google.adk.tools.base_tool import BaseTool
+from google.adk.tools.tool_context import ToolContext
+from src.agents.data_stores.tool_result_cache import make_key
+from src.agents.router import CITY, KNOWN_CITIES, URL, WEATHER
+from src.agents.security.tool_policy import tool_policy
+
+logger = logging.getLogger(__name__)
+
+PREFETCH_ENABLED = os.getenv("PREFETCH_ENABLED", "false").lower() in ("1", "true", "yes")
+PREFETCH_MAX_CALLS = int(os.getenv("PREFETCH_MAX_CALLS", 3))
+PREFETCH_TIMEOUT = float(os.getenv("PREFETCH_TIMEOUT", 30))
+# Name of the websurf tool fetching a URL, by default the tool whose only required parameter is 'url'.
+PREFETCH_URL_TOOL = os.getenv("PREFETCH_URL_TOOL", "")
+
+URL_TRAILING_CHARS = ".,;:!?)]}'\""
+
+
+def find_urls(query: str) -> list[str]:
+    """The http(s) URLs written in the query, without trailing punctuation."""
+    urls = []
+    for match in URL.finditer(query):
+        url = match.group(0).rstrip(URL_TRAILING_CHARS)
+        if url.lower().startswith(("http://", "https://")) and url not in urls:
+            urls.append(url)
+    return urls
+
+
+def find_weather_cities(query: str) -> list[str]:
+    """The cities of a weather question ('weather in Paris'), none for other queries."""
+    if not WEATHER.search(query):
+        return []
+    cities: dict[str, str] = {}
+    for match in [*CITY.finditer(query), *KNOWN_CITIES.finditer(query)]:
+        cities.setdefault(match.group(1).casefold(), match.group(1))
+    return list(cities.values())
+
+
+def find_url_tool(tools: list[BaseTool], name: str = PREFETCH_URL_TOOL) -> Optional[BaseTool]:
+    """The tool fetching a URL among `tools`: the one called `name`, or else the one whose only required parameter is 'url'."""
+    for tool in tools:
+        if name:
+            if tool.name == name:
+                return tool
+            continue
+        declaration = tool._get_declaration()
+        parameters = declaration.parameters if declaration is not None else None
+        if parameters is not None and list(parameters.required or []) == ["url"]:
+            return tool
+    return None
+
+
+@dataclass(slots=True)
+class Speculation:
+    """A tool call predicted from a query, and the coroutine function making it.
+
+    `answer` is False when the call only warms a cache read by the tool, whose result is then not used as is.
+    """
+    tool: str
+    args: dict[str, Any]
+    run: Callable[[], Awaitable[Any]]
+    answer: bool = True
+
+
+Predictor = Callable[[str], Awaitable[list[Speculation]]]
+
+
+@dataclass(slots=True)
+class PendingCall:
+    task: asyncio.Task
+    answer: bool
+    requests: int = 1
+    claimed: bool = False
+
+
+class Prefetcher:
+    """Runs the speculations of the registered predictors for the duration of a request."""
+
+    def __init__(self, enabled: bool = False, max_calls: int = 3, timeout: float = 30.0):
+        self.enabled = enabled
+        self.max_calls = max_calls
+        self.timeout = timeout
+        self._predictors: dict[str, Predictor] = {}
+        self._pending: dict[str, PendingCall] = {}
+
+        self.started = 0
+        self.shared = 0
+        self.denied = 0
+        self.answered = 0
+        self.warmed = 0
+        self.unused = 0
+        self.cancelled = 0
+        self.failed = 0
+
+    def register(self, agent_name: str, predictor: Predictor) -> None:
+        """Adds the predictor of an agent's tool calls. Agents register when their module is loaded, so disabled agents never prefetch."""
+        self._predictors[agent_name] = predictor
+
+    async def predict(self, query: str) -> list[Speculation]:
+        """The speculations of every predictor allowed by the tool policy, at most `max_calls`."""
+        agents = list(self._predictors)
+        results = await asyncio.gather(*(self._predictors[agent](query) for agent in agents), return_exceptions=True)
+        speculations = []
+        for agent, result in zip(agents, results):
+            if isinstance(result, Exception):
+                logger.error("Prefetch predictor of '%s' failed: %r", agent, result)
+                continue
+            for speculation in result:
+                if not tool_policy.allows(speculation.tool, agent, speculation.args):
+                    self.denied += 1
+                    continue
+                speculations.append(speculation)
+        return speculations[:self.max_calls]
+
+    @asynccontextmanager
+    async def speculate(self, query: str) -> AsyncIterator[int]:
+        """Starts the calls predicted from `query` and yields their number. Calls still running on exit are cancelled."""
+        if not self.enabled or not self._predictors:
+            yield 0
+            return
+        keys = []
+        for speculation in await self.predict(query):
+            key = make_key(speculation.tool, speculation.args)
+            pending = self._pending.get(key)
+            if pending is None:
+                logger.info("Prefetching '%s' with %s.", speculation.tool, speculation.args)
+                task = asyncio.create_task(self._run(speculation), name=f"prefetch-{speculation.tool}")
+                self._pending[key] = PendingCall(task=task, answer=speculation.answer)
+                self.started += 1
+            elif key not in keys:
+                pending.requests += 1
+                self.shared += 1
+            else:
+                continue
+            keys.append(key)
+        try:
+            yield len(keys)
+        finally:
+            for key in keys:
+                self._release(key)
+
+    async def _run(self, speculation: Speculation) -> Any:
+        """The result of the call, None if it failed or timed out (the tool is then called as usual)."""
+        try:
+            return await asyncio.wait_for(speculation.run(), self.timeout)
+        except Exception as e:
+            self.failed += 1
+            logger.warning("Prefetch of '%s' with %s failed: %r", speculation.tool, speculation.args, e)
+            return None
+
+    def _release(self, key: str) -> None:
+        pending = self._pending[key]
+        pending.requests -= 1
+        if pending.requests > 0:
+            return
+        del self._pending[key]
+        if not pending.task.done():
+            pending.task.cancel()
+            self.cancelled += 1
+        elif not pending.answer:
+            self.warmed += 1
+        elif not pending.claimed:
+            self.unused += 1
+
+    # --- ADK callbacks ---
+    async def before_tool_callback(self, tool: BaseTool, args: dict[str, Any], tool_context: ToolContext) -> Optional[Any]:
+        """Answers the call with the result of the matching speculation, skipping the tool."""
+        key = make_key(tool.name, args)
+        pending = self._pending.get(key) if self._pending else None
+        if pending is None or not pending.answer:
+            return None
+        pending.claimed = True
+        # The claim holds the call like a request, so that the request which predicted it cannot cancel it on exit
+        # while this (possibly unrelated) run waits; shielded, so that this run going away does not cancel it either.
+        pending.requests += 1
+        try:
+            result = await asyncio.shield(pending.task)
+        except asyncio.CancelledError:
+            if not pending.task.cancelled():
+                raise
+            return None
+        finally:
+            self._release(key)
+        if result is None:
+            return None
+        self.answered += 1
+        logger.info(f"--- Callback: Serving '{tool.name}' from a prefetched call. ---")
+        return result
+
+    def stats(self) -> dict[str, Any]:
+        """Speculation counters: `answered` tool calls got a prefetched result, `unused` and `cancelled` ones were never called."""
+        return {
+            "enabled": self.enabled,
+            "predictors": list(self._predictors),
+            "inflight": len(self._pending),
+            "started": self.started,
+            "shared": self.shared,
+            "denied": self.denied,
+            "answered": self.answered,
+            "warmed": self.warmed,
+            "unused": self.unused,
+            "cancelled": self.cancelled,
+            "failed": self.failed,
+        }
+
+
+prefetcher = Prefetcher(enabled=PREFETCH_ENABLED, max_calls=PREFETCH_MAX_CALLS, timeout=PREFETCH_TIMEOUT)
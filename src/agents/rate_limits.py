@@ -0,0 +1,148 @@
+"""This module provides token-bucket rate limits for the downstream services called by the agents.
+
+Each downstream (the model, the DuckDuckGo MCP server, the websurf MCP server) has its own bucket,
+attached to the agents through callbacks. Calls wait for a token up to RATE_LIMIT_MAX_WAIT seconds:
+a model call that cannot get a token fails the request with `RateLimitExceeded` (answered with 503 by
+'/chat'), a tool call that cannot get one returns an error to the model instead of running.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Optional
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models.llm_request import LlmRequest
+from google.adk.tools.base_tool import BaseTool
+from google.adk.tools.tool_context import ToolContext
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_MAX_WAIT = float(os.getenv("RATE_LIMIT_MAX_WAIT", 30))
+
+
+class RateLimitExceeded(Exception):
+    """Raised when a downstream call could not get a token in time."""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"Rate limit of '{name}' exceeded, retry after {retry_after:.0f}s.")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """Token bucket refilled at `rate` tokens per second up to `burst`. A rate of 0 disables the limit.
+
+    Tokens are reserved when a call is admitted (the balance may go negative), so waiting calls are
+    served in arrival order without polling.
+    """
+
+    def __init__(self, name: str, rate: float, burst: float, max_wait: float = RATE_LIMIT_MAX_WAIT):
+        self.name = name
+        self.rate = rate
+        self.burst = max(burst, 1.0)
+        self.max_wait = max_wait
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+
+        self.waiting = 0
+        self.acquired = 0
+        self.throttled = 0
+        self.rejected = 0
+        self.total_wait = 0.0
+        self.max_observed_wait = 0.0
+
+    @classmethod
+    def from_env(cls, name: str, prefix: str, rate: float, burst: float) -> "TokenBucket":
+        """Builds a bucket from the <prefix>_RATE_LIMIT (calls per second) and <prefix>_RATE_BURST environment variables."""
+        return cls(
+            name=name,
+            rate=float(os.getenv(f"{prefix}_RATE_LIMIT", rate)),
+            burst=float(os.getenv(f"{prefix}_RATE_BURST", burst)),
+        )
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self) -> Optional[float]:
+        """Takes a token and returns the seconds to wait before using it, or None if the wait would exceed `max_wait`."""
+        if self.rate <= 0:
+            return 0.0
+        self._refill(time.monotonic())
+        wait = max(0.0, (1.0 - self._tokens) / self.rate)
+        if wait > self.max_wait:
+            self.rejected += 1
+            return None
+        self._tokens -= 1.0
+        return wait
+
+    def retry_after(self) -> float:
+        """Seconds until a call would be admitted again."""
+        if self.rate <= 0:
+            return 0.0
+        self._refill(time.monotonic())
+        return max(0.0, (1.0 - self._tokens) / self.rate - self.max_wait)
+
+    async def acquire(self) -> bool:
+        """Waits for a token. Returns False, without waiting, if it would take longer than `max_wait`."""
+        wait = self.reserve()
+        if wait is None:
+            return False
+        self.acquired += 1
+        if wait > 0:
+            self.throttled += 1
+            self.total_wait += wait
+            self.max_observed_wait = max(self.max_observed_wait, wait)
+            self.waiting += 1
+            try:
+                await asyncio.sleep(wait)
+            finally:
+                self.waiting -= 1
+        return True
+
+    # --- ADK callbacks ---
+    async def before_model_callback(self, callback_context: CallbackContext, llm_request: LlmRequest) -> None:
+        """Waits for a model call token, failing the run with `RateLimitExceeded` if none is available in time."""
+        if not await self.acquire():
+            logger.error(f"--- Callback: Rate limit of '{self.name}' exceeded for agent {callback_context.agent_name}. ---")
+            raise RateLimitExceeded(self.name, self.retry_after())
+        return None
+
+    async def before_tool_callback(self, tool: BaseTool, args: dict[str, Any], tool_context: ToolContext) -> Optional[dict]:
+        """Waits for a tool call token, answering with an error instead of calling the tool if none is available in time."""
+        if await self.acquire():
+            return None
+        logger.error(f"--- Callback: Rate limit of '{self.name}' exceeded, skipping tool '{tool.name}'. ---")
+        return {
+            "status": "error",
+            "error_message": f"The {self.name} service is rate limited, please try again in {max(1, round(self.retry_after()))} seconds."
+        }
+
+    def stats(self) -> dict[str, Any]:
+        """Throttling counters."""
+        return {
+            "name": self.name,
+            "rate": self.rate,
+            "burst": self.burst,
+            "tokens": round(self._tokens, 2),
+            "waiting": self.waiting,
+            "acquired": self.acquired,
+            "throttled": self.throttled,
+            "rejected": self.rejected,
+            "avg_wait_ms": self.total_wait / self.acquired * 1000 if self.acquired else 0.0,
+            "max_wait_ms": self.max_observed_wait * 1000,
+        }
+
+
+# One bucket per downstream, shared by every agent of the process.
+model_rate_limit = TokenBucket.from_env("model", "MODEL", rate=10, burst=10)
+search_rate_limit = TokenBucket.from_env("duckduckgo", "SEARCH", rate=1, burst=3)
+websurf_rate_limit = TokenBucket.from_env("websurf", "WEBSURF", rate=5, burst=5)
+
+RATE_LIMITS = [model_rate_limit, search_rate_limit, websurf_rate_limit]
+
+
+def rate_limit_stats() -> list[dict[str, Any]]:
+    """Counters of every downstream bucket, for the '/metrics' endpoint."""
+    return [bucket.stats() for bucket in RATE_LIMITS]
@@ -0,0 +1,103 @@
+"""This module provides a pre-router that sends obvious requests straight to a sub-agent.
+
+Without it every request first goes through the 'Great_Sage' model, whose only job is often to call
+`transfer_to_agent`. The pre-router uses cheap local signals (URLs, weather and time phrasing, path-like
+tokens, explicit search requests) and only routes when exactly one sub-agent matches with enough
+confidence; everything else falls back to the root agent.
+"""
+
+import logging
+import re
+from dataclasses import dataclass
+from typing import Optional
+from src.agents.security.keyword_matcher import keyword_guardrail
+
+logger = logging.getLogger(__name__)
+
+OS_AGENT = "os_agent"
+WEATHER_AGENT = "weather_time_agent"
+SEARCH_AGENT = "search_agent"
+WEBSURF_AGENT = "websurf_agent"
+
+URL = re.compile(r"\bhttps?://[^\s<>\"']+|\bwww\.[a-z0-9-]+(?:\.[a-z0-9-]+)+[^\s<>\"']*", re.IGNORECASE)
+WEATHER = re.compile(r"\b(weather|temperature|forecast|raining|rain|snowing|sunny|humid|humidity|hot|cold|degrees)\b", re.IGNORECASE)
+TIME = re.compile(r"\b(what time|current time|time is it|local time|time (?:now )?in)\b", re.IGNORECASE)
+CITY = re.compile(r"\b(?:in|at|for)\s+([A-Z][a-zA-Z]+(?:\s+[A-Z][a-zA-Z]+)?)")
+KNOWN_CITIES = re.compile(r"\b(new york|london|tokyo|paris)\b", re.IGNORECASE)
+# A separator must be followed by a path component with a letter, so that '20 / 5' or '10 /2' is not a path.
+PATH = re.compile(r"(?:^|\s)(?:[a-zA-Z]:\\|~/|\.{1,2}/|/)(?=[\w.\-]*[a-zA-Z_])[\w.\-][\w.\-/\\]*")
+FILE_NAME = re.compile(r"\b[\w\-]+\.(?:txt|py|log|md|json|csv|ya?ml|toml|ini|cfg|xml|html|sh|bat)\b")
+FILE_VERBS = re.compile(r"\b(open|read|show|cat|print|display|view|edit|inside|contents?|lines?|size of)\b", re.IGNORECASE)
+OS_PHRASES = re.compile(
+    r"\b(list (?:the )?(?:files|contents|directory|folder)|read (?:the )?file|contents of|working directory|cwd|"
+    r"does (?:the )?(?:file|folder|directory|path)|(?:file|folder|directory|path) exists?)\b",
+    re.IGNORECASE
+)
+SEARCH = re.compile(r"\b(search(?: the web)?(?: for)?|look up|google|duckduckgo|find (?:information|info|articles) (?:on|about)|latest news)\b", re.IGNORECASE)
+
+
+@dataclass
+class RouteDecision:
+    """The pre-router's choice: a sub-agent name, or None to use the root agent."""
+    agent: Optional[str]
+    confidence: float
+    reason: str
+
+
+def _candidates(query: str) -> dict[str, tuple[float, str]]:
+    """Scores every sub-agent whose signals appear in the query."""
+    candidates: dict[str, tuple[float, str]] = {}
+
+    if URL.search(query):
+        candidates[WEBSURF_AGENT] = (0.95, "url")
+        # Words inside URLs (e.g. 'google.com', 'README.md') are not signals for the other agents.
+        query = URL.sub(" ", query)
+
+    weather = WEATHER.search(query)
+    time = TIME.search(query)
+    if weather or time:
+        has_city = bool(KNOWN_CITIES.search(query) or CITY.search(query))
+        signal = "weather" if weather else "time"
+        candidates[WEATHER_AGENT] = (0.92, f"{signal}+city") if has_city else (0.7, signal)
+
+    if OS_PHRASES.search(query):
+        candidates[OS_AGENT] = (0.9, "os phrase")
+    elif PATH.search(query):
+        candidates[OS_AGENT] = (0.85, "path")
+    elif FILE_NAME.search(query):
+        # A bare file name is often just a topic ('explain the config.json format'), only a file operation routes it.
+        candidates[OS_AGENT] = (0.85, "file name+verb") if FILE_VERBS.search(query) else (0.6, "file name")
+
+    if SEARCH.search(query):
+        candidates[SEARCH_AGENT] = (0.88, "search phrase")
+
+    return candidates
+
+
+def route_query(query: str) -> RouteDecision:
+    """Picks the sub-agent for a query, or the root agent (None) when unsure."""
+    if not query or not query.strip():
+        return RouteDecision(None, 0.0, "empty")
+    # Let the root agent's guardrail handle blocked requests.
+    if keyword_guardrail.find(query) is not None:
+        return RouteDecision(None, 0.0, "blocked keyword")
+
+    candidates = _candidates(query)
+    if not candidates:
+        return RouteDecision(None, 0.0, "no signal")
+    if len(candidates) > 1:
+        return RouteDecision(None, 0.0, "ambiguous: " + ", ".join(sorted(candidates)))
+
+    agent, (confidence, reason) = next(iter(candidates.items()))
+    return RouteDecision(agent, confidence, reason)
+
+
+def select_agent(query: str, min_confidence: float = 0.8) -> Optional[str]:
+    """Returns the sub-agent to run the query directly, or None to use the root agent. Logs the decision."""
+    decision = route_query(query)
+    routed = decision.agent if decision.confidence >= min_confidence else None
+    logger.info(
+        f"Pre-router: agent={routed or 'root'}, candidate={decision.agent}, "
+        f"confidence={decision.confidence:.2f}, reason={decision.reason}"
+    )
+    return routed
@@ -1,14 +1,20 @@
 """This module provides a map agent that can answer questions using DuckDuckGo Search Engine."""
 
-import os
 from google.adk.agents import LlmAgent
 from src.agents.tools.search_tools import duckduckgo_search_tool
+from src.agents.data_stores.tool_result_cache import tool_result_cache
+from src.agents.callbacks import chain_callbacks
+from src.agents.security.tool_guardrail import tool_policy_guardrail
+from src.agents.tracing import record_llm_usage
+from src.agents.models import agent_model
+from src.agents.context_compaction import context_compactor
+from src.agents.rate_limits import model_rate_limit, search_rate_limit
 
-GOOGLE_MODEL_NAME = os.getenv("GOOGLE_MODEL_NAME", "gemini-2.0-flash")
+SEARCH_AGENT_MODEL = agent_model("SEARCH_AGENT", "search_agent")
 
 Search_Agent = LlmAgent(
     name="search_agent",
-    model=GOOGLE_MODEL_NAME,
+    model=SEARCH_AGENT_MODEL,
     description=(
         "Agent to answer questions using DuckDuckGo Search Engine."
     ),
@@ -18,4 +24,9 @@ Search_Agent = LlmAgent(
             Use your access to DuckDuckGo to find relevant, accurate, and timely information in response to user queries."""
     ),
     tools=[duckduckgo_search_tool],
+    before_model_callback=chain_callbacks(model_rate_limit.before_model_callback, context_compactor.before_model_callback),
+    after_model_callback=record_llm_usage,
+    # Cache hits do not consume a rate limit token.
+    before_tool_callback=chain_callbacks(tool_policy_guardrail, tool_result_cache.before_tool_callback, search_rate_limit.before_tool_callback),
+    after_tool_callback=tool_result_cache.after_tool_callback,
 )
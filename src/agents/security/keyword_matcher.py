@@ -0,0 +1,186 @@
+"""This module provides a compiled matcher for the blocked keyword and regex lists.
+
+Keywords are matched against the Unicode-casefolded message with an Aho-Corasick automaton when the
+optional `pyahocorasick` package is installed, otherwise they are folded into a single trie-shaped
+regex (shared prefixes are matched once). Either way a scan is a single pass over the message, and
+the policy regexes are combined into one more pattern.
+
+The lists come from `BLOCKED_KEYWORDS` and, optionally, from GUARDRAIL_KEYWORDS_FILE: one keyword per
+line, `re:` prefixed lines are regexes, `#` starts a comment. The file is checked for changes at most
+every GUARDRAIL_RELOAD_INTERVAL seconds and recompiled without a restart; a file that fails to compile
+is logged and the previous matcher is kept.
+"""
+
+import logging
+import os
+import re
+import time
+from typing import Iterable, Optional
+from src.agents.security.blocked_keywords import BLOCKED_KEYWORDS
+
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+logger = logging.getLogger(__name__)
+
+GUARDRAIL_KEYWORDS_FILE = os.getenv("GUARDRAIL_KEYWORDS_FILE", "")
+GUARDRAIL_RELOAD_INTERVAL = float(os.getenv("GUARDRAIL_RELOAD_INTERVAL", 5))
+GUARDRAIL_WORD_BOUNDARIES = os.getenv("GUARDRAIL_WORD_BOUNDARIES", "false").lower() in ("1", "true", "yes")
+
+REGEX_PREFIX = "re:"
+
+
+def trie_pattern(terms: Iterable[str]) -> Optional[str]:
+    """Builds a regex matching any of `terms`, factored along their common prefixes."""
+    trie: dict = {}
+    for term in terms:
+        if not term:
+            continue
+        node = trie
+        for char in term:
+            node = node.setdefault(char, {})
+        node[""] = {}
+    return _node_pattern(trie) if trie else None
+
+
+def _node_pattern(node: dict) -> str:
+    nested = []
+    single_chars = []
+    for char in sorted(key for key in node if key):
+        child = node[char]
+        if list(child) == [""]:
+            single_chars.append(re.escape(char))
+        else:
+            nested.append(re.escape(char) + _node_pattern(child))
+
+    alternatives = list(nested)
+    if single_chars:
+        alternatives.append(single_chars[0] if len(single_chars) == 1 else f"[{''.join(single_chars)}]")
+    pattern = alternatives[0] if len(alternatives) == 1 else f"(?:{'|'.join(alternatives)})"
+    if "" in node:
+        # A term ends here and longer ones continue: the rest is optional.
+        pattern = f"{pattern}?" if not nested else f"(?:{pattern})?"
+    return pattern
+
+
+def is_word_at(text: str, start: int, end: int) -> bool:
+    """Returns True if text[start:end] is not glued to other word characters."""
+    return (start == 0 or not text[start - 1].isalnum() and text[start - 1] != "_") and \
+        (end == len(text) or not text[end].isalnum() and text[end] != "_")
+
+
+def original_span(text: str, folded: str, start: int, end: int) -> str:
+    """Maps folded[start:end] back to the characters of `text` it was folded from."""
+    if len(folded) == len(text):
+        return text[start:end]
+    # Casefolding can lengthen characters ("ß" -> "ss"): map each folded offset to its source character.
+    origins = [index for index, char in enumerate(text) for _ in char.casefold()]
+    first = origins[start]
+    last = origins[end - 1] + 1 if end > start else first
+    return text[first:last]
+
+
+class KeywordMatcher:
+    """Keywords and regexes compiled for a single casefolded scan."""
+
+    def __init__(self, keywords: Iterable[str] = (), patterns: Iterable[str] = (), word_boundaries: bool = False, use_automaton: bool = True):
+        self.keywords = sorted({keyword.casefold() for keyword in keywords if keyword and keyword.strip()})
+        self.patterns = [pattern for pattern in patterns if pattern]
+        self.word_boundaries = word_boundaries
+
+        self._automaton = None
+        parts = []
+        if self.keywords and use_automaton and ahocorasick is not None:
+            self._automaton = ahocorasick.Automaton()
+            for keyword in self.keywords:
+                self._automaton.add_word(keyword, keyword)
+            self._automaton.make_automaton()
+        elif self.keywords:
+            keyword_pattern = trie_pattern(self.keywords)
+            parts.append(rf"(?<!\w){keyword_pattern}(?!\w)" if word_boundaries else keyword_pattern)
+        # Regexes are matched against the casefolded text too, so their literal parts are case-insensitive.
+        parts.extend(f"(?i:{pattern})" for pattern in self.patterns)
+        self._regex = re.compile("|".join(parts)) if parts else None
+
+    def find(self, text: str) -> Optional[str]:
+        """Returns the span of `text` matching a blocked keyword or regex, as it was written, or None."""
+        if not text:
+            return None
+        folded = text.casefold()
+        if self._automaton is not None:
+            for end, keyword in self._automaton.iter(folded):
+                start = end + 1 - len(keyword)
+                if not self.word_boundaries or is_word_at(folded, start, end + 1):
+                    return original_span(text, folded, start, end + 1)
+        if self._regex is not None:
+            match = self._regex.search(folded)
+            if match:
+                return original_span(text, folded, match.start(), match.end())
+        return None
+
+
+def parse_terms(lines: Iterable[str]) -> tuple[list[str], list[str]]:
+    """Splits the lines of a keywords file into keywords and regexes."""
+    keywords, patterns = [], []
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        if line.startswith(REGEX_PREFIX):
+            patterns.append(line[len(REGEX_PREFIX):].strip())
+        else:
+            keywords.append(line)
+    return keywords, patterns
+
+
+class KeywordGuardrail:
+    """Blocked terms matcher, hot-reloaded from `path` when the file changes."""
+
+    def __init__(self, keywords: Iterable[str] = (), path: str = "", reload_interval: float = 5.0, word_boundaries: bool = False):
+        self.base_keywords = list(keywords)
+        self.path = path
+        self.reload_interval = reload_interval
+        self.word_boundaries = word_boundaries
+        self._mtime: Optional[float] = None
+        self._checked = 0.0
+        self.reloads = 0
+        self.matcher = KeywordMatcher(self.base_keywords, word_boundaries=word_boundaries)
+        self._reload_if_changed(force=True)
+
+    def _reload_if_changed(self, force: bool = False) -> None:
+        if not self.path:
+            return
+        now = time.monotonic()
+        if not force and now - self._checked < self.reload_interval:
+            return
+        self._checked = now
+        try:
+            mtime = os.stat(self.path).st_mtime
+            if mtime == self._mtime:
+                return
+            # A broken file is reported once, then retried when it changes again.
+            self._mtime = mtime
+            with open(self.path, encoding="utf-8") as file:
+                keywords, patterns = parse_terms(file)
+            matcher = KeywordMatcher(self.base_keywords + keywords, patterns, word_boundaries=self.word_boundaries)
+        except (OSError, UnicodeDecodeError, re.error) as e:
+            logger.error("Could not load blocked keywords from '%s', keeping the current list: %s", self.path, e)
+            return
+        self.matcher = matcher
+        self.reloads += 1
+        logger.info("Loaded %d blocked keywords and %d regexes from '%s'.", len(matcher.keywords), len(matcher.patterns), self.path)
+
+    def find(self, text: str) -> Optional[str]:
+        """Returns the first blocked term found in `text`, as written there, or None."""
+        self._reload_if_changed()
+        return self.matcher.find(text)
+
+
+keyword_guardrail = KeywordGuardrail(
+    BLOCKED_KEYWORDS,
+    path=GUARDRAIL_KEYWORDS_FILE,
+    reload_interval=GUARDRAIL_RELOAD_INTERVAL,
+    word_boundaries=GUARDRAIL_WORD_BOUNDARIES
+)
@@ -0,0 +1,264 @@
+"""This module provides a declarative allow/deny policy for tool calls.
+
+The policy is a JSON file (TOOL_POLICY_FILE, by default `tool_policy.json` next to this module):
+
+    {
+      "default": "allow",
+      "rules": [
+        {"tool": "get_weather_stateful", "action": "deny", "args": {"city": "paris"},
+         "message": "Weather checks for '{city:capitalize}' are currently disabled.", "state": {"guardrail_tool_block_triggered": true}},
+        {"tool": "read_file*", "agent": "os_agent", "action": "deny", "args": {"path": {"prefix": ["/etc/", "~/.ssh"]}}}
+      ]
+    }
+
+`tool` and `agent` are names or globs (`agent` is optional). Every condition of `args` must hold;
+a condition is a value or list of values (compared casefolded), or an object with any of `equals`,
+`prefix`, `contains` (keywords), `glob`, `regex`, `min` and `max`. The first matching rule decides,
+in file order; calls that match no rule get `default`. A rule's `message` is formatted with the call's
+arguments and `tool`, and a field can be cased with `:capitalize`, `:lower`, `:upper` or `:title`.
+Rules are indexed by tool name, so a call only evaluates the rules that can apply to its tool, and
+matchers are compiled when the file is loaded. The file is checked for changes at most every TOOL_POLICY_RELOAD_INTERVAL seconds and
+recompiled without a restart; a file that fails to load is logged and the previous policy is kept.
+"""
+
+import fnmatch
+import json
+import logging
+import os
+import re
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Iterable, Optional
+from src.agents.security.keyword_matcher import KeywordMatcher
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TOOL_POLICY_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tool_policy.json")
+TOOL_POLICY_FILE = os.getenv("TOOL_POLICY_FILE", DEFAULT_TOOL_POLICY_FILE)
+TOOL_POLICY_RELOAD_INTERVAL = float(os.getenv("TOOL_POLICY_RELOAD_INTERVAL", 5))
+
+ACTIONS = ("allow", "deny")
+GLOB_CHARS = re.compile(r"[*?\[]")
+
+Matcher = Callable[[Any], bool]
+
+TEXT_TRANSFORMS = ("capitalize", "lower", "upper", "title")
+
+
+class MessageValue(str):
+    """An argument in a deny message, taking a text transform as its format spec, e.g. '{city:capitalize}'."""
+
+    def __format__(self, spec: str) -> str:
+        if spec in TEXT_TRANSFORMS:
+            return getattr(str(self), spec)()
+        return super().__format__(spec)
+
+
+def fold(value: Any) -> str:
+    return str(value).strip().casefold()
+
+
+def as_list(value: Any) -> list:
+    return list(value) if isinstance(value, (list, tuple, set)) else [value]
+
+
+def compile_matcher(spec: Any) -> Matcher:
+    """Compiles the condition of one argument into a predicate. Raises ValueError for unknown operators."""
+    if not isinstance(spec, dict):
+        spec = {"equals": spec}
+    unknown = set(spec) - {"equals", "prefix", "contains", "glob", "regex", "min", "max"}
+    if unknown:
+        raise ValueError(f"unknown argument operators {sorted(unknown)}")
+
+    checks: list[Matcher] = []
+    if "equals" in spec:
+        values = frozenset(fold(value) for value in as_list(spec["equals"]))
+        checks.append(lambda value: fold(value) in values)
+    if "prefix" in spec:
+        prefixes = tuple(fold(prefix) for prefix in as_list(spec["prefix"]))
+        checks.append(lambda value: fold(value).startswith(prefixes))
+    if "contains" in spec:
+        keywords = KeywordMatcher(as_list(spec["contains"]))
+        checks.append(lambda value: keywords.find(str(value)) is not None)
+    if "glob" in spec:
+        glob = re.compile("|".join(fnmatch.translate(fold(pattern)) for pattern in as_list(spec["glob"])))
+        checks.append(lambda value: glob.match(fold(value)) is not None)
+    if "regex" in spec:
+        regex = re.compile("|".join(f"(?:{pattern})" for pattern in as_list(spec["regex"])), re.IGNORECASE)
+        checks.append(lambda value: regex.search(str(value)) is not None)
+    if "min" in spec:
+        low = float(spec["min"])
+        checks.append(lambda value: isinstance(value, (int, float)) and value >= low)
+    if "max" in spec:
+        high = float(spec["max"])
+        checks.append(lambda value: isinstance(value, (int, float)) and value <= high)
+
+    if len(checks) == 1:
+        return checks[0]
+    return lambda value: all(check(value) for check in checks)
+
+
+def name_matcher(pattern: Optional[str]) -> Optional[Matcher]:
+    """Predicate on a tool or agent name, None when `pattern` matches every name."""
+    if pattern is None or pattern == "*":
+        return None
+    if GLOB_CHARS.search(pattern):
+        regex = re.compile(fnmatch.translate(pattern))
+        return lambda name: regex.match(name) is not None
+    return lambda name: name == pattern
+
+
+@dataclass(slots=True)
+class PolicyRule:
+    """One compiled rule."""
+    order: int
+    tool: str
+    action: str
+    args: tuple[tuple[str, Matcher], ...] = ()
+    agent: Optional[Matcher] = None
+    message: Optional[str] = None
+    state: dict[str, Any] = field(default_factory=dict)
+
+    def matches(self, agent_name: str, args: dict[str, Any]) -> bool:
+        if self.agent is not None and not self.agent(agent_name):
+            return False
+        for name, matcher in self.args:
+            value = args.get(name)
+            if value is None:
+                # Argument names written with another case, e.g. 'City' for 'city'.
+                value = next((item for key, item in args.items() if key.casefold() == name.casefold()), None)
+            if value is None or not matcher(value):
+                return False
+        return True
+
+
+@dataclass(slots=True)
+class Decision:
+    """Outcome of the policy for one call."""
+    allowed: bool
+    rule: Optional[PolicyRule] = None
+
+    def message(self, tool_name: str, args: dict[str, Any]) -> str:
+        template = self.rule.message if self.rule is not None and self.rule.message else "Tool '{tool}' is not allowed with these arguments."
+        values = {key.casefold(): MessageValue(value) for key, value in args.items()} | {key: MessageValue(value) for key, value in args.items()}
+        return template.format_map(defaultdict(MessageValue, values, tool=MessageValue(tool_name)))
+
+
+def compile_rules(rules: Iterable[dict]) -> list[PolicyRule]:
+    """Compiles the rule objects of a policy file. Raises ValueError for invalid rules."""
+    compiled = []
+    for order, rule in enumerate(rules):
+        action = rule.get("action", "deny")
+        if action not in ACTIONS:
+            raise ValueError(f"rule {order}: action must be one of {ACTIONS}, not '{action}'")
+        if "tool" not in rule:
+            raise ValueError(f"rule {order}: 'tool' is required")
+        try:
+            args = tuple((name, compile_matcher(spec)) for name, spec in (rule.get("args") or {}).items())
+        except (ValueError, re.error) as e:
+            raise ValueError(f"rule {order}: {e}") from e
+        compiled.append(PolicyRule(
+            order=order, tool=rule["tool"], action=action, args=args, agent=name_matcher(rule.get("agent")),
+            message=rule.get("message"), state=dict(rule.get("state") or {}),
+        ))
+    return compiled
+
+
+class ToolPolicy:
+    """Compiled rules indexed by tool name."""
+
+    def __init__(self, rules: Iterable[PolicyRule] = (), default: str = "allow"):
+        self.rules = list(rules)
+        self.default_allowed = default != "deny"
+        self._exact: dict[str, list[PolicyRule]] = defaultdict(list)
+        self._patterns: list[tuple[Matcher, PolicyRule]] = []
+        for rule in self.rules:
+            matcher = name_matcher(rule.tool)
+            if matcher is not None and not GLOB_CHARS.search(rule.tool):
+                self._exact[rule.tool].append(rule)
+            else:
+                self._patterns.append((matcher or (lambda name: True), rule))
+        # Rules applying to each tool seen so far, in file order.
+        self._by_tool: dict[str, tuple[PolicyRule, ...]] = {}
+
+    def rules_for(self, tool_name: str) -> tuple[PolicyRule, ...]:
+        rules = self._by_tool.get(tool_name)
+        if rules is None:
+            candidates = self._exact.get(tool_name, []) + [rule for matcher, rule in self._patterns if matcher(tool_name)]
+            rules = self._by_tool[tool_name] = tuple(sorted(candidates, key=lambda rule: rule.order))
+        return rules
+
+    def evaluate(self, tool_name: str, agent_name: str, args: dict[str, Any]) -> Decision:
+        """The decision of the first rule matching the call, or the default."""
+        for rule in self.rules_for(tool_name):
+            if rule.matches(agent_name, args):
+                return Decision(allowed=rule.action == "allow", rule=rule)
+        return Decision(allowed=self.default_allowed)
+
+
+class ToolPolicyEngine:
+    """Tool policy hot-reloaded from `path` when the file changes."""
+
+    def __init__(self, path: str = "", reload_interval: float = 5.0):
+        self.path = path
+        self.reload_interval = reload_interval
+        self._mtime: Optional[float] = None
+        self._checked = 0.0
+        self.policy = ToolPolicy()
+
+        self.reloads = 0
+        self.evaluations = 0
+        self.denials = 0
+        self._reload_if_changed(force=True)
+
+    def _reload_if_changed(self, force: bool = False) -> None:
+        if not self.path:
+            return
+        now = time.monotonic()
+        if not force and now - self._checked < self.reload_interval:
+            return
+        self._checked = now
+        try:
+            mtime = os.stat(self.path).st_mtime
+            if mtime == self._mtime:
+                return
+            # A broken file is reported once, then retried when it changes again.
+            self._mtime = mtime
+            with open(self.path, encoding="utf-8") as file:
+                config = json.load(file)
+            policy = ToolPolicy(compile_rules(config.get("rules", [])), default=config.get("default", "allow"))
+        except (OSError, ValueError, AttributeError) as e:
+            logger.error("Could not load the tool policy from '%s', keeping the current rules: %s", self.path, e)
+            return
+        self.policy = policy
+        self.reloads += 1
+        logger.info("Loaded %d tool policy rules from '%s'.", len(policy.rules), self.path)
+
+    def evaluate(self, tool_name: str, agent_name: str, args: dict[str, Any]) -> Decision:
+        """Evaluates a tool call against the current policy."""
+        self._reload_if_changed()
+        decision = self.policy.evaluate(tool_name, agent_name, args)
+        self.evaluations += 1
+        if not decision.allowed:
+            self.denials += 1
+        return decision
+
+    def allows(self, tool_name: str, agent_name: str, args: dict[str, Any]) -> bool:
+        """Whether the current policy allows a call, without counting it (e.g. before prefetching it)."""
+        self._reload_if_changed()
+        return self.policy.evaluate(tool_name, agent_name, args).allowed
+
+    def stats(self) -> dict[str, Any]:
+        """Policy counters."""
+        return {
+            "path": self.path,
+            "rules": len(self.policy.rules),
+            "default": "allow" if self.policy.default_allowed else "deny",
+            "reloads": self.reloads,
+            "evaluations": self.evaluations,
+            "denials": self.denials,
+        }
+
+
+tool_policy = ToolPolicyEngine(path=TOOL_POLICY_FILE, reload_interval=TOOL_POLICY_RELOAD_INTERVAL)
@@ -0,0 +1,356 @@
+"""This module provides a pool of warm MCP stdio servers shared by concurrent tool calls.
+
+`MCPToolset` starts its stdio server (e.g. `docker run -i --rm mcp/duckduckgo`) lazily and funnels every
+call through a single session. `PooledMCPToolset` instead pre-starts a configurable number of servers,
+hands an idle one to each tool call, health-checks them with MCP pings and restarts the ones that die.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, List, Optional, Union
+import anyio
+from google.adk.agents.readonly_context import ReadonlyContext
+from google.adk.tools.base_tool import BaseTool
+from google.adk.tools.base_toolset import BaseToolset, ToolPredicate
+from google.adk.tools.mcp_tool.mcp_tool import MCPTool
+from google.adk.tools.tool_context import ToolContext
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.stdio import stdio_client
+from mcp.shared.exceptions import McpError
+from mcp.types import CONNECTION_CLOSED
+from mcp.types import Tool as McpBaseTool
+
+logger = logging.getLogger(__name__)
+
+# Errors meaning the server process or its pipes are gone, as opposed to a tool level error.
+CONNECTION_ERRORS = (anyio.ClosedResourceError, anyio.BrokenResourceError, anyio.EndOfStream, ConnectionError)
+
+
+
+def is_connection_error(error: BaseException) -> bool:
+    """Returns True if `error` means the server connection is gone."""
+    if isinstance(error, McpError):
+        return error.error.code == CONNECTION_CLOSED
+    return isinstance(error, CONNECTION_ERRORS)
+
+# Every pool created in this process, started and stopped together from the FastAPI lifespan.
+MCP_POOLS: list["MCPSessionPool"] = []
+
+# When the pools start their servers: 'eager' (application startup waits for them), 'background'
+# (started on startup without blocking it; early tool calls wait for a ready server) or 'lazy' (first tool call).
+MCP_POOL_START = os.getenv("MCP_POOL_START", "background").lower()
+_background_start: Optional[asyncio.Task] = None
+
+
+class PooledServer:
+    """One stdio MCP server process and its initialized client session.
+
+    The stdio and session contexts are entered and exited by a dedicated task, as anyio requires,
+    so the server can be restarted from any task.
+    """
+
+    def __init__(self, name: str, connection_params: StdioServerParameters):
+        self.name = name
+        self.connection_params = connection_params
+        self.session: Optional[ClientSession] = None
+        self.state = "stopped"
+        self.queued = False
+        self._task: Optional[asyncio.Task] = None
+        self._stop: Optional[asyncio.Event] = None
+
+    @property
+    def alive(self) -> bool:
+        return self.session is not None and self._task is not None and not self._task.done()
+
+    async def start(self, timeout: float) -> None:
+        """Starts the server process and waits for the MCP handshake to finish."""
+        self.state = "starting"
+        self._stop = asyncio.Event()
+        ready = asyncio.get_running_loop().create_future()
+        self._task = asyncio.create_task(self._serve(ready), name=f"mcp-server-{self.name}")
+        try:
+            await asyncio.wait_for(ready, timeout=timeout)
+        except BaseException:
+            await self.stop()
+            raise
+        self.state = "ready"
+
+    async def _serve(self, ready: asyncio.Future) -> None:
+        try:
+            async with stdio_client(self.connection_params) as (read, write):
+                async with ClientSession(read, write) as session:
+                    await session.initialize()
+                    self.session = session
+                    ready.set_result(None)
+                    await self._stop.wait()
+        except Exception as e:
+            if not ready.done():
+                ready.set_exception(e)
+            else:
+                logger.error(f"MCP server '{self.name}' exited unexpectedly: {e}")
+        finally:
+            self.session = None
+            if not ready.done():
+                ready.cancel()
+
+    async def ping(self, timeout: float) -> bool:
+        """Returns True if the server answers an MCP ping in time."""
+        if not self.alive:
+            return False
+        try:
+            await asyncio.wait_for(self.session.send_ping(), timeout=timeout)
+            return True
+        except Exception:
+            return False
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """Closes the session and terminates the server process."""
+        self.state = "stopped"
+        if self._task is None:
+            return
+        self._stop.set()
+        try:
+            await asyncio.wait_for(self._task, timeout=timeout)
+        except BaseException:
+            self._task.cancel()
+        self._task = None
+
+
+class MCPSessionPool:
+    """A fixed size pool of warm MCP stdio servers for one toolset."""
+
+    def __init__(self, name: str, connection_params: StdioServerParameters, size: int = 2, acquire_timeout: float = 30.0,
+                 health_check_interval: float = 30.0, startup_timeout: float = 60.0):
+        self.name = name
+        self.size = size
+        self.acquire_timeout = acquire_timeout
+        self.health_check_interval = health_check_interval
+        self.startup_timeout = startup_timeout
+
+        self._servers = [PooledServer(f"{name}-{index}", connection_params) for index in range(size)]
+        self._idle: asyncio.Queue[PooledServer] = asyncio.Queue()
+        self._start_lock = asyncio.Lock()
+        self._started = False
+        self._stopping = False
+        self._monitor: Optional[asyncio.Task] = None
+        self._restarts: set[asyncio.Task] = set()
+        self._restarting: set[PooledServer] = set()
+
+        self.in_use = 0
+        self.waiting = 0
+        self.acquires = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.restarts = 0
+        self.failures = 0
+        MCP_POOLS.append(self)
+
+    async def start(self) -> None:
+        """Pre-starts every server of the pool. Servers that fail to start are retried in the background."""
+        async with self._start_lock:
+            if self._started:
+                return
+            self._started = True
+            self._stopping = False
+            started = time.perf_counter()
+            await asyncio.gather(*(self._start_server(server) for server in self._servers))
+            self._monitor = asyncio.create_task(self._monitor_loop(), name=f"mcp-pool-monitor-{self.name}")
+            logger.info(f"MCP pool '{self.name}' started {self._idle.qsize()}/{self.size} servers in {time.perf_counter() - started:.2f}s.")
+
+    async def _start_server(self, server: PooledServer) -> bool:
+        try:
+            await server.start(timeout=self.startup_timeout)
+        except Exception as e:
+            self.failures += 1
+            logger.error(f"MCP server '{server.name}' failed to start: {e!r}")
+            self._schedule_restart(server)
+            return False
+        self._make_idle(server)
+        return True
+
+    def _make_idle(self, server: PooledServer) -> None:
+        if not server.queued:
+            server.queued = True
+            self._idle.put_nowait(server)
+
+    def _schedule_restart(self, server: PooledServer) -> None:
+        if self._stopping or server in self._restarting:
+            return
+        self._restarting.add(server)
+        server.state = "restarting"
+        task = asyncio.create_task(self._restart(server), name=f"mcp-restart-{server.name}")
+        self._restarts.add(task)
+        task.add_done_callback(self._restarts.discard)
+
+    async def _restart(self, server: PooledServer) -> None:
+        delay = 1.0
+        try:
+            await server.stop()
+            while not self._stopping:
+                try:
+                    await server.start(timeout=self.startup_timeout)
+                except Exception as e:
+                    self.failures += 1
+                    logger.error(f"MCP server '{server.name}' failed to restart, retrying in {delay:.0f}s: {e!r}")
+                    await asyncio.sleep(delay)
+                    delay = min(delay * 2, 30.0)
+                    continue
+                self.restarts += 1
+                logger.info(f"MCP server '{server.name}' restarted.")
+                self._make_idle(server)
+                return
+        finally:
+            self._restarting.discard(server)
+
+    async def _monitor_loop(self) -> None:
+        while not self._stopping:
+            await asyncio.sleep(self.health_check_interval)
+            for server in self._servers:
+                if server.state == "ready" and not await server.ping(timeout=min(10.0, self.health_check_interval)):
+                    logger.error(f"MCP server '{server.name}' failed its health check.")
+                    self._schedule_restart(server)
+
+    @asynccontextmanager
+    async def session(self) -> AsyncIterator[ClientSession]:
+        """Borrows a ready client session from the pool for the duration of the block."""
+        if not self._started:
+            await self.start()
+
+        started = time.perf_counter()
+        deadline = started + self.acquire_timeout
+        self.waiting += 1
+        try:
+            while True:
+                server = await asyncio.wait_for(self._idle.get(), timeout=max(0.0, deadline - time.perf_counter()))
+                server.queued = False
+                if server.state == "ready" and server.alive:
+                    break
+                # Died while idle: drop it from the queue, it is put back once restarted.
+                self._schedule_restart(server)
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"No MCP server of pool '{self.name}' became available within {self.acquire_timeout}s.")
+        finally:
+            self.waiting -= 1
+
+        wait = time.perf_counter() - started
+        self.acquires += 1
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+
+        self.in_use += 1
+        broken = False
+        try:
+            yield server.session
+        except Exception as e:
+            broken = is_connection_error(e)
+            raise
+        finally:
+            self.in_use -= 1
+            if broken or not server.alive:
+                self._schedule_restart(server)
+            else:
+                self._make_idle(server)
+
+    async def stop(self) -> None:
+        """Stops the health monitor and terminates every server."""
+        self._stopping = True
+        if self._monitor is not None:
+            self._monitor.cancel()
+            self._monitor = None
+        for task in list(self._restarts):
+            task.cancel()
+        await asyncio.gather(*(server.stop() for server in self._servers), return_exceptions=True)
+        while not self._idle.empty():
+            self._idle.get_nowait().queued = False
+        self._started = False
+        logger.info(f"MCP pool '{self.name}' stopped.")
+
+    def stats(self) -> dict[str, Any]:
+        """Pool sizing counters."""
+        return {
+            "name": self.name,
+            "size": self.size,
+            "started": self._started,
+            "ready": sum(1 for server in self._servers if server.state == "ready"),
+            "idle": self._idle.qsize(),
+            "in_use": self.in_use,
+            "waiting": self.waiting,
+            "acquires": self.acquires,
+            "avg_wait_ms": self.total_wait / self.acquires * 1000 if self.acquires else 0.0,
+            "max_wait_ms": self.max_wait * 1000,
+            "restarts": self.restarts,
+            "failures": self.failures,
+        }
+
+
+class PooledMCPTool(MCPTool):
+    """MCP tool whose calls run on a session borrowed from an `MCPSessionPool`."""
+
+    def __init__(self, *, mcp_tool: McpBaseTool, pool: MCPSessionPool):
+        super().__init__(mcp_tool=mcp_tool, mcp_session_manager=pool)
+        self._pool = pool
+
+    async def run_async(self, *, args: dict[str, Any], tool_context: ToolContext) -> Any:
+        try:
+            async with self._pool.session() as session:
+                return await session.call_tool(self.name, arguments=args)
+        except Exception as e:
+            if not is_connection_error(e):
+                raise
+            # The server died mid-call and is being restarted; retry once on another one.
+            logger.error(f"MCP tool '{self.name}' lost its server, retrying: {e!r}")
+            async with self._pool.session() as session:
+                return await session.call_tool(self.name, arguments=args)
+
+
+class PooledMCPToolset(BaseToolset):
+    """Drop-in replacement for `MCPToolset` backed by a pool of warm stdio servers."""
+
+    def __init__(self, *, name: str, connection_params: StdioServerParameters, pool_size: int = 2,
+                 tool_filter: Optional[Union[ToolPredicate, List[str]]] = None, **pool_options: Any):
+        super().__init__(tool_filter=tool_filter)
+        self.pool = MCPSessionPool(name, connection_params, size=pool_size, **pool_options)
+        self._tools: Optional[list[PooledMCPTool]] = None
+
+    async def get_tools(self, readonly_context: Optional[ReadonlyContext] = None) -> list[BaseTool]:
+        if self._tools is None:
+            async with self.pool.session() as session:
+                tools_response = await session.list_tools()
+            self._tools = [PooledMCPTool(mcp_tool=tool, pool=self.pool) for tool in tools_response.tools]
+        return [tool for tool in self._tools if self._is_tool_selected(tool, readonly_context)]
+
+    async def close(self) -> None:
+        await self.pool.stop()
+
+
+async def _start_all() -> None:
+    await asyncio.gather(*(pool.start() for pool in MCP_POOLS))
+
+
+async def start_mcp_pools(mode: str = MCP_POOL_START) -> None:
+    """Starts every MCP pool according to `mode` (see MCP_POOL_START), called on application startup."""
+    global _background_start
+    if not MCP_POOLS or mode == "lazy":
+        return
+    if mode == "background":
+        _background_start = asyncio.create_task(_start_all(), name="mcp-pools-start")
+        return
+    await _start_all()
+
+
+async def stop_mcp_pools() -> None:
+    """Stops every MCP pool, called on application shutdown."""
+    global _background_start
+    if _background_start is not None:
+        _background_start.cancel()
+        await asyncio.gather(_background_start, return_exceptions=True)
+        _background_start = None
+    await asyncio.gather(*(pool.stop() for pool in MCP_POOLS), return_exceptions=True)
+
+
+def mcp_pool_stats() -> list[dict[str, Any]]:
+    """Counters of every MCP pool, for the '/metrics' endpoint."""
+    return [pool.stats() for pool in MCP_POOLS]
@@ -1,49 +1,393 @@
-"""This module provides tools for interacting with the os."""
+"""This module provides tools for interacting with the os.
 
+File reads are bounded: every tool returns at most OS_TOOLS_MAX_READ_BYTES, reads only the part of the
+file it returns (large files are read in ranges, backwards from the end or memory-mapped, never loaded
+whole), and refuses binary files; lines longer than OS_TOOLS_MAX_LINE_BYTES are cut. Truncated outputs
+end with a note telling how to read further. Directory listings are paginated and searches bounded in
+depth and results, reading directories through the cached file index. Every tool reading files or
+directories runs in a worker thread, so that a large read or search never stalls the event loop.
+"""
+
+import asyncio
+import fnmatch
+import heapq
+import mmap
 import os
+import re
+from datetime import datetime
+from typing import BinaryIO
+from src.agents.data_stores.file_index import FileEntry, file_index
 
-def list_directory(path: str = ".") -> str:
-    """Lists files and directories in the specified path. Defaults to the current directory.
+OS_TOOLS_MAX_READ_BYTES = int(os.getenv("OS_TOOLS_MAX_READ_BYTES", 64 * 1024))
+OS_TOOLS_MAX_LINES = 2000
+OS_TOOLS_MAX_MATCHES = 500
+BINARY_SNIFF_BYTES = 8192
+TAIL_BLOCK_BYTES = 64 * 1024
+GREP_MAX_LINE_BYTES = 1000
+OS_TOOLS_MAX_LINE_BYTES = 4096
+NEWLINE_COUNT_CHUNK_BYTES = 1024 * 1024
+OS_TOOLS_MAX_ENTRIES = 1000
+SORT_KEYS = {
+    "name": (lambda entry: entry.name.casefold(), False),
+    "size": (lambda entry: entry.size, True),
+    "mtime": (lambda entry: entry.mtime, True),
+}
 
-    Args:
-        path: The path to the directory to list. Defaults to ".".
+def _format_entry(entry: FileEntry, root: str = "") -> str:
+    name = os.path.relpath(entry.path, root) if root else entry.name
+    size = "-" if entry.is_dir else str(entry.size)
+    modified = datetime.fromtimestamp(entry.mtime).strftime("%Y-%m-%d %H:%M")
+    return f"{name}{'/' if entry.is_dir else ''}\t{entry.kind}\t{size}\t{modified}"
 
-    Returns:
-        A string containing the list of files and directories, or an error message.
-    """
+def _list_directory(path: str, offset: int, limit: int, sort_by: str) -> str:
     try:
-        entries = os.listdir(path)
-        if not entries:
-            return f"Directory '{path}' is empty."
-        return "Contents of directory '{}':\n{}".format(path, "\n".join(entries))
+        entries = file_index.entries(path)
     except FileNotFoundError:
         return f"Error: Directory '{path}' not found."
+    except NotADirectoryError:
+        return f"Error: '{path}' is not a directory."
     except PermissionError:
         return f"Error: Permission denied to access directory '{path}'."
     except Exception as e:
         return f"An unexpected error occurred: {e}"
+    if not entries:
+        return f"Directory '{path}' is empty."
+
+    if sort_by not in SORT_KEYS:
+        return f"Error: Unknown sort order '{sort_by}', use one of {', '.join(SORT_KEYS)}."
+    offset = max(0, offset)
+    limit = max(1, min(limit, OS_TOOLS_MAX_ENTRIES))
+    key, newest_first = SORT_KEYS[sort_by]
+    if sort_by != "name":
+        entries = file_index.refresh(entries)
+    # Only the entries up to the requested page are ordered.
+    select = heapq.nlargest if newest_first else heapq.nsmallest
+    page = select(offset + limit, entries, key=key)[offset:]
+    if sort_by == "name":
+        page = file_index.refresh(page)
+    if not page:
+        return f"Directory '{path}' has {len(entries)} entries, there is nothing from entry {offset}."
 
-def read_file(path: str) -> str:
-    """Reads the content of the specified file.
+    header = f"Contents of directory '{path}', entries {offset + 1}-{offset + len(page)} of {len(entries)} by {sort_by} (name, type, size in bytes, modified):"
+    lines = [header, *(_format_entry(entry) for entry in page)]
+    if offset + len(page) < len(entries):
+        lines.append(f"[... {len(entries) - offset - len(page)} more entries; list from offset {offset + len(page)} for more ...]")
+    return "\n".join(lines)
+
+async def list_directory(path: str = ".", offset: int = 0, limit: int = 100, sort_by: str = "name") -> str:
+    """Lists files and directories in the specified path, one page at a time, with their type, size and modification time.
 
     Args:
-        path: The path to the file to read.
+        path: The path to the directory to list. Defaults to ".".
+        offset: The number of entries to skip, to get the following pages. Defaults to 0.
+        limit: The maximum number of entries to return, at most 1000. Defaults to 100.
+        sort_by: The order of the entries: "name", "size" (largest first) or "mtime" (newest first). Defaults to "name".
 
     Returns:
-        A string containing the content of the file, or an error message.
+        A string containing one page of the directory entries and the total number of entries, or an error message.
     """
-    try:
-        with open(path, 'r') as f:
-            content = f.read()
-        return content
-    except FileNotFoundError:
+    return await asyncio.to_thread(_list_directory, path, offset, limit, sort_by)
+
+def _find_files(path: str, pattern: str, max_depth: int, max_results: int, file_type: str) -> str:
+    if file_type not in ("any", "file", "dir"):
+        return f"Error: Unknown file type '{file_type}', use 'any', 'file' or 'dir'."
+    if not os.path.isdir(path):
+        return f"Error: Directory '{path}' not found."
+    max_results = max(1, min(max_results, OS_TOOLS_MAX_ENTRIES))
+    # Patterns with a directory part ('src/*.py') are matched against the path relative to `path`, others against the name.
+    match_path = "/" in pattern
+    folded_pattern = pattern.casefold()
+
+    results, skipped = [], 0
+    truncated = False
+    pending = [(path, 0)]
+    while pending and not truncated:
+        directory, depth = pending.pop()
+        try:
+            entries = sorted(file_index.entries(directory), key=lambda entry: entry.name)
+        except OSError:
+            skipped += 1
+            continue
+        subdirectories = []
+        for entry in entries:
+            name = os.path.relpath(entry.path, path) if match_path else entry.name
+            if (file_type == "any" or entry.kind == file_type) and fnmatch.fnmatchcase(name.casefold(), folded_pattern):
+                if len(results) == max_results:
+                    truncated = True
+                    break
+                results.append(entry)
+            # Symbolic links to directories are not followed, so that cycles cannot occur.
+            if entry.is_dir and depth < max_depth:
+                subdirectories.append((entry.path, depth + 1))
+        pending.extend(reversed(subdirectories))
+
+    if not results:
+        return f"No entries under '{path}' match '{pattern}' within depth {max_depth}."
+    lines = [f"Entries under '{path}' matching '{pattern}' (path, type, size in bytes, modified):"]
+    lines.extend(_format_entry(entry, path) for entry in file_index.refresh(results))
+    if truncated:
+        lines.append(f"[... stopped after {max_results} results; use a narrower pattern or path ...]")
+    if skipped:
+        lines.append(f"[{skipped} directories could not be read]")
+    return "\n".join(lines)
+
+async def find_files(path: str = ".", pattern: str = "*", max_depth: int = 5, max_results: int = 100, file_type: str = "any") -> str:
+    """Recursively searches a directory tree for files and directories whose name matches a glob pattern.
+
+    Args:
+        path: The directory to search from. Defaults to ".".
+        pattern: The case-insensitive glob pattern to match, e.g. "*.py" or "*report*". A pattern containing "/" is matched against the path relative to `path`. Defaults to "*".
+        max_depth: How many directory levels below `path` to search. Defaults to 5.
+        max_results: The maximum number of results to return, at most 1000. Defaults to 100.
+        file_type: "file", "dir" or "any". Defaults to "any".
+
+    Returns:
+        A string containing the matching paths with their type, size and modification time, or a message if nothing matched, or an error message.
+    """
+    return await asyncio.to_thread(_find_files, path, pattern, max_depth, max_results, file_type)
+
+def _read_error(path: str, e: Exception) -> str:
+    """Turns a file access error into the message returned to the model."""
+    if isinstance(e, FileNotFoundError):
         return f"Error: File '{path}' not found."
-    except IsADirectoryError:
+    if isinstance(e, IsADirectoryError):
         return f"Error: '{path}' is a directory, not a file."
-    except PermissionError:
+    if isinstance(e, PermissionError):
         return f"Error: Permission denied to read file '{path}'."
+    return f"An unexpected error occurred: {e}"
+
+def _is_binary(file: BinaryIO) -> bool:
+    """Checks the start of an open file for NUL bytes or invalid UTF-8, leaving the position at 0."""
+    sample = file.read(BINARY_SNIFF_BYTES)
+    file.seek(0)
+    if b"\0" in sample:
+        return True
+    try:
+        sample.decode("utf-8")
+    except UnicodeDecodeError as e:
+        # A multi-byte character cut at the end of the sample is not a sign of binary content.
+        return e.start < len(sample) - 3
+    return False
+
+def _binary_message(path: str, size: int) -> str:
+    return f"'{path}' is a binary file ({size} bytes); its content cannot be shown as text."
+
+def _cap(text: str, max_bytes: int, location: str) -> str:
+    """Cuts `text` to `max_bytes` UTF-8 bytes, ending with a marker telling where the output stopped."""
+    data = text.encode("utf-8")
+    if len(data) <= max_bytes:
+        return text
+    return data[:max_bytes].decode("utf-8", errors="ignore") + f"\n[... output truncated at {max_bytes} bytes {location} ...]"
+
+def _read_file_bytes(path: str, offset: int, length: int) -> str:
+    try:
+        with open(path, "rb") as file:
+            size = os.fstat(file.fileno()).st_size
+            if _is_binary(file):
+                return _binary_message(path, size)
+            start = max(0, size + offset) if offset < 0 else min(offset, size)
+            file.seek(start)
+            data = file.read(max(0, min(length, OS_TOOLS_MAX_READ_BYTES)))
+        end = start + len(data)
+        text = data.decode("utf-8", errors="replace")
+        if start == 0 and end == size:
+            return text
+        more = f"read from offset {end} for more" if end < size else "end of file"
+        return f"{text}\n[... showing bytes {start}-{end} of {size}; {more} ...]"
     except Exception as e:
-        return f"An unexpected error occurred: {e}"
+        return _read_error(path, e)
+
+async def read_file(path: str) -> str:
+    """Reads the content of the specified file, up to the size limit. Use read_file_lines, read_file_bytes, head_file, tail_file or grep_file for the rest of large files.
+
+    Args:
+        path: The path to the file to read.
+
+    Returns:
+        A string containing the content of the file (with a truncation note if it is larger than the limit), or an error message.
+    """
+    return await asyncio.to_thread(_read_file_bytes, path, 0, OS_TOOLS_MAX_READ_BYTES)
+
+async def read_file_bytes(path: str, offset: int = 0, length: int = 65536) -> str:
+    """Reads a byte range of the specified file.
+
+    Args:
+        path: The path to the file to read.
+        offset: The byte offset to start reading at. Negative values count from the end of the file. Defaults to 0.
+        length: The number of bytes to read, at most the size limit. Defaults to 65536.
+
+    Returns:
+        A string containing the requested bytes decoded as text, followed by a note when the file continues, or an error message.
+    """
+    return await asyncio.to_thread(_read_file_bytes, path, offset, length)
+
+def _read_line(file: BinaryIO) -> tuple[bytes, bool]:
+    """Reads the next line, keeping at most OS_TOOLS_MAX_LINE_BYTES of it. Returns the line and whether the rest of it was skipped."""
+    line = file.readline(OS_TOOLS_MAX_LINE_BYTES)
+    if not line or line.endswith(b"\n"):
+        return line, False
+    cut = False
+    # The rest of a long line is read in blocks and dropped, so that it is never held whole.
+    while rest := file.readline(TAIL_BLOCK_BYTES):
+        cut = True
+        if rest.endswith(b"\n"):
+            break
+    return line, cut
+
+def _read_file_lines(path: str, start_line: int, line_count: int) -> str:
+    try:
+        start_line = max(1, start_line)
+        line_count = max(1, min(line_count, OS_TOOLS_MAX_LINES))
+        lines = []
+        with open(path, "rb") as file:
+            if _is_binary(file):
+                return _binary_message(path, os.fstat(file.fileno()).st_size)
+            number = 0
+            more = False
+            while True:
+                line, cut = _read_line(file)
+                if not line:
+                    break
+                number += 1
+                if number < start_line:
+                    continue
+                if number >= start_line + line_count:
+                    more = True
+                    break
+                text = line.decode("utf-8", errors="ignore" if cut else "replace").rstrip()
+                lines.append(f"{number}: {text} [... line cut at {OS_TOOLS_MAX_LINE_BYTES} bytes ...]" if cut else f"{number}: {text}")
+        if not lines:
+            return f"'{path}' has {number} lines, there is nothing from line {start_line}."
+        text = _cap("\n".join(lines), OS_TOOLS_MAX_READ_BYTES, f"in line {start_line + len(lines) - 1}")
+        if more:
+            text += f"\n[... more lines follow; read from line {start_line + len(lines)} for more ...]"
+        return text
+    except Exception as e:
+        return _read_error(path, e)
+
+async def read_file_lines(path: str, start_line: int = 1, line_count: int = 100) -> str:
+    """Reads a range of lines of the specified file, prefixed with their line numbers. The file is read line by line, not loaded whole, and very long lines are cut.
+
+    Args:
+        path: The path to the file to read.
+        start_line: The first line to return, starting at 1. Defaults to 1.
+        line_count: The number of lines to return, at most 2000. Defaults to 100.
+
+    Returns:
+        A string containing the numbered lines, followed by a note when the file continues, or an error message.
+    """
+    return await asyncio.to_thread(_read_file_lines, path, start_line, line_count)
+
+async def head_file(path: str, lines: int = 20) -> str:
+    """Reads the first lines of the specified file.
+
+    Args:
+        path: The path to the file to read.
+        lines: The number of lines to return. Defaults to 20.
+
+    Returns:
+        A string containing the numbered first lines of the file, or an error message.
+    """
+    return await asyncio.to_thread(_read_file_lines, path, 1, lines)
+
+def _tail_file(path: str, lines: int) -> str:
+    try:
+        lines = max(1, min(lines, OS_TOOLS_MAX_LINES))
+        with open(path, "rb") as file:
+            size = os.fstat(file.fileno()).st_size
+            if _is_binary(file):
+                return _binary_message(path, size)
+            position = size
+            data = b""
+            # One more newline than requested: the line before the first returned one must be complete.
+            while position > 0 and data.count(b"\n") <= lines and len(data) < OS_TOOLS_MAX_READ_BYTES:
+                block = min(TAIL_BLOCK_BYTES, position)
+                position -= block
+                file.seek(position)
+                data = file.read(block) + data
+        tail = data.decode("utf-8", errors="replace").rstrip("\n").split("\n")[-lines:]
+        text = "\n".join(tail)
+        data = text.encode("utf-8")
+        if len(data) > OS_TOOLS_MAX_READ_BYTES:
+            text = f"[... output truncated to the last {OS_TOOLS_MAX_READ_BYTES} bytes ...]\n" + data[-OS_TOOLS_MAX_READ_BYTES:].decode("utf-8", errors="ignore")
+        return text
+    except Exception as e:
+        return _read_error(path, e)
+
+async def tail_file(path: str, lines: int = 20) -> str:
+    """Reads the last lines of the specified file, reading backwards from its end so that large logs are not loaded whole.
+
+    Args:
+        path: The path to the file to read.
+        lines: The number of lines to return, at most 2000. Defaults to 20.
+
+    Returns:
+        A string containing the last lines of the file, or an error message.
+    """
+    return await asyncio.to_thread(_tail_file, path, lines)
+
+def _count_newlines(mapped: mmap.mmap, start: int, end: int) -> int:
+    """Newlines between two offsets of a mapped file, counted one fixed-size chunk at a time so that only a chunk is ever copied."""
+    count = 0
+    for chunk_start in range(start, end, NEWLINE_COUNT_CHUNK_BYTES):
+        count += mapped[chunk_start:min(end, chunk_start + NEWLINE_COUNT_CHUNK_BYTES)].count(b"\n")
+    return count
+
+def _grep_file(path: str, pattern: str, ignore_case: bool, max_matches: int) -> str:
+    try:
+        regex = re.compile(pattern.encode("utf-8"), re.IGNORECASE if ignore_case else 0)
+    except re.error as e:
+        return f"Error: Invalid regular expression '{pattern}': {e}"
+    try:
+        max_matches = max(1, min(max_matches, OS_TOOLS_MAX_MATCHES))
+        results = []
+        with open(path, "rb") as file:
+            size = os.fstat(file.fileno()).st_size
+            if size == 0:
+                return f"No lines of '{path}' match '{pattern}'."
+            if _is_binary(file):
+                return _binary_message(path, size)
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                line_number, counted_to, position = 1, 0, 0
+                truncated = False
+                while position <= size:
+                    match = regex.search(mapped, position)
+                    if match is None:
+                        break
+                    line_start = mapped.rfind(b"\n", 0, match.start()) + 1
+                    line_end = mapped.find(b"\n", match.start())
+                    line_end = size if line_end == -1 else line_end
+                    line_number += _count_newlines(mapped, counted_to, line_start)
+                    counted_to = line_start
+                    if len(results) == max_matches:
+                        truncated = True
+                        break
+                    line = mapped[line_start:min(line_end, line_start + GREP_MAX_LINE_BYTES)].decode("utf-8", errors="replace").rstrip("\r")
+                    results.append(f"{line_number}: {line}")
+                    # Continues after this line: each matching line is reported once.
+                    position = line_end + 1
+        if not results:
+            return f"No lines of '{path}' match '{pattern}'."
+        text = _cap("\n".join(results), OS_TOOLS_MAX_READ_BYTES, f"after {len(results)} matches")
+        if truncated:
+            text += f"\n[... stopped after {max_matches} matches ...]"
+        return text
+    except Exception as e:
+        return _read_error(path, e)
+
+async def grep_file(path: str, pattern: str, ignore_case: bool = False, max_matches: int = 50) -> str:
+    """Searches the specified file for lines matching a regular expression. The file is memory-mapped, not loaded whole.
+
+    Args:
+        path: The path to the file to search.
+        pattern: The regular expression to search for.
+        ignore_case: Whether to ignore case. Defaults to False.
+        max_matches: The maximum number of matching lines to return, at most 500. Defaults to 50.
+
+    Returns:
+        A string containing the matching lines prefixed with their line numbers, or a message if nothing matched, or an error message.
+    """
+    return await asyncio.to_thread(_grep_file, path, pattern, ignore_case, max_matches)
 
 def path_exists(path: str) -> bool:
     """Checks if a file or directory exists at the specified path.
@@ -1,13 +1,31 @@
 """This module provides tools for interacting with the DuckDuckGo Search Engine."""
 
+import os
+import shlex
 from google.adk.tools.mcp_tool.mcp_toolset import MCPToolset, StdioServerParameters
+from src.agents.tools.mcp_pool import PooledMCPToolset
 
-command = "docker"
-args = ["run", "-i", "--rm", "mcp/duckduckgo"]
+# Command starting the DuckDuckGo MCP server; SEARCH_MCP_COMMAND replaces it (e.g. with the local stand-in of the benchmarks).
+command, *args = shlex.split(os.getenv("SEARCH_MCP_COMMAND", "docker run -i --rm mcp/duckduckgo"))
 
-duckduckgo_search_tool = MCPToolset(
-    connection_params=StdioServerParameters(
-        command=command,
-        args=args,
+# Number of warm DuckDuckGo MCP servers kept by the pool, 0 falls back to a single lazily started server.
+SEARCH_MCP_POOL_SIZE = int(os.getenv("SEARCH_MCP_POOL_SIZE", 2))
+MCP_POOL_HEALTH_CHECK_INTERVAL = float(os.getenv("MCP_POOL_HEALTH_CHECK_INTERVAL", 30))
+
+if SEARCH_MCP_POOL_SIZE > 0:
+    duckduckgo_search_tool = PooledMCPToolset(
+        name="duckduckgo",
+        connection_params=StdioServerParameters(
+            command=command,
+            args=args,
+        ),
+        pool_size=SEARCH_MCP_POOL_SIZE,
+        health_check_interval=MCP_POOL_HEALTH_CHECK_INTERVAL,
+    )
+else:
+    duckduckgo_search_tool = MCPToolset(
+        connection_params=StdioServerParameters(
+            command=command,
+            args=args,
+        )
     )
-)
@@ -2,12 +2,29 @@
 
 import datetime
 from google.adk.tools.tool_context import ToolContext
-from zoneinfo import ZoneInfo
+from src.agents.data_stores.weather_service import Observation, weather_service, zone
 import logging
 
 logger = logging.getLogger(__name__)
 
-def get_weather(city: str) -> dict:
+def format_temperature(temp_c: float, unit: str) -> str:
+    """Temperature in the preferred unit, 'Celsius' or 'Fahrenheit'."""
+    if unit == "Fahrenheit":
+        return f"{(temp_c * 9/5) + 32:.0f}°F"
+    return f"{temp_c:.0f}°C"
+
+async def lookup_weather(city: str) -> tuple[Observation | None, dict | None]:
+    """Fetches the observation of a city through the cached weather service; returns it, or the error result of the tool."""
+    try:
+        observation = await weather_service.observe(city)
+    except Exception as e:
+        return None, {"status": "error", "error_message": f"The weather service is unavailable, please try again later ({e})."}
+    if observation is None:
+        logger.info("--- Tool: City '%s' not found. ---", city)
+        return None, {"status": "error", "error_message": f"Sorry, I don't have weather information for '{city}'."}
+    return observation, None
+
+async def get_weather(city: str) -> dict:
     """Retrieves the current weather report for a specified city.
 
     Args:
@@ -17,75 +34,45 @@ def get_weather(city: str) -> dict:
         dict: status and result or error msg.
     """
 
-    logger.info(f"Getting weather for {city}")
+    logger.info("Getting weather for %s", city)
 
-    if city.lower() == "new york":
-        
-        logger.info(f"Weather information for '{city}' is available.")
+    observation, error = await lookup_weather(city)
+    if error is not None:
+        return error
 
-        return {
-            "status": "success",
-            "report": (
-                "The weather in New York is sunny with a temperature of 25 degrees"
-                " Celsius (77 degrees Fahrenheit)."
-            ),
-        }
-    else:
-        logger.error(f"Weather information for '{city}' is not available.")
-
-        return {
-            "status": "error",
-            "error_message": f"Weather information for '{city}' is not available.",
-        }
+    return {
+        "status": "success",
+        "report": (
+            f"The weather in {observation.city} is {observation.condition} with a temperature of {format_temperature(observation.temp_c, 'Celsius')}"
+            f" ({format_temperature(observation.temp_c, 'Fahrenheit')})."
+        ),
+    }
 
-def get_weather_stateful(city: str, tool_context: ToolContext) -> dict:
+async def get_weather_stateful(city: str, tool_context: ToolContext) -> dict:
     """Retrieves weather, converts temp unit based on session state."""
-    logger.info(f"--- Tool: get_weather_stateful called for {city} ---")
+    logger.info("--- Tool: get_weather_stateful called for %s ---", city)
 
     # --- Read preference from state ---
     preferred_unit = tool_context.state.get("user_preference_temperature_unit", "Celsius") # Default to Celsius
-    logger.info(f"--- Tool: Reading state 'user_preference_temperature_unit': {preferred_unit} ---")
-
-    city_normalized = city.lower().replace(" ", "")
-
-    # Mock weather data (always stored in Celsius internally)
-    mock_weather_db = {
-        "newyork": {"temp_c": 25, "condition": "sunny"},
-        "london": {"temp_c": 15, "condition": "cloudy"},
-        "tokyo": {"temp_c": 18, "condition": "light rain"},
-    }
+    logger.info("--- Tool: Reading state 'user_preference_temperature_unit': %s ---", preferred_unit)
 
-    if city_normalized in mock_weather_db:
-        data = mock_weather_db[city_normalized]
-        temp_c = data["temp_c"]
-        condition = data["condition"]
+    # Observations are cached per city and always in Celsius, see src/agents/data_stores/weather_service.py
+    observation, error = await lookup_weather(city)
+    if error is not None:
+        return error
 
-        # Format temperature based on state preference
-        if preferred_unit == "Fahrenheit":
-            temp_value = (temp_c * 9/5) + 32 # Calculate Fahrenheit
-            temp_unit = "°F"
-        else: # Default to Celsius
-            temp_value = temp_c
-            temp_unit = "°C"
+    report = f"The weather in {observation.city} is {observation.condition} with a temperature of {format_temperature(observation.temp_c, preferred_unit)}."
+    result = {"status": "success", "report": report}
+    logger.info("--- Tool: Generated report in %s. Result: %s ---", preferred_unit, result)
 
-        report = f"The weather in {city.capitalize()} is {condition} with a temperature of {temp_value:.0f}{temp_unit}."
-        result = {"status": "success", "report": report}
-        logger.info(f"--- Tool: Generated report in {preferred_unit}. Result: {result} ---")
+    # Example of writing back to state (optional for this tool)
+    tool_context.state["last_city_checked_stateful"] = city
+    logger.info("--- Tool: Updated state 'last_city_checked_stateful': %s ---", city)
 
-        # Example of writing back to state (optional for this tool)
-        tool_context.state["last_city_checked_stateful"] = city
-        logger.info(f"--- Tool: Updated state 'last_city_checked_stateful': {city} ---")
+    return result
 
-        return result
-    else:
-        # Handle city not found
-        error_msg = f"Sorry, I don't have weather information for '{city}'."
-        logger.info(f"--- Tool: City '{city}' not found. ---")
-        return {"status": "error", "error_message": error_msg}
 
-
-
-def get_current_time(city: str) -> dict:
+async def get_current_time(city: str) -> dict:
     """Returns the current time in a specified city.
 
     Args:
@@ -95,13 +82,16 @@ def get_current_time(city: str) -> dict:
         dict: status and result or error msg.
     """
 
-    logger.info(f"Getting current time for {city}")
+    logger.info("Getting current time for %s", city)
+
+    try:
+        tz_identifier = await weather_service.timezone(city)
+    except Exception:
+        tz_identifier = None
 
-    if city.lower() == "new york":
-        tz_identifier = "America/New_York"
-    else:
+    if tz_identifier is None:
 
-        logger.error(f"Timezone information for '{city}' is not available.")
+        logger.error("Timezone information for '%s' is not available.", city)
 
         return {
             "status": "error",
@@ -110,12 +100,11 @@ def get_current_time(city: str) -> dict:
             ),
         }
 
-    tz = ZoneInfo(tz_identifier)
-    now = datetime.datetime.now(tz)
+    now = datetime.datetime.now(zone(tz_identifier))
     report = (
         f'The current time in {city} is {now.strftime("%Y-%m-%d %H:%M:%S %Z%z")}'
     )
 
-    logger.info(f"Current time for {city}: {report}")
+    logger.info("Current time for %s: %s", city, report)
 
     return {"status": "success", "report": report}
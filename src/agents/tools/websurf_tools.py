@@ -1,19 +1,42 @@
 """This module provides tools to fetch content from a URL provided by the user."""
 
+import os
 from google.adk.tools.mcp_tool.mcp_toolset import MCPToolset, StdioServerParameters
+from src.agents.tools.mcp_pool import PooledMCPToolset
 import logging
 
 logger = logging.getLogger(__name__)
 
-PATH_TO_YOUR_MCP_SERVER_SCRIPT = r"C:\Users\IAmTheWizard\Desktop\New folder (2)\Projects\Python\AgenticPractice\local-mcp-server\main.py" # <<< REPLACE
+PATH_TO_YOUR_MCP_SERVER_SCRIPT = os.getenv(
+    "WEBSURF_MCP_SERVER_SCRIPT",
+    r"C:\Users\IAmTheWizard\Desktop\New folder (2)\Projects\Python\AgenticPractice\local-mcp-server\main.py" # <<< REPLACE
+)
 
-if PATH_TO_YOUR_MCP_SERVER_SCRIPT == "/path/to/your/my_adk_mcp_server.py":
-    logger.error("PATH_TO_YOUR_MCP_SERVER_SCRIPT is not set. Please update it in agent.py.")
+if not os.path.isfile(PATH_TO_YOUR_MCP_SERVER_SCRIPT):
+    logger.error(f"The websurf MCP server script '{PATH_TO_YOUR_MCP_SERVER_SCRIPT}' does not exist. Set WEBSURF_MCP_SERVER_SCRIPT, or leave websurf_agent out of ENABLED_SUB_AGENTS.")
 
-websurf_tool = MCPToolset(
-    connection_params=StdioServerParameters(
-        command='python3', # Command to run your MCP server script
-        args=[PATH_TO_YOUR_MCP_SERVER_SCRIPT], # Argument is the path to the script
-    )
-    # tool_filter=['load_web_page'] # Optional: ensure only specific tools are loaded
+# Number of warm websurf MCP servers kept by the pool, 0 falls back to a single lazily started server.
+WEBSURF_MCP_POOL_SIZE = int(os.getenv("WEBSURF_MCP_POOL_SIZE", 2))
+MCP_POOL_HEALTH_CHECK_INTERVAL = float(os.getenv("MCP_POOL_HEALTH_CHECK_INTERVAL", 30))
+
+# Interpreter running the server script, e.g. the project's virtual environment.
+WEBSURF_MCP_COMMAND = os.getenv("WEBSURF_MCP_COMMAND", "python3")
+
+connection_params = StdioServerParameters(
+    command=WEBSURF_MCP_COMMAND, # Command to run your MCP server script
+    args=[PATH_TO_YOUR_MCP_SERVER_SCRIPT], # Argument is the path to the script
 )
+
+if WEBSURF_MCP_POOL_SIZE > 0:
+    websurf_tool = PooledMCPToolset(
+        name="websurf",
+        connection_params=connection_params,
+        pool_size=WEBSURF_MCP_POOL_SIZE,
+        health_check_interval=MCP_POOL_HEALTH_CHECK_INTERVAL,
+        # tool_filter=['load_web_page'] # Optional: ensure only specific tools are loaded
+    )
+else:
+    websurf_tool = MCPToolset(
+        connection_params=connection_params
+        # tool_filter=['load_web_page'] # Optional: ensure only specific tools are loaded
+    )
@@ -0,0 +1,179 @@
+"""This module provides per-request latency tracing on top of OpenTelemetry.
+
+ADK already opens spans for the invocation, every agent run (`agent_run [name]`), every model call
+(`call_llm`) and every tool call (`execute_tool name`). This module adds a `chat` span per request
+(carrying its `request_id`), spans for the callbacks chained with `chain_callbacks` and the token usage
+of each model call, and installs a tracer provider exporting the spans to:
+
+- an in-memory store of the last TRACING_MAX_REQUESTS requests, served by '/debug/trace/{request_id}'
+- a JSON lines file (TRACING_FILE), one OpenTelemetry JSON span per line, for offline analysis
+- an OTLP endpoint (OTEL_EXPORTER_OTLP_ENDPOINT), if the OTLP exporter package is installed
+"""
+
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Optional, Sequence
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models.llm_response import LlmResponse
+from opentelemetry import trace
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import ReadableSpan, SpanLimits, SpanProcessor, TracerProvider
+from opentelemetry.sdk.trace.export import BatchSpanProcessor, SpanExporter, SpanExportResult
+
+logger = logging.getLogger(__name__)
+
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "true").lower() in ("1", "true", "yes")
+TRACING_FILE = os.getenv("TRACING_FILE", "")
+TRACING_MAX_REQUESTS = int(os.getenv("TRACING_MAX_REQUESTS", 200))
+TRACING_MAX_ATTRIBUTE_LENGTH = int(os.getenv("TRACING_MAX_ATTRIBUTE_LENGTH", 1024))
+
+# Attributes holding whole requests and responses, left out of the '/debug/trace' view.
+VERBOSE_ATTRIBUTES = ("gcp.vertex.agent.llm_request", "gcp.vertex.agent.llm_response", "gcp.vertex.agent.tool_response")
+
+tracer = trace.get_tracer("great_sage")
+
+
+class RequestSpanStore(SpanProcessor):
+    """Keeps the finished spans of the most recent requests, grouped by trace."""
+
+    def __init__(self, max_requests: int = 200):
+        self.max_requests = max_requests
+        self._lock = threading.Lock()
+        self._traces: OrderedDict[int, list[ReadableSpan]] = OrderedDict()
+        self._requests: OrderedDict[str, int] = OrderedDict()
+
+    def on_end(self, span: ReadableSpan) -> None:
+        trace_id = span.context.trace_id
+        with self._lock:
+            self._traces.setdefault(trace_id, []).append(span)
+            request_id = span.attributes.get("request_id") if span.attributes else None
+            if request_id is not None:
+                self._requests[request_id] = trace_id
+            # Traces that never get a request span (e.g. background work) are evicted with the rest.
+            while len(self._traces) > self.max_requests:
+                evicted, _ = self._traces.popitem(last=False)
+                for key in [key for key, value in self._requests.items() if value == evicted]:
+                    del self._requests[key]
+
+    def get(self, request_id: str) -> Optional[list[ReadableSpan]]:
+        with self._lock:
+            trace_id = self._requests.get(request_id)
+            return list(self._traces.get(trace_id, [])) if trace_id is not None else None
+
+
+class JsonFileSpanExporter(SpanExporter):
+    """Appends every span to a file as one OpenTelemetry JSON object per line."""
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(path, "a", encoding="utf-8")
+
+    def export(self, spans: Sequence[ReadableSpan]) -> SpanExportResult:
+        try:
+            self._file.write("".join(span.to_json(indent=None) + "\n" for span in spans))
+            self._file.flush()
+        except (OSError, ValueError) as e:
+            logger.error(f"Could not write spans to '{self.path}': {e}")
+            return SpanExportResult.FAILURE
+        return SpanExportResult.SUCCESS
+
+    def shutdown(self) -> None:
+        self._file.close()
+
+
+span_store = RequestSpanStore(TRACING_MAX_REQUESTS)
+_provider: Optional[TracerProvider] = None
+
+
+def setup_tracing() -> None:
+    """Installs the span store and the configured exporters on the global tracer provider."""
+    global _provider
+    if not TRACING_ENABLED or _provider is not None:
+        return
+
+    provider = trace.get_tracer_provider()
+    if not isinstance(provider, TracerProvider):
+        provider = TracerProvider(
+            resource=Resource.create({"service.name": "great-sage"}),
+            span_limits=SpanLimits(max_attribute_length=TRACING_MAX_ATTRIBUTE_LENGTH)
+        )
+        trace.set_tracer_provider(provider)
+    provider.add_span_processor(span_store)
+
+    if TRACING_FILE:
+        provider.add_span_processor(BatchSpanProcessor(JsonFileSpanExporter(TRACING_FILE)))
+    if os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT"):
+        try:
+            from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+            provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+        except ImportError:
+            logger.error("OTEL_EXPORTER_OTLP_ENDPOINT is set but opentelemetry-exporter-otlp-proto-http is not installed.")
+
+    _provider = provider
+    logger.info(f"Tracing enabled (file: '{TRACING_FILE or 'none'}').")
+
+
+def shutdown_tracing() -> None:
+    """Flushes the exporters, called on application shutdown."""
+    if _provider is not None:
+        _provider.force_flush()
+
+
+# --- ADK callbacks ---
+def record_llm_usage(callback_context: CallbackContext, llm_response: LlmResponse) -> None:
+    """after_model_callback adding the agent name and token counts to the current `call_llm` span."""
+    span = trace.get_current_span()
+    if not span.is_recording():
+        return None
+    span.set_attribute("agent", callback_context.agent_name)
+    usage = llm_response.usage_metadata
+    if usage is not None:
+        span.set_attribute("gen_ai.usage.input_tokens", usage.prompt_token_count or 0)
+        span.set_attribute("gen_ai.usage.output_tokens", usage.candidates_token_count or 0)
+    return None
+
+
+# --- '/debug/trace' view ---
+def describe_trace(request_id: str) -> Optional[dict[str, Any]]:
+    """Returns the span tree and the time spent per stage of a traced request, or None if unknown."""
+    spans = span_store.get(request_id)
+    if not spans:
+        return None
+    spans.sort(key=lambda span: span.start_time)
+    started = spans[0].start_time
+    root = next((span for span in spans if span.attributes and span.attributes.get("request_id") == request_id), spans[0])
+
+    stages: dict[str, dict[str, float]] = {}
+    records = []
+    for span in spans:
+        duration_ms = (span.end_time - span.start_time) / 1e6
+        stage = stages.setdefault(span.name, {"count": 0, "total_ms": 0.0})
+        stage["count"] += 1
+        stage["total_ms"] += duration_ms
+        records.append({
+            "name": span.name,
+            "span_id": format(span.context.span_id, "016x"),
+            "parent_id": format(span.parent.span_id, "016x") if span.parent else None,
+            "start_ms": (span.start_time - started) / 1e6,
+            "duration_ms": duration_ms,
+            "status": span.status.status_code.name,
+            "attributes": {
+                key: value for key, value in (span.attributes or {}).items() if key not in VERBOSE_ATTRIBUTES
+            },
+        })
+
+    tokens_in = sum(record["attributes"].get("gen_ai.usage.input_tokens", 0) for record in records)
+    tokens_out = sum(record["attributes"].get("gen_ai.usage.output_tokens", 0) for record in records)
+    return {
+        "request_id": request_id,
+        "trace_id": format(root.context.trace_id, "032x"),
+        "duration_ms": (root.end_time - root.start_time) / 1e6,
+        "tokens": {"input": tokens_in, "output": tokens_out},
+        "stages": stages,
+        "spans": records,
+    }
@@ -1,14 +1,22 @@
 """This module provides a weather agent that can answer questions about the time and weather in a city."""
 
-import os
+from functools import partial
 from google.adk.agents import Agent
 from src.agents.tools.weather_tools import get_weather_stateful, get_current_time
+from src.agents.callbacks import chain_callbacks
+from src.agents.security.tool_guardrail import tool_policy_guardrail
+from src.agents.context_compaction import context_compactor
+from src.agents.rate_limits import model_rate_limit
+from src.agents.tracing import record_llm_usage
+from src.agents.models import agent_model
+from src.agents.data_stores.weather_service import weather_service
+from src.agents.prefetch import Speculation, find_weather_cities, prefetcher
 
-GOOGLE_MODEL_NAME = os.getenv("GOOGLE_MODEL_NAME", "gemini-2.0-flash")
+WEATHER_AGENT_MODEL = agent_model("WEATHER_AGENT", "weather_time_agent")
 
 Weather_Agent = Agent(
     name="weather_time_agent",
-    model=GOOGLE_MODEL_NAME,
+    model=WEATHER_AGENT_MODEL,
     description=(
         "Agent to answer questions about the time and weather (state-aware unit) in a city, saves report to state."
     ),
@@ -18,5 +26,18 @@ Weather_Agent = Agent(
         """
     ),
     tools=[get_weather_stateful, get_current_time],
+    before_model_callback=chain_callbacks(model_rate_limit.before_model_callback, context_compactor.before_model_callback),
+    after_model_callback=record_llm_usage,
+    before_tool_callback=chain_callbacks(tool_policy_guardrail),
     output_key="last_weather_report" # <<< Auto-save agent's final weather response
 )
+
+
+async def predict_weather_lookups(query: str) -> list[Speculation]:
+    """Observations of the cities of a weather question, warmed in the weather service cache, see src/agents/prefetch.py."""
+    return [
+        Speculation(tool="get_weather_stateful", args={"city": city}, run=partial(weather_service.observe, city), answer=False)
+        for city in find_weather_cities(query)
+    ]
+
+prefetcher.register(Weather_Agent.name, predict_weather_lookups)
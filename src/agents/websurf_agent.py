@@ -1,14 +1,24 @@
 """This module provides a map agent that can fetch content from a URL provided by the user."""
 
-import os
+from functools import partial
+from typing import Any
 from google.adk.agents import LlmAgent
+from google.adk.tools.base_tool import BaseTool
 from src.agents.tools.websurf_tools import websurf_tool
+from src.agents.data_stores.tool_result_cache import tool_result_cache
+from src.agents.callbacks import chain_callbacks
+from src.agents.security.tool_guardrail import tool_policy_guardrail
+from src.agents.tracing import record_llm_usage
+from src.agents.models import agent_model
+from src.agents.context_compaction import context_compactor
+from src.agents.rate_limits import model_rate_limit, websurf_rate_limit
+from src.agents.prefetch import Speculation, find_url_tool, find_urls, prefetcher
 
-GOOGLE_MODEL_NAME = os.getenv("GOOGLE_MODEL_NAME", "gemini-2.0-flash")
+WEBSURF_AGENT_MODEL = agent_model("WEBSURF_AGENT", "websurf_agent")
 
 Websurf_Agent = LlmAgent(
     name="websurf_agent",
-    model=GOOGLE_MODEL_NAME,
+    model=WEBSURF_AGENT_MODEL,
     description=(
         "Agent to fetch content from a URL provided by the user."
     ),
@@ -18,4 +28,28 @@ Websurf_Agent = LlmAgent(
         Use your web content fetching capabilities to deliver accurate and useful results in response to user queries."""
     ),
     tools=[websurf_tool],
+    before_model_callback=chain_callbacks(model_rate_limit.before_model_callback, context_compactor.before_model_callback),
+    after_model_callback=record_llm_usage,
+    # Cache hits and prefetched pages do not consume another rate limit token.
+    before_tool_callback=chain_callbacks(tool_policy_guardrail, prefetcher.before_tool_callback, tool_result_cache.before_tool_callback, websurf_rate_limit.before_tool_callback),
+    after_tool_callback=tool_result_cache.after_tool_callback,
 )
+
+
+async def fetch_page(tool: BaseTool, url: str) -> Any:
+    """Prefetches a page, within the websurf rate limit."""
+    if not await websurf_rate_limit.acquire():
+        return None
+    return await tool.run_async(args={"url": url}, tool_context=None)
+
+async def predict_page_fetches(query: str) -> list[Speculation]:
+    """Fetches of the URLs written in the query, see src/agents/prefetch.py."""
+    urls = find_urls(query)
+    if not urls:
+        return []
+    tool = find_url_tool(await websurf_tool.get_tools())
+    if tool is None:
+        return []
+    return [Speculation(tool=tool.name, args={"url": url}, run=partial(fetch_page, tool, url)) for url in urls]
+
+prefetcher.register(Websurf_Agent.name, predict_page_fetches)
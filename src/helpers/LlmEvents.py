@@ -20,7 +20,22 @@ class LlmEvents(BaseModel):
         description="Indicates if this event is the final response from the agent."
     )
 
+    partial: Optional[bool] = Field(
+        default = False,
+        description="Indicates if this event is a partial (streamed) chunk of model text."
+    )
+
     content: Optional[str | None] = Field(
         default = None,
-        description="The textual content of the event, if applicable."
+        description="The textual content of the event, if applicable. Cut to a preview in 'summary' mode."
+    )
+
+    tools: Optional[list[str]] = Field(
+        default = None,
+        description="Names of the tools called or answered in this event, if any."
+    )
+
+    details: Optional[dict] = Field(
+        default = None,
+        description="The whole ADK event (every content part, tool call, tool result and action), in 'full' mode only."
     )
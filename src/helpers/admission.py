@@ -0,0 +1,168 @@
+"""This module provides per-process admission control for the '/chat' endpoint.
+
+At most `max_concurrent` agent runs execute at once and each user may have at most `max_per_user`
+runs running or queued. Requests beyond the global limit wait in a bounded FIFO queue for up to
+`queue_timeout` seconds. Rejected requests carry the HTTP status to answer with (429 for a user over
+its limit, 503 when the process is saturated) and a Retry-After estimate.
+"""
+
+import asyncio
+import math
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request is not admitted."""
+
+    def __init__(self, status: int, retry_after: int, reason: str):
+        super().__init__(reason)
+        self.status = status
+        self.retry_after = retry_after
+        self.reason = reason
+
+
+class AdmissionController:
+    """Global and per-user concurrency limits with a bounded wait queue."""
+
+    def __init__(self, max_concurrent: int = 16, max_per_user: int = 4, max_queue: int = 64, queue_timeout: float = 10.0):
+        self.max_concurrent = max_concurrent
+        self.max_per_user = max_per_user
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+
+        self.in_flight = 0
+        self._waiters: deque[asyncio.Future] = deque()
+        self._per_user: dict[str, int] = {}
+        self._avg_run_time = 5.0
+
+        self.admitted = 0
+        self.queued = 0
+        self.rejected_user = 0
+        self.rejected_queue_full = 0
+        self.rejected_timeout = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    @classmethod
+    def from_env(cls) -> "AdmissionController":
+        """Builds the controller from the ADMISSION_* environment variables."""
+        return cls(
+            max_concurrent=int(os.getenv("ADMISSION_MAX_CONCURRENT", 16)),
+            max_per_user=int(os.getenv("ADMISSION_MAX_PER_USER", 4)),
+            max_queue=int(os.getenv("ADMISSION_MAX_QUEUE", 64)),
+            queue_timeout=float(os.getenv("ADMISSION_QUEUE_TIMEOUT", 10)),
+        )
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+
+    def retry_after(self) -> int:
+        """Estimated seconds until a slot frees up, from the average run time and the queue depth."""
+        return max(1, math.ceil(self._avg_run_time * (self.queue_depth + 1) / self.max_concurrent))
+
+    async def acquire(self, user_id: str) -> float:
+        """Waits for a run slot for `user_id` and returns the admission time. Raises AdmissionRejected."""
+        if self._per_user.get(user_id, 0) >= self.max_per_user:
+            self.rejected_user += 1
+            raise AdmissionRejected(429, self.retry_after(), f"Too many concurrent requests for user '{user_id}'.")
+
+        started = time.monotonic()
+        if self.in_flight >= self.max_concurrent or self._waiters:
+            if self.queue_depth >= self.max_queue:
+                self.rejected_queue_full += 1
+                raise AdmissionRejected(503, self.retry_after(), "Server is busy, the request queue is full.")
+
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            self.queued += 1
+            self._per_user[user_id] = self._per_user.get(user_id, 0) + 1
+            try:
+                await asyncio.wait_for(asyncio.shield(waiter), timeout=self.queue_timeout)
+            except BaseException as e:
+                self._release_user(user_id)
+                if waiter.done() and not waiter.cancelled():
+                    # Handed a slot right as the wait ended: pass it on.
+                    self._wake_next()
+                else:
+                    self._waiters.remove(waiter)
+                    waiter.cancel()
+                if isinstance(e, asyncio.TimeoutError):
+                    self.rejected_timeout += 1
+                    raise AdmissionRejected(503, self.retry_after(), f"Server is busy, no slot became free within {self.queue_timeout:.0f}s.")
+                raise
+            # The releasing request handed its slot over, in_flight was not decremented.
+        else:
+            self.in_flight += 1
+            self._per_user[user_id] = self._per_user.get(user_id, 0) + 1
+
+        wait = time.monotonic() - started
+        self.admitted += 1
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+        return time.monotonic()
+
+    def _release_user(self, user_id: str) -> None:
+        count = self._per_user.get(user_id, 0) - 1
+        if count > 0:
+            self._per_user[user_id] = count
+        else:
+            self._per_user.pop(user_id, None)
+
+    def _wake_next(self) -> None:
+        """Hands the caller's slot to the oldest waiter, or frees it."""
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.in_flight -= 1
+
+    def release(self, user_id: str, admitted_at: float) -> None:
+        """Frees the slot of a finished run."""
+        self._avg_run_time = 0.9 * self._avg_run_time + 0.1 * (time.monotonic() - admitted_at)
+        self._release_user(user_id)
+        self._wake_next()
+
+    def releaser(self, user_id: str, admitted_at: float) -> Callable[[], None]:
+        """A function freeing the slot of a run on its first call only, for runs that may end in several places."""
+        released = False
+
+        def release() -> None:
+            nonlocal released
+            if not released:
+                released = True
+                self.release(user_id, admitted_at)
+        return release
+
+    @asynccontextmanager
+    async def slot(self, user_id: str) -> AsyncIterator[None]:
+        """Holds a run slot for the duration of the block."""
+        admitted_at = await self.acquire(user_id)
+        try:
+            yield
+        finally:
+            self.release(user_id, admitted_at)
+
+    def stats(self) -> dict[str, Any]:
+        """Concurrency, queue depth and wait time counters."""
+        return {
+            "max_concurrent": self.max_concurrent,
+            "max_per_user": self.max_per_user,
+            "max_queue": self.max_queue,
+            "in_flight": self.in_flight,
+            "queue_depth": self.queue_depth,
+            "active_users": len(self._per_user),
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "rejected_user_limit": self.rejected_user,
+            "rejected_queue_full": self.rejected_queue_full,
+            "rejected_timeout": self.rejected_timeout,
+            "avg_wait_ms": self.total_wait / self.admitted * 1000 if self.admitted else 0.0,
+            "max_wait_ms": self.max_wait * 1000,
+            "avg_run_time_s": round(self._avg_run_time, 3),
+        }
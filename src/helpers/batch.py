@@ -0,0 +1,46 @@
+"""This module provides the bookkeeping of batch runs: latency percentiles, throughput and error counts."""
+
+import time
+from collections import Counter
+from helpers.response_dto import BatchSummary, StateResponse
+
+
+def percentile(samples: list[float], q: float) -> float:
+    """Nearest-rank percentile of `samples` (q in 0..100), 0 when there are none."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, round(q / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+class BatchReport:
+    """Collects the results of a batch run as they complete."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.latencies: list[float] = []
+        self.statuses: Counter[int] = Counter()
+
+    def add(self, response: StateResponse, latency: float) -> None:
+        self.latencies.append(latency)
+        self.statuses[response.status or 200] += 1
+
+    def summary(self) -> BatchSummary:
+        duration = time.perf_counter() - self.started
+        total = len(self.latencies)
+        succeeded = self.statuses.get(200, 0)
+        return BatchSummary(
+            total=total,
+            succeeded=succeeded,
+            failed=total - succeeded,
+            status_counts={str(status): count for status, count in sorted(self.statuses.items())},
+            duration_seconds=round(duration, 3),
+            throughput_per_second=round(total / duration, 3) if duration > 0 else 0.0,
+            latency_seconds={
+                "p50": round(percentile(self.latencies, 50), 3),
+                "p90": round(percentile(self.latencies, 90), 3),
+                "p99": round(percentile(self.latencies, 99), 3),
+                "max": round(max(self.latencies, default=0.0), 3),
+            },
+        )
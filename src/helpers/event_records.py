@@ -0,0 +1,127 @@
+"""This module provides the compact record of the events of a request and a store of recent events.
+
+Every runner event is recorded as a slotted `EventRecord` holding the few fields of the response and a
+reference to the ADK event. Pydantic `LlmEvents` are built only for the response, in its `events`
+mode: 'none', 'summary' (text cut to EVENTS_SUMMARY_MAX_CHARS characters) or 'full' (the whole ADK
+event, with every part, tool call and tool result). The records of the last EVENT_STORE_MAX_REQUESTS
+requests are kept, so the full events of a request can be fetched later by its id.
+"""
+
+import os
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Literal, Optional, get_args
+from helpers.LlmEvents import LlmEvents
+
+EventsMode = Literal["none", "summary", "full"]
+
+# 'full' keeps the events of responses as complete as before the compact modes; 'summary' and 'none' are opt-in.
+EVENTS_DEFAULT_MODE: EventsMode = os.getenv("EVENTS_DEFAULT_MODE", "full").lower()
+if EVENTS_DEFAULT_MODE not in get_args(EventsMode):
+    raise ValueError(f"Unknown EVENTS_DEFAULT_MODE '{EVENTS_DEFAULT_MODE}', expected one of {', '.join(get_args(EventsMode))}.")
+EVENTS_SUMMARY_MAX_CHARS = int(os.getenv("EVENTS_SUMMARY_MAX_CHARS", 200))
+EVENT_STORE_MAX_REQUESTS = int(os.getenv("EVENT_STORE_MAX_REQUESTS", 256))
+
+
+def shorten(text: Optional[str], max_chars: int) -> Optional[str]:
+    """`text` cut to `max_chars` characters, with the number of characters left out."""
+    if text is None or len(text) <= max_chars:
+        return text
+    return f"{text[:max_chars]}... [{len(text) - max_chars} more characters]"
+
+
+@dataclass(slots=True)
+class EventRecord:
+    """One event of a request, as recorded on the hot path."""
+    author: Optional[str]
+    event_type: str
+    final: bool
+    partial: bool
+    content: Optional[str]
+    tools: tuple[str, ...] = ()
+    event: Any = None
+
+    @classmethod
+    def from_event(cls, event: Any) -> "EventRecord":
+        """Records an ADK event: the text of its first part and the names of the tools it calls or answers.
+
+        Events of a parallel branch (see `src.agents.fanout`) are never the final response of the request.
+        """
+        parts = event.content.parts if event.content and event.content.parts else ()
+        tools = tuple(
+            part.function_call.name if part.function_call else part.function_response.name
+            for part in parts if part.function_call or part.function_response
+        )
+        return cls(
+            author=event.author,
+            event_type=type(event).__name__,
+            final=event.is_final_response() and not event.branch,
+            partial=bool(event.partial),
+            content=parts[0].text if parts else None,
+            tools=tools,
+            event=event,
+        )
+
+    def preview(self, max_chars: int = EVENTS_SUMMARY_MAX_CHARS) -> str:
+        """Short description for log lines."""
+        text = shorten(self.content, max_chars)
+        return f"{text!r} tools={list(self.tools)}" if self.tools else repr(text)
+
+    def to_model(self, mode: EventsMode = "summary") -> LlmEvents:
+        """The event as returned to clients, in 'summary' or 'full' mode. Partial text chunks are never cut."""
+        full = mode == "full"
+        return LlmEvents(
+            author=self.author,
+            event_type=self.event_type,
+            final=self.final,
+            partial=self.partial,
+            content=self.content if full or self.partial else shorten(self.content, EVENTS_SUMMARY_MAX_CHARS),
+            tools=list(self.tools) or None,
+            details=self.event.model_dump(mode="json", exclude_none=True) if full and self.event is not None else None,
+        )
+
+
+def render_events(records: list[EventRecord], mode: EventsMode) -> Optional[list[LlmEvents]]:
+    """The events of a response in `mode`, None in 'none' mode."""
+    if mode == "none":
+        return None
+    return [record.to_model(mode) for record in records]
+
+
+class EventStore:
+    """LRU of the event records of recent requests, by request id."""
+
+    def __init__(self, max_requests: int = 256):
+        self.max_requests = max_requests
+        self._requests: OrderedDict[str, list[EventRecord]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def put(self, request_id: str, records: list[EventRecord]) -> None:
+        if self.max_requests <= 0:
+            return
+        self._requests[request_id] = records
+        self._requests.move_to_end(request_id)
+        while len(self._requests) > self.max_requests:
+            self._requests.popitem(last=False)
+
+    def get(self, request_id: str) -> Optional[list[EventRecord]]:
+        records = self._requests.get(request_id)
+        if records is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return records
+
+    def stats(self) -> dict[str, Any]:
+        """Store counters."""
+        return {
+            "requests": len(self._requests),
+            "events": sum(len(records) for records in self._requests.values()),
+            "max_requests": self.max_requests,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+event_store = EventStore(max_requests=EVENT_STORE_MAX_REQUESTS)
@@ -1,6 +1,6 @@
 """This module defines data transfer objects (DTOs) for request."""
 
-from typing import Optional
+from typing import Literal, Optional
 from pydantic import BaseModel, Field
 
 class StateRequest(BaseModel):
@@ -22,3 +22,48 @@ class StateRequest(BaseModel):
         default = None,
         description = "The session identifier to maintain conversation context."
     )
+
+    stream: Optional[bool] = Field(
+        default = False,
+        description = "If true, events are streamed back as NDJSON as soon as the agent yields them."
+    )
+
+    request_id: Optional[str] = Field(
+        default = None,
+        description = "Identifier of the request, echoed in the response. Generated when missing."
+    )
+
+    events: Optional[Literal["none", "summary", "full"]] = Field(
+        default = None,
+        description = "Events returned with the response: 'none', 'summary' (short previews) or 'full' (whole ADK events). Defaults to EVENTS_DEFAULT_MODE; the full events stay available on 'GET /chat/events/{request_id}'."
+    )
+
+
+class BatchRequest(BaseModel):
+    """Request model for POST '/chat/batch' endpoint.
+
+    This model represents a list of chat requests to run with bounded concurrency, and how to run them.
+    """
+    requests: list[StateRequest] = Field(
+        description = "The chat requests to run."
+    )
+
+    concurrency: Optional[int] = Field(
+        default = None,
+        description = "How many requests run at the same time, capped by BATCH_MAX_CONCURRENCY. Defaults to BATCH_CONCURRENCY."
+    )
+
+    session_mode: Literal["per_request", "shared"] = Field(
+        default = "per_request",
+        description = "'per_request' runs each request without a session id on its own new session, 'shared' runs them all on one session."
+    )
+
+    keep_sessions: bool = Field(
+        default = False,
+        description = "If false, the sessions created for 'per_request' mode are deleted once their request is answered."
+    )
+
+    include_events: bool = Field(
+        default = False,
+        description = "If true, each result carries the events generated by the agent, in the `events` mode of its request."
+    )
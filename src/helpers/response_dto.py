@@ -23,3 +23,91 @@ class StateResponse(BaseModel):
         default = None,
         description = "List of events generated by the agent during processing"
     )
+
+    request_id: Optional[str] = Field(
+        default = None,
+        description = "Identifier of the request, to look up its trace on 'GET /debug/trace/{request_id}'"
+    )
+
+
+class StreamChunk(BaseModel):
+    """One line of the NDJSON stream returned by POST '/chat' when streaming is requested.
+
+    Intermediate lines carry a single event (or partial model text), the last line carries the final StateResponse.
+    """
+    type: str = Field(
+        description = "The kind of chunk: 'partial', 'event' or 'final'"
+    )
+
+    event: Optional[LlmEvents] = Field(
+        default = None,
+        description = "The event yielded by the agent, for 'partial' and 'event' chunks"
+    )
+
+    result: Optional[StateResponse] = Field(
+        default = None,
+        description = "The final response summary, for the 'final' chunk"
+    )
+
+
+class BatchSummary(BaseModel):
+    """Totals of a '/chat/batch' run."""
+    total: int = Field(
+        description = "Number of requests run"
+    )
+
+    succeeded: int = Field(
+        description = "Number of requests answered with status 200"
+    )
+
+    failed: int = Field(
+        description = "Number of requests answered with another status"
+    )
+
+    status_counts: dict[str, int] = Field(
+        default_factory = dict,
+        description = "Number of results per status code"
+    )
+
+    duration_seconds: float = Field(
+        description = "Wall-clock time of the batch"
+    )
+
+    throughput_per_second: float = Field(
+        description = "Requests completed per second"
+    )
+
+    latency_seconds: dict[str, float] = Field(
+        default_factory = dict,
+        description = "Latency percentiles of the requests: p50, p90, p99 and max"
+    )
+
+
+class BatchChunk(BaseModel):
+    """One line of the NDJSON stream returned by POST '/chat/batch'.
+
+    Results come in completion order, tagged with the position of their request in the batch; the last line carries the summary.
+    """
+    type: str = Field(
+        description = "The kind of chunk: 'result' or 'summary'"
+    )
+
+    index: Optional[int] = Field(
+        default = None,
+        description = "Position of the request in the batch, for 'result' chunks"
+    )
+
+    latency_seconds: Optional[float] = Field(
+        default = None,
+        description = "Time taken by the request, for 'result' chunks"
+    )
+
+    result: Optional[StateResponse] = Field(
+        default = None,
+        description = "The response to the request, for 'result' chunks"
+    )
+
+    summary: Optional[BatchSummary] = Field(
+        default = None,
+        description = "The batch totals, for the 'summary' chunk"
+    )
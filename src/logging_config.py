@@ -1,28 +1,143 @@
-"""This module provides a logging configuration for the Great-Sage application."""
+"""This module provides a logging configuration for the Great-Sage application.
+
+By default (LOG_ASYNC=true) records are put on a queue by the calling thread and formatted and written
+by a background listener thread, so console and disk I/O never run on the asyncio event loop.
+LOG_FORMAT=json writes one JSON object per record, LOG_MAX_MESSAGE_LENGTH truncates large payloads
+(e.g. whole events) and the log file rotates every LOG_MAX_BYTES.
+"""
+
+import atexit
+import json
+import logging
+import logging.config
+import logging.handlers
+import os
+import queue
+from typing import Optional
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text").lower()
+LOG_ASYNC = os.getenv("LOG_ASYNC", "true").lower() in ("1", "true", "yes")
+LOG_FILE = os.getenv("LOG_FILE", "logs/Great_Sage.log")
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", 10 * 1024 * 1024))
+LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", 5))
+LOG_MAX_MESSAGE_LENGTH = int(os.getenv("LOG_MAX_MESSAGE_LENGTH", 2000))
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", 10000))
+
+
+def truncate(message: str, max_length: int = LOG_MAX_MESSAGE_LENGTH) -> str:
+    """Cuts `message` to `max_length` characters, noting how much was left out. 0 disables truncation."""
+    if max_length <= 0 or len(message) <= max_length:
+        return message
+    return f"{message[:max_length]}... [{len(message) - max_length} more characters]"
+
+
+class TruncatingFormatter(logging.Formatter):
+    """Standard text formatter truncating long messages."""
+
+    def formatMessage(self, record: logging.LogRecord) -> str:
+        record.message = truncate(record.message)
+        return super().formatMessage(record)
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats each record as a single-line JSON object."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": truncate(record.getMessage()),
+        }
+        if record.exc_info:
+            payload["exception"] = self.formatException(record.exc_info)
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+class LazyQueueHandler(logging.handlers.QueueHandler):
+    """Queue handler that leaves formatting to the listener thread.
+
+    The stock `QueueHandler.prepare` formats the message on the calling thread so that records can be
+    pickled; the queue stays in-process here, so the record is enqueued as is and the %-style arguments
+    are only merged by the listener. Records are dropped, not waited for, when the queue is full.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
 
 LOGGING_CONFIG = {
     'version': 1,
     'disable_existing_loggers': False,
     'formatters': {
         'standard': {
-            'format': '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+            '()': TruncatingFormatter,
+            'fmt': '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+        },
+        'json': {
+            '()': JsonFormatter,
         },
     },
     'handlers': {
         'console': {
             'class': 'logging.StreamHandler',
-            'formatter': 'standard',
-            'level': 'INFO',
+            'formatter': 'json' if LOG_FORMAT == 'json' else 'standard',
+            'level': LOG_LEVEL,
         },
         'file': {
-            'class': 'logging.FileHandler',
-            'formatter': 'standard',
-            'filename': 'logs/Great_Sage.log',
-            'level': 'INFO',
+            'class': 'logging.handlers.RotatingFileHandler',
+            'formatter': 'json' if LOG_FORMAT == 'json' else 'standard',
+            'filename': LOG_FILE,
+            'maxBytes': LOG_MAX_BYTES,
+            'backupCount': LOG_BACKUP_COUNT,
+            'encoding': 'utf-8',
+            'level': LOG_LEVEL,
         },
     },
     'root': {
         'handlers': ['console', 'file'],
-        'level': 'INFO',
+        'level': LOG_LEVEL,
     },
 }
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def configure_logging(config: dict = LOGGING_CONFIG, use_queue: bool = LOG_ASYNC) -> None:
+    """Applies `config` and, with `use_queue`, moves the root handlers behind a queue served by a background thread."""
+    global _listener
+    stop_logging()
+    logging.config.dictConfig(config)
+    if not use_queue:
+        return
+
+    root = logging.getLogger()
+    handlers = list(root.handlers)
+    for handler in handlers:
+        root.removeHandler(handler)
+    log_queue: queue.Queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    root.addHandler(LazyQueueHandler(log_queue))
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+
+
+def stop_logging() -> None:
+    """Writes the queued records and stops the listener thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(stop_logging)
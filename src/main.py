@@ -1,22 +1,46 @@
 """This module is the main entry point for the Great-Sage application."""
 
+import argparse
 import asyncio
 import dotenv
+import json
+import math
 import os
+import sys
+import time
 import uuid
+from contextlib import asynccontextmanager
+from typing import AsyncGenerator, Callable, Optional
 import fastapi
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
 import logging.config
 from logging import DEBUG
+from google.adk.agents.run_config import RunConfig, StreamingMode
+from google.adk.events import Event
 from google.adk.runners import Runner
-from google.adk.sessions import InMemorySessionService, DatabaseSessionService, Session
+from google.adk.sessions import BaseSessionService, Session
 from google.genai import types
-import uvicorn
 from agent import root_agent
-from helpers.request_dto import StateRequest
-from helpers.response_dto import StateResponse
-from helpers.LlmEvents import LlmEvents
-from logging_config import LOGGING_CONFIG
+from src.agents.tools.mcp_pool import start_mcp_pools, stop_mcp_pools, mcp_pool_stats
+from src.agents.data_stores.tool_result_cache import tool_result_cache
+from src.agents.data_stores.response_cache import CachedResponse, response_cache, sets_guardrail_state
+from src.agents.data_stores.file_index import file_index
+from src.agents.data_stores.weather_service import weather_service
+from src.agents.router import select_agent
+from src.agents.fanout import Branch, plan_fanout, run_fanout
+from src.agents.rate_limits import RateLimitExceeded, rate_limit_stats
+from src.agents.context_compaction import context_compactor
+from src.agents.security.tool_policy import tool_policy
+from src.agents.prefetch import prefetcher
+from src.agents.models import model_stats
+from src.agents.tracing import tracer, setup_tracing, shutdown_tracing, describe_trace
+from helpers.admission import AdmissionController, AdmissionRejected
+from helpers.batch import BatchReport
+from helpers.request_dto import BatchRequest, StateRequest
+from helpers.response_dto import BatchChunk, StateResponse, StreamChunk
+from helpers.event_records import EVENTS_DEFAULT_MODE, EventRecord, EventsMode, event_store, render_events
+from logging_config import configure_logging
 
 
 # --- Environment Setup ---
@@ -27,14 +51,30 @@ DEPLOYMENT_PORT = int(os.getenv("DEPLOYMENT_PORT", 10000))
 
 
 # --- Logging Configuration ---
-# Configure logging using the predefined logging configuration
-logging.config.dictConfig(LOGGING_CONFIG)
+# Configure logging using the predefined logging configuration, writing from a background thread unless LOG_ASYNC=false
+configure_logging()
 logger = logging.getLogger(__name__)
 
 
+# --- Tracing Configuration ---
+# Records spans for requests, agent runs, model calls, callbacks and tools, see src/agents/tracing.py
+setup_tracing()
+
+
 # --- FastAPI Setup ---
 # Initialize FastAPI application and configure CORS middleware
-app = fastapi.FastAPI() 
+@asynccontextmanager
+async def lifespan(app: fastapi.FastAPI):
+    """Startup and shutdown hooks of the application."""
+    await start_mcp_pools()
+    yield
+    await close_runners()
+    await stop_mcp_pools()
+    await close_session_service()
+    await weather_service.close()
+    shutdown_tracing()
+
+app = fastapi.FastAPI(lifespan=lifespan)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -44,15 +84,91 @@ app.add_middleware(
 )
 
 
+# --- Admission Control ---
+# Bounds the concurrent agent runs of this process, see ADMISSION_* in .env.example
+admission = AdmissionController.from_env()
+
+def overloaded_response(status: int, retry_after: float, message: str) -> JSONResponse:
+    """Function to build a 429/503 response telling the client when to retry."""
+    retry_after = max(1, math.ceil(retry_after))
+    return JSONResponse(
+        status_code=status,
+        content=StateResponse(status=status, response=message).model_dump(),
+        headers={"Retry-After": str(retry_after)}
+    )
+
+
 # --- Session Management ---
 # SessionService stores conversation history & state.
-session_service = InMemorySessionService()
-#db_url = "sqlite:///./my_agent_data.db"
-#session_service = DatabaseSessionService(db_url=db_url)
+# SESSION_BACKEND is one of:
+#   memory   - in-memory sessions, lost on restart (default), expired after SESSION_TTL idle seconds, at most
+#              SESSION_MAX_SESSIONS of SESSION_MAX_EVENTS events each, spilled to SESSION_SPILL_DIR when set
+#   database - ADK DatabaseSessionService on any SQLAlchemy URL
+#   sqlite   - pooled async SQLite store
+#   cached   - pooled SQLite store behind an LRU of hot sessions with write-behind batching; appends wait (and
+#              fail after a few seconds) while SESSION_MAX_PENDING events are not written yet
+# SESSION_AFFINITY tells the cached backend how requests reach the workers (see serve.py):
+#   sticky    - a session's requests always hit the same worker, so hot sessions are served from its cache (default)
+#   stateless - any worker may serve any request, so sessions are loaded from the store on every request
+# The SQLite stores append state deltas, folded into a snapshot every SESSION_SNAPSHOT_EVERY deltas, and with
+# SESSION_RECENT_EVENTS > 0 load only the last events of a session (the turns before are left to the summary).
+SESSION_BACKEND = os.getenv("SESSION_BACKEND", "memory").lower()
+SESSION_DB_URL = os.getenv("SESSION_DB_URL", "sqlite:///./my_agent_data.db")
+SESSION_DB_POOL_SIZE = int(os.getenv("SESSION_DB_POOL_SIZE", 4))
+SESSION_CACHE_SIZE = int(os.getenv("SESSION_CACHE_SIZE", 1024))
+SESSION_FLUSH_INTERVAL_MS = int(os.getenv("SESSION_FLUSH_INTERVAL_MS", 50))
+SESSION_MAX_PENDING = int(os.getenv("SESSION_MAX_PENDING", 10000))
+SESSION_AFFINITY = os.getenv("SESSION_AFFINITY", "sticky").lower()
+SESSION_SNAPSHOT_EVERY = int(os.getenv("SESSION_SNAPSHOT_EVERY", 50))
+SESSION_RECENT_EVENTS = int(os.getenv("SESSION_RECENT_EVENTS", 0))
+SESSION_TTL = float(os.getenv("SESSION_TTL", 3600))
+SESSION_MAX_SESSIONS = int(os.getenv("SESSION_MAX_SESSIONS", 10000))
+SESSION_MAX_EVENTS = int(os.getenv("SESSION_MAX_EVENTS", 1000))
+SESSION_SWEEP_INTERVAL = float(os.getenv("SESSION_SWEEP_INTERVAL", 60))
+SESSION_SPILL_DIR = os.getenv("SESSION_SPILL_DIR", "")
+
+def build_session_service(backend: str) -> BaseSessionService:
+    """Function to create the session service for the configured backend."""
+    if backend == "memory":
+        from src.agents.data_stores.bounded_session_service import BoundedSessionService
+        return BoundedSessionService(
+            ttl=SESSION_TTL,
+            max_sessions=SESSION_MAX_SESSIONS,
+            max_events=SESSION_MAX_EVENTS,
+            sweep_interval=SESSION_SWEEP_INTERVAL,
+            spill_dir=SESSION_SPILL_DIR
+        )
+    if backend == "database":
+        from google.adk.sessions import DatabaseSessionService
+        return DatabaseSessionService(db_url=SESSION_DB_URL)
+
+    from src.agents.data_stores.sql_session_service import SqlSessionService
+    store = SqlSessionService(
+        db_url=SESSION_DB_URL,
+        pool_size=SESSION_DB_POOL_SIZE,
+        snapshot_every=SESSION_SNAPSHOT_EVERY,
+        recent_events=SESSION_RECENT_EVENTS
+    )
+    if backend == "sqlite":
+        return store
+    if backend == "cached":
+        from src.agents.data_stores.cached_session_service import CachedSessionService
+        return CachedSessionService(
+            store,
+            max_sessions=SESSION_CACHE_SIZE,
+            flush_interval=SESSION_FLUSH_INTERVAL_MS / 1000,
+            max_pending=SESSION_MAX_PENDING,
+            cache_reads=SESSION_AFFINITY != "stateless"
+        )
+    raise ValueError(f"Unknown SESSION_BACKEND '{backend}'.")
+
+session_service = build_session_service(SESSION_BACKEND)
+logger.info(f"Session backend '{SESSION_BACKEND}' using {type(session_service).__name__}.")
 
 APP_NAME = "Great_Sage"
 USER_ID = "user_1"
-SESSION_ID = str(uuid.uuid4())
+# Workers started by serve.py share DEFAULT_SESSION_ID so that requests without a session id land in the same session.
+SESSION_ID = os.getenv("DEFAULT_SESSION_ID") or str(uuid.uuid4())
 
 
 # Define initial state data - user prefers Celsius initially
@@ -71,10 +187,53 @@ runner = Runner(
 logger.info(f"Runner created for agent '{runner.agent.name}'.")
 
 
+# --- Pre-Router Setup ---
+# Obvious requests skip the root agent's model call and go straight to a sub-agent's runner
+PRE_ROUTER_ENABLED = os.getenv("PRE_ROUTER_ENABLED", "true").lower() in ("1", "true", "yes")
+PRE_ROUTER_MIN_CONFIDENCE = float(os.getenv("PRE_ROUTER_MIN_CONFIDENCE", 0.8))
+
+sub_agent_runners = {
+    sub_agent.name: Runner(agent=sub_agent, app_name=APP_NAME, session_service=session_service)
+    for sub_agent in root_agent.sub_agents
+}
+
+def select_runner(query: str) -> Runner:
+    """Function to pick the runner for a query: a sub-agent's when the pre-router is confident, else the root agent's."""
+    if not PRE_ROUTER_ENABLED:
+        return runner
+    agent_name = select_agent(query, min_confidence=PRE_ROUTER_MIN_CONFIDENCE)
+    return sub_agent_runners.get(agent_name, runner)
+
+
+# --- Fan-out Setup ---
+# Compound requests whose parts each route to a sub-agent run the parts in parallel and merge the answers
+FANOUT_ENABLED = os.getenv("FANOUT_ENABLED", "true").lower() in ("1", "true", "yes")
+FANOUT_BRANCH_TIMEOUT = float(os.getenv("FANOUT_BRANCH_TIMEOUT", 60))
+FANOUT_MAX_BRANCHES = int(os.getenv("FANOUT_MAX_BRANCHES", 4))
+
+def plan_branches(query: str) -> Optional[list[Branch]]:
+    """Function to split a compound query into parallel sub-agent branches, or None to run it through a single runner."""
+    if not FANOUT_ENABLED:
+        return None
+    branches = plan_fanout(query, min_confidence=PRE_ROUTER_MIN_CONFIDENCE, max_branches=FANOUT_MAX_BRANCHES)
+    # A part routed to a disabled sub-agent (see ENABLED_SUB_AGENTS) leaves the whole query to the root agent.
+    if branches is None or any(branch.agent not in sub_agent_runners for branch in branches):
+        return None
+    return branches
+
+async def close_runners() -> None:
+    """Function to close the toolsets of the agent tree on shutdown.
+
+    The sub-agent runners share their agents (and toolsets) with the root runner, so closing the root runner is enough.
+    """
+    await runner.close()
+    logger.info(f"Runner for agent '{runner.agent.name}' closed.")
+
+
 # --- Session Management Functions ---
 async def create_session(user_id: str, session_id: str) -> None:
     """Function to create a new session to manage the conversation."""
-    logger.info(f"Creating session with App='{APP_NAME}', User='{user_id}', Session='{session_id}'")
+    logger.info("Creating session with App='%s', User='%s', Session='%s'", APP_NAME, user_id, session_id)
 
     await session_service.create_session(
         app_name=APP_NAME,
@@ -86,44 +245,289 @@ async def create_session(user_id: str, session_id: str) -> None:
 
 async def get_session(user_id: str, session_id: str) -> Session | None:
     """Function to get a session by user_id and session_id."""
-    logger.info(f"Getting session with App='{APP_NAME}', User='{user_id}', Session='{session_id}'")
+    logger.info("Getting session with App='%s', User='%s', Session='%s'", APP_NAME, user_id, session_id)
 
     session = await session_service.get_session(app_name=APP_NAME, user_id=user_id, session_id=session_id)
     logger.info(f"Session retrieved.")
 
     return session
 
+async def record_cached_turn(user_id: str, session_id: str, query: str, cached: CachedResponse) -> None:
+    """Function to append a query answered from the response cache and its answer to the session, as a run would have."""
+    session = await session_service.get_session(app_name=APP_NAME, user_id=user_id, session_id=session_id)
+    if session is None:
+        return
+    invocation_id = f"e-{uuid.uuid4()}"
+    await session_service.append_event(session, Event(
+        invocation_id=invocation_id, author="user", content=types.Content(role="user", parts=[types.Part(text=query)])
+    ))
+    await session_service.append_event(session, Event(
+        invocation_id=invocation_id, author=root_agent.name, content=types.Content(role="model", parts=[types.Part(text=cached.response)])
+    ))
+    await persist_session()
+
+async def persist_session() -> None:
+    """Function to write pending session events before the request ends, so that any worker can load the session next."""
+    flush = getattr(session_service, "flush", None)
+    if flush is not None and SESSION_AFFINITY == "stateless":
+        await flush()
+
+async def close_session_service() -> None:
+    """Function to flush pending writes and release the session store."""
+    close = getattr(session_service, "close", None)
+    if close is not None:
+        await close()
+        logger.info(f"Session service closed.")
+
 
 # --- Agent Interaction ---
-async def call_agent_async(query: str, runner: Runner, user_id: str, session_id: str) -> tuple[str, list[LlmEvents]]:
-    """Sends a query to the agent and returns the response."""
-    logger.info(f"Calling agent with query: '{query}'")
+async def stream_agent_async(query: str, runner: Runner, user_id: str, session_id: str, streaming: bool = False, request_id: Optional[str] = None) -> AsyncGenerator[EventRecord, None]:
+    """Sends a query to the agent and yields each event as soon as the runner produces it.
+
+    With `streaming` enabled the model is run in SSE mode and partial text chunks are yielded as well.
+    The final event carries the final response text (or the escalation message) in its content.
+    When the response cache is enabled, a cached answer to a similar query of the same user is replayed instead of running the agents,
+    and recorded in the session.
+    Compound queries are fanned out to several sub-agents in parallel when every part can be routed.
+    With prefetching enabled, tool calls given away by the query (URLs, weather cities) start before the first model call.
+    The run is traced in a 'chat' span tagged with `request_id`.
+    """
+    logger.info("Calling agent with query: '%s'", query)
+
+    with tracer.start_as_current_span("chat", attributes={
+        "request_id": request_id or uuid.uuid4().hex,
+        "user_id": user_id,
+        "session_id": session_id,
+        "agent": runner.agent.name
+    }) as span:
+        cached = await response_cache.lookup(query, user_id)
+        span.set_attribute("response_cache.hit", cached is not None)
+        if cached is not None:
+            await record_cached_turn(user_id, session_id, query, cached)
+            for event_element in cached.events:
+                yield event_element
+            return
+
+        # Tool calls predictable from the query start now and overlap with the model calls, see PREFETCH_* in .env.example
+        async with prefetcher.speculate(query) as prefetched:
+            span.set_attribute("prefetch.calls", prefetched)
+            branches = plan_branches(query)
+            span.set_attribute("fanout.branches", len(branches) if branches else 0)
+            async for event_element in run_agent_async(query=query, runner=runner, user_id=user_id, session_id=session_id, streaming=streaming, branches=branches):
+                yield event_element
+
+async def run_agent_async(query: str, runner: Runner, user_id: str, session_id: str, streaming: bool, branches: Optional[list[Branch]] = None) -> AsyncGenerator[EventRecord, None]:
+    """Runs the agent (or the fan-out `branches`) for `stream_agent_async` and stores cacheable final responses in the response cache."""
+    content = types.Content(role='user', parts=[types.Part(text=query)])
+    run_config = RunConfig(streaming_mode=StreamingMode.SSE if streaming else StreamingMode.NONE)
+    event_list = []
+    cacheable_response = None
+    blocked = False
 
+    if branches:
+        events = run_fanout(
+            branches, sub_agent_runners, session_service, app_name=APP_NAME, author=root_agent.name, user_id=user_id,
+            session_id=session_id, query=query, run_config=run_config, timeout=FANOUT_BRANCH_TIMEOUT
+        )
+    else:
+        events = runner.run_async(user_id=user_id, session_id=session_id, new_message=content, run_config=run_config)
+
+    async for event in events:
+        event_element = EventRecord.from_event(event)
+        if not event_element.partial:
+            # Whole contents (e.g. web pages) are only logged at DEBUG level.
+            if logger.isEnabledFor(DEBUG):
+                logger.debug("  [Event] Author: %s, Type: %s, Final: %s, Content: %s", event.author, event_element.event_type, event_element.final, event.content)
+            else:
+                logger.info("  [Event] Author: %s, Type: %s, Final: %s, Content: %s", event.author, event_element.event_type, event_element.final, event_element.preview())
+
+        if event_element.final and not (event.content and event.content.parts) and event.actions and event.actions.escalate:
+            event_element.content = f"Agent escalated: {event.error_message or 'No specific message.'}"
+            logger.error(event_element.content)
+        elif event_element.final:
+            cacheable_response = event_element.content
+        # Answers of runs stopped by a guardrail are not cached.
+        blocked = blocked or sets_guardrail_state(event)
+
+        if not event_element.partial:
+            event_list.append(event_element)
+        yield event_element
+
+    # The runner is drained rather than left at the final response, so that its spans end and its generators close in this task.
+    await persist_session()
+    if cacheable_response and not blocked:
+        await response_cache.store(query, user_id, cacheable_response, event_list)
+
+async def call_agent_async(query: str, runner: Runner, user_id: str, session_id: str, request_id: Optional[str] = None) -> tuple[str, list[EventRecord]]:
+    """Sends a query to the agent and returns the response and the event records, which are kept for 'GET /chat/events/{request_id}'."""
     event_list = []
-    content = types.Content(role='user', parts=[types.Part(text=query)])
     final_response_text = "Agent did not produce a response."
 
-    async for event in runner.run_async(user_id=user_id, session_id=session_id, new_message=content):
-        logger.info(f"  [Event] Author: {event.author}, Type: {type(event).__name__}, Final: {event.is_final_response()}, Content: {event.content}")
-        event_element = LlmEvents(
-            author=event.author,
-            event_type=type(event).__name__,
-            final=event.is_final_response(),
-            content=event.content.parts[0].text if event.content and event.content.parts and len(event.content.parts) > 0 else None
-        )
+    async for event_element in stream_agent_async(query=query, runner=runner, user_id=user_id, session_id=session_id, request_id=request_id):
         event_list.append(event_element)
+        if event_element.final:
+            final_response_text = event_element.content
 
-        if event.is_final_response():
-            if event.content and event.content.parts:
-                final_response_text = event.content.parts[0].text
-            elif event.actions and event.actions.escalate:
-                final_response_text = f"Agent escalated: {event.error_message or 'No specific message.'}"
-                logger.error(final_response_text)
-            break
-
-    logger.info(f"Agent response: {final_response_text}")
+    if request_id:
+        event_store.put(request_id, event_list)
+    logger.info("Agent response: %s", final_response_text)
     return (final_response_text or "Agent did not produce a response.", event_list)
 
+async def stream_chat_ndjson(query: str, runner: Runner, user_id: str, session_id: str, release_slot: Callable[[], None], request_id: Optional[str] = None,
+                             events_mode: EventsMode = EVENTS_DEFAULT_MODE) -> AsyncGenerator[str, None]:
+    """Streams the agent run as NDJSON lines, ending with the final StateResponse summary. Releases the admission slot when done.
+
+    Partial text chunks are always streamed; 'event' lines and the events of the final line follow `events_mode`.
+    """
+    event_list = []
+    final_response_text = "Agent did not produce a response."
+
+    try:
+        async for event_element in stream_agent_async(query=query, runner=runner, user_id=user_id, session_id=session_id, streaming=True, request_id=request_id):
+            if event_element.partial:
+                yield StreamChunk(type="partial", event=event_element.to_model()).model_dump_json() + "\n"
+                continue
+
+            event_list.append(event_element)
+            if event_element.final:
+                final_response_text = event_element.content
+            if events_mode != "none":
+                yield StreamChunk(type="event", event=event_element.to_model(events_mode)).model_dump_json() + "\n"
+
+        logger.info("Agent response: %s", final_response_text)
+        result = StateResponse(status=200, response=final_response_text or "Agent did not produce a response.", events=render_events(event_list, events_mode), request_id=request_id)
+    except RateLimitExceeded as e:
+        logger.error(f"Rate limited: {e}")
+        result = StateResponse(status=503, response=e.__str__(), events=render_events(event_list, events_mode), request_id=request_id)
+    except Exception as e:
+        logger.error(f"An error occurred: {e}")
+        result = StateResponse(status=500, response=e.__str__(), events=render_events(event_list, events_mode), request_id=request_id)
+    finally:
+        if request_id:
+            event_store.put(request_id, event_list)
+        release_slot()
+
+    yield StreamChunk(type="final", result=result).model_dump_json() + "\n"
+
+
+# --- Batch Processing ---
+# Bulk workloads run many requests with bounded concurrency, retrying those turned away by admission control or rate limits
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", 4))
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", 16))
+BATCH_MAX_REQUESTS = int(os.getenv("BATCH_MAX_REQUESTS", 10000))
+BATCH_MAX_RETRIES = int(os.getenv("BATCH_MAX_RETRIES", 3))
+
+async def run_batch_item(index: int, request: StateRequest, batch_id: str, shared_session_id: Optional[str], keep_sessions: bool,
+                         include_events: bool, session_lock: asyncio.Lock) -> StateResponse:
+    """Function to run one request of a batch. Overloaded runs are retried after their Retry-After delay, up to BATCH_MAX_RETRIES times."""
+    user_id = request.user_id or USER_ID
+    request_id = request.request_id or f"{batch_id}-{index}"
+    own_session = request.session_id is None and shared_session_id is None
+    session_id = request.session_id or shared_session_id or f"{batch_id}-{index}"
+
+    if request.query is None or len(request.query.strip()) == 0:
+        return StateResponse(status=400, response="User query is empty or invalid.", request_id=request_id)
+
+    try:
+        for attempt in range(BATCH_MAX_RETRIES + 1):
+            try:
+                async with admission.slot(user_id):
+                    # Requests sharing a session must not race to create it.
+                    async with session_lock:
+                        if await get_session(user_id=user_id, session_id=session_id) is None:
+                            await create_session(user_id=user_id, session_id=session_id)
+                    agent_response = await call_agent_async(query=request.query, runner=select_runner(request.query), user_id=user_id, session_id=session_id, request_id=request_id)
+                events = render_events(agent_response[1], request.events or EVENTS_DEFAULT_MODE) if include_events else None
+                return StateResponse(status=200, response=agent_response[0], events=events, request_id=request_id)
+            except (AdmissionRejected, RateLimitExceeded) as e:
+                status = e.status if isinstance(e, AdmissionRejected) else 503
+                if attempt == BATCH_MAX_RETRIES:
+                    return StateResponse(status=status, response=e.__str__(), request_id=request_id)
+                logger.info("Batch request %s overloaded (%s), retrying in %ss.", request_id, status, e.retry_after)
+                await asyncio.sleep(max(1, e.retry_after))
+    except Exception as e:
+        logger.error(f"An error occurred in batch request {request_id}: {e}")
+        return StateResponse(status=500, response=e.__str__(), request_id=request_id)
+    finally:
+        if own_session and not keep_sessions:
+            try:
+                await session_service.delete_session(app_name=APP_NAME, user_id=user_id, session_id=session_id)
+            except Exception as e:
+                logger.error(f"Could not delete batch session '{session_id}': {e}")
+
+async def run_batch(batch: BatchRequest) -> AsyncGenerator[BatchChunk, None]:
+    """Function to run the requests of a batch with bounded concurrency.
+
+    Yields a 'result' chunk per request in completion order, then a 'summary' chunk with throughput, status counts and latency percentiles.
+    """
+    concurrency = max(1, min(batch.concurrency or BATCH_CONCURRENCY, BATCH_MAX_CONCURRENCY))
+    batch_id = f"batch-{uuid.uuid4().hex[:12]}"
+    shared_session_id = f"{batch_id}-shared" if batch.session_mode == "shared" else None
+    logger.info("Starting %s: %d requests, concurrency %d, %s sessions.", batch_id, len(batch.requests), concurrency, batch.session_mode)
+
+    items = iter(enumerate(batch.requests))
+    results: asyncio.Queue[BatchChunk] = asyncio.Queue()
+    session_lock = asyncio.Lock()
+    report = BatchReport()
+
+    async def worker() -> None:
+        # The workers share one iterator, so each request is taken once.
+        for index, request in items:
+            started = time.perf_counter()
+            response = await run_batch_item(index, request, batch_id, shared_session_id, batch.keep_sessions, batch.include_events, session_lock)
+            results.put_nowait(BatchChunk(type="result", index=index, latency_seconds=round(time.perf_counter() - started, 3), result=response))
+
+    workers = [asyncio.create_task(worker(), name=f"{batch_id}-worker-{number}") for number in range(min(concurrency, len(batch.requests)))]
+    try:
+        for _ in range(len(batch.requests)):
+            chunk = await results.get()
+            report.add(chunk.result, chunk.latency_seconds)
+            yield chunk
+    finally:
+        # Cancels the remaining requests when the client goes away.
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
+    summary = report.summary()
+    logger.info("Finished %s: %s", batch_id, summary.model_dump_json())
+    yield BatchChunk(type="summary", summary=summary)
+
+async def stream_batch_ndjson(batch: BatchRequest) -> AsyncGenerator[str, None]:
+    """Streams the results of a batch as NDJSON lines."""
+    async for chunk in run_batch(batch):
+        yield chunk.model_dump_json() + "\n"
+
+async def run_batch_file(path: str, output: Optional[str] = None, concurrency: Optional[int] = None, session_mode: str = "per_request") -> None:
+    """Function to run a JSONL file of requests (one `StateRequest` object or plain query string per line), writing NDJSON results."""
+    requests = []
+    with open(path, encoding="utf-8") as file:
+        for line in file:
+            line = line.strip()
+            if not line:
+                continue
+            value = json.loads(line) if line.startswith(("{", "\"")) else line
+            requests.append(StateRequest(**value) if isinstance(value, dict) else StateRequest(query=value))
+
+    batch = BatchRequest(requests=requests, concurrency=concurrency, session_mode=session_mode)
+    out = open(output, "w", encoding="utf-8") if output else sys.stdout
+    try:
+        async with lifespan(app):
+            async for chunk in run_batch(batch):
+                out.write(chunk.model_dump_json() + "\n")
+                out.flush()
+                if chunk.summary is not None:
+                    summary = chunk.summary
+                    print(
+                        f"{summary.total} requests in {summary.duration_seconds:.1f}s ({summary.throughput_per_second:.2f}/s), "
+                        f"{summary.failed} failed {summary.status_counts}, latency p50 {summary.latency_seconds['p50']:.2f}s "
+                        f"p90 {summary.latency_seconds['p90']:.2f}s p99 {summary.latency_seconds['p99']:.2f}s",
+                        file=sys.stderr
+                    )
+    finally:
+        if output:
+            out.close()
+
 
 # --- Conversation Loop ---
 async def run_conversation() -> None:
@@ -145,41 +549,170 @@ async def run_conversation() -> None:
                 logger.info("Exiting the conversation.")
                 break
             else:
-                response = await call_agent_async(query=user_input, runner=runner, user_id=user_id, session_id=session_id)
+                response = await call_agent_async(query=user_input, runner=select_runner(user_input), user_id=user_id, session_id=session_id)
                 print(f"<<< Agent Response: {response[0]}")
         except Exception as e:
             logger.error(f"An error occurred: {e}")
 
+    await close_runners()
+    await stop_mcp_pools()
+    await close_session_service()
+
 
 # --- API Endpoints ---
-@app.post("/chat", response_model=StateResponse)
-async def chat(request: StateRequest) -> StateResponse:
-    """'POST' endpoint for chatting with the agent"""
+class SlotStreamingResponse(StreamingResponse):
+    """Streaming response freeing an admission slot when it is done, also when the client left before the stream started."""
+
+    def __init__(self, content: AsyncGenerator[str, None], release_slot: Callable[[], None], **kwargs):
+        super().__init__(content, **kwargs)
+        self.release_slot = release_slot
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            # The stream releases the slot itself when it runs to the end; this covers streams never started or cut off.
+            self.release_slot()
+
+
+@app.post("/chat", response_model=StateResponse, responses={429: {"model": StateResponse}, 503: {"model": StateResponse}})
+async def chat(
+    request: StateRequest,
+    x_user_id: Optional[str] = fastapi.Header(default=None),
+    x_session_id: Optional[str] = fastapi.Header(default=None),
+    x_request_id: Optional[str] = fastapi.Header(default=None)
+) -> StateResponse | StreamingResponse:
+    """'POST' endpoint for chatting with the agent.
+
+    Set `stream` in the request to receive the events as NDJSON while the agent is still running.
+    The `X-User-Id` and `X-Session-Id` headers are used when the body has no user or session id;
+    with several workers a load balancer can hash on them to keep a session on one worker.
+    Requests over the concurrency limits are answered with 429 (per user) or 503 (server busy) and a Retry-After header.
+    The response carries a `request_id` (taken from `X-Request-Id` when given) to look the run up in '/debug/trace/{request_id}'.
+    `events` selects the events returned with the answer ('none', 'summary' or 'full'); the full events can be fetched later on '/chat/events/{request_id}'.
+    """
     logger.info("Request on '/chat' endpoint.")
 
     user_query = request.query
-    user_id = request.user_id or USER_ID
-    session_id = request.session_id or SESSION_ID
+    user_id = request.user_id or x_user_id or USER_ID
+    session_id = request.session_id or x_session_id or SESSION_ID
+    request_id = request.request_id or x_request_id or uuid.uuid4().hex
+    events_mode = request.events or EVENTS_DEFAULT_MODE
 
-    if(user_query is None or user_query.strip.len() == 0):
+    if(user_query is None or len(user_query.strip()) == 0):
         return StateResponse(status=400, response="User query is empty or invalid.")
 
-    if(await get_session(user_id=user_id, session_id=session_id) is None):
-        await create_session(user_id=user_id, session_id=session_id)
-    
     try:
-        agent_response = await call_agent_async(query=user_query, runner=runner, user_id=user_id, session_id=session_id)
-        return StateResponse(status=200, response=agent_response[0], events=agent_response[1])
+        admitted_at = await admission.acquire(user_id)
+    except AdmissionRejected as e:
+        logger.error(f"Request rejected with {e.status}: {e.reason}")
+        return overloaded_response(e.status, e.retry_after, e.reason)
+
+    release_slot = admission.releaser(user_id, admitted_at)
+    streaming = False
+    try:
+        if(await get_session(user_id=user_id, session_id=session_id) is None):
+            await create_session(user_id=user_id, session_id=session_id)
+
+        if request.stream:
+            response = SlotStreamingResponse(
+                stream_chat_ndjson(query=user_query, runner=select_runner(user_query), user_id=user_id, session_id=session_id, release_slot=release_slot, request_id=request_id, events_mode=events_mode),
+                release_slot=release_slot,
+                media_type="application/x-ndjson",
+                headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+            )
+            streaming = True
+            return response
+
+        agent_response = await call_agent_async(query=user_query, runner=select_runner(user_query), user_id=user_id, session_id=session_id, request_id=request_id)
+        return StateResponse(status=200, response=agent_response[0], events=render_events(agent_response[1], events_mode), request_id=request_id)
+    except RateLimitExceeded as e:
+        logger.error(f"Rate limited: {e}")
+        return overloaded_response(503, e.retry_after, e.__str__())
     except Exception as e:
         logger.error(f"An error occurred: {e}")
-        return StateResponse(status=500, response=e.__str__())
+        return StateResponse(status=500, response=e.__str__(), request_id=request_id)
+    finally:
+        # A streamed run releases its slot when the stream ends.
+        if not streaming:
+            release_slot()
+
+
+@app.post("/chat/batch", response_model=None, responses={200: {"content": {"application/x-ndjson": {}}, "description": "One BatchChunk per line"}})
+async def chat_batch(batch: BatchRequest) -> StateResponse | StreamingResponse:
+    """'POST' endpoint running a list of chat requests with bounded concurrency.
+
+    Streams one `BatchChunk` NDJSON line per request as it completes (with its `request_id` and position in the batch),
+    then a summary line with throughput, status counts and latency percentiles.
+    """
+    logger.info("Request on '/chat/batch' endpoint with %d requests.", len(batch.requests))
+
+    if len(batch.requests) == 0:
+        return StateResponse(status=400, response="The batch has no requests.")
+    if len(batch.requests) > BATCH_MAX_REQUESTS:
+        return StateResponse(status=400, response=f"The batch has {len(batch.requests)} requests, the limit is {BATCH_MAX_REQUESTS}.")
+
+    return StreamingResponse(
+        stream_batch_ndjson(batch),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.get("/metrics")
+async def metrics() -> dict:
+    """'GET' endpoint exposing runtime counters used to size pools and caches"""
+    session_stats = getattr(session_service, "stats", None)
+    return {
+        "session_service": session_stats() if session_stats else None,
+        "mcp_pools": mcp_pool_stats(),
+        "tool_result_cache": tool_result_cache.stats(),
+        "response_cache": response_cache.stats(),
+        "admission": admission.stats(),
+        "rate_limits": rate_limit_stats(),
+        "context_compaction": context_compactor.stats(),
+        "file_index": file_index.stats(),
+        "event_store": event_store.stats(),
+        "weather": weather_service.stats(),
+        "tool_policy": tool_policy.stats(),
+        "prefetch": prefetcher.stats(),
+        "models": model_stats(),
+    }
+
+
+@app.get("/debug/trace/{request_id}")
+async def debug_trace(request_id: str) -> dict:
+    """'GET' endpoint returning the spans and the time spent per stage of a recent '/chat' request"""
+    trace_view = describe_trace(request_id)
+    if trace_view is None:
+        raise fastapi.HTTPException(status_code=404, detail=f"No trace recorded for request '{request_id}'.")
+    return trace_view
+
+
+@app.get("/chat/events/{request_id}", response_model=StateResponse)
+async def chat_events(request_id: str, mode: EventsMode = "full") -> StateResponse:
+    """'GET' endpoint returning the events of a recent '/chat' request, whole by default or as summaries with `?mode=summary`"""
+    records = event_store.get(request_id)
+    if records is None:
+        raise fastapi.HTTPException(status_code=404, detail=f"No events recorded for request '{request_id}'.")
+    final = next((record.content for record in reversed(records) if record.final), None)
+    return StateResponse(status=200, response=final, events=render_events(records, mode), request_id=request_id)
 
 
 # --- Main Execution ---
-# Run the FastAPI application
+# Run the interactive conversation, or a batch of requests with --batch
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Great-Sage command line.")
+    parser.add_argument("--batch", metavar="FILE", help="JSONL file of requests to run as a batch instead of the interactive conversation")
+    parser.add_argument("--output", metavar="FILE", help="file receiving the NDJSON batch results (default: standard output)")
+    parser.add_argument("--concurrency", type=int, default=None, help=f"requests run at the same time (default: {BATCH_CONCURRENCY})")
+    parser.add_argument("--shared-session", action="store_true", help="run all batch requests on one session")
+    args = parser.parse_args()
+
     try:
-        #uvicorn.run("main:app", host="0.0.0.0", port=DEPLOYMENT_PORT)
-        asyncio.run(run_conversation())
+        if args.batch:
+            asyncio.run(run_batch_file(args.batch, args.output, args.concurrency, "shared" if args.shared_session else "per_request"))
+        else:
+            asyncio.run(run_conversation())
     except Exception as e:
         logger.error(f"An error occurred: {e}")
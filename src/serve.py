@@ -0,0 +1,91 @@
+"""This module is the multi-worker server entry point for the Great-Sage API.
+
+It runs `main:app` in N uvicorn worker processes. Workers do not share memory, so with more than one
+worker the sessions must live in a shared store (SESSION_BACKEND=sqlite, cached or database):
+
+- stateless (SESSION_AFFINITY=stateless): the workers share one port and any worker may serve any request;
+  sessions are loaded from the store on every request and written back before the response is returned
+- sticky (SESSION_AFFINITY=sticky, default): every worker listens on its own port (--port, --port + 1, ...) and
+  a load balancer sends all requests of a session to the same worker (e.g. by hashing the `X-Session-Id`
+  header), which serves hot sessions from its cache
+
+Usage:
+    python src/serve.py --workers 4
+"""
+
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import uuid
+import dotenv
+import uvicorn
+
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(SRC_DIR)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Run the Great-Sage API with several worker processes.")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", 1)), help="number of worker processes (default: WEB_CONCURRENCY or 1)")
+    parser.add_argument("--host", default=os.getenv("DEPLOYMENT_HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("DEPLOYMENT_PORT", 10000)))
+    parser.add_argument("--log-level", default="info")
+    return parser.parse_args()
+
+
+def run_sticky(args: argparse.Namespace) -> None:
+    """Runs one single-worker uvicorn process per port and waits for them, forwarding termination signals."""
+    processes = [
+        subprocess.Popen([
+            sys.executable, "-m", "uvicorn", "main:app",
+            "--app-dir", SRC_DIR,
+            "--host", args.host,
+            "--port", str(args.port + index),
+            "--log-level", args.log_level,
+            "--timeout-graceful-shutdown", "30"
+        ])
+        for index in range(args.workers)
+    ]
+    print(f"Started {args.workers} workers on ports {args.port}-{args.port + args.workers - 1}.")
+
+    def terminate(signum, frame):
+        for process in processes:
+            process.send_signal(signal.SIGTERM)
+
+    signal.signal(signal.SIGTERM, terminate)
+    signal.signal(signal.SIGINT, terminate)
+    sys.exit(max(process.wait() for process in processes))
+
+
+def main() -> None:
+    dotenv.load_dotenv()
+    args = parse_args()
+
+    backend = os.getenv("SESSION_BACKEND", "memory").lower()
+    if args.workers > 1 and backend == "memory":
+        sys.exit("SESSION_BACKEND=memory keeps sessions inside one process; use sqlite, cached or database with --workers > 1.")
+
+    # The workers import main.py as a top-level module next to the `src` package, and must agree on the default session.
+    os.environ["PYTHONPATH"] = os.pathsep.join(filter(None, [SRC_DIR, ROOT_DIR, os.getenv("PYTHONPATH")]))
+    os.environ.setdefault("DEFAULT_SESSION_ID", str(uuid.uuid4()))
+    sys.path[:0] = [SRC_DIR, ROOT_DIR]
+
+    if args.workers > 1 and os.getenv("SESSION_AFFINITY", "sticky").lower() == "sticky":
+        run_sticky(args)
+        return
+
+    uvicorn.run(
+        "main:app",
+        app_dir=SRC_DIR,
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        log_level=args.log_level,
+        timeout_graceful_shutdown=30
+    )
+
+
+if __name__ == "__main__":
+    main()